@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of the date parsing of the return results.
+
+Compare ``fff.utils.datetime.parse_date`` with the former implementation, which called
+dateparser for every date of every return result.
+
+Usage::
+
+    python -m benchmarks.parse_date
+"""
+import re
+from datetime import date, datetime
+from pathlib import Path
+from timeit import repeat
+
+import dateparser
+from dateutil.relativedelta import relativedelta
+
+from fff.utils.datetime import _parse_date_parts, parse_date
+
+RESULTS_PAGE = (
+    Path(__file__).parent.parent / "tests" / "fixtures" / "kayak" / "results.html"
+)
+# A search of 5 URLs, with 100 return results each
+NB_DATES = 1000
+SEARCH_WINDOW = (date(2023, 1, 1), date(2023, 4, 1))
+
+
+def legacy_parse_date(date_str: str) -> datetime:
+    """The former parse_date."""
+    date_time = dateparser.parse(date_str, languages=["en"])
+    if not date_time:
+        raise ValueError(f"Could not parse any date in this string: {date_str}")
+    if date_time <= datetime.now():
+        date_time += relativedelta(years=1)
+    return date_time
+
+
+def main():
+    page_dates = re.findall(r'section date">([^<]+)<', RESULTS_PAGE.read_text())
+    dates = [page_dates[i % len(page_dates)] for i in range(NB_DATES)]
+    print(f"Parsing {len(dates)} dates ({len(set(dates))} distinct ones):")
+
+    def parse_cold():
+        _parse_date_parts.cache_clear()
+        for date_str in dates:
+            parse_date(date_str, "en", SEARCH_WINDOW)
+
+    def parse_warm():
+        for date_str in dates:
+            parse_date(date_str, "en", SEARCH_WINDOW)
+
+    def parse_legacy():
+        for date_str in dates:
+            legacy_parse_date(date_str)
+
+    for name, function in [
+        ("dateparser, every date (former)", parse_legacy),
+        ("parse_date, empty cache", parse_cold),
+        ("parse_date, cached", parse_warm),
+    ]:
+        best = min(repeat(function, number=1, repeat=5))
+        print(
+            f"  {name:<32} {best * 1000:>9.2f} ms  {best / len(dates) * 1e6:>8.2f} µs/date"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+End-to-end benchmark of ``Bot.search``, in a web browser, against a local mock of Kayak.
+
+Each scenario runs in its own process, so that its peak memory is its own:
+
+- ``sequential``: one browser scraps every URL
+- ``parallel``: several browsers share the URLs
+- ``cached``: every URL is in the result cache (filled by a previous scenario)
+
+The mock website (``tests/fake_kayak.py``) can be made slower or bigger. The results
+(URLs per minute, time spent per phase, peak memory) are saved as JSON, to compare them
+between commits. It needs Firefox and geckodriver, like a real search.
+
+Usage::
+
+    python -m benchmarks.search --latency 0.5 --progress 2 --results 20
+    python -m benchmarks.search --compare benchmarks/results/<previous commit>.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess  # nosec
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List
+
+from fff.config import PROJECT_DIR
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SCENARIOS = ["sequential", "parallel", "cached"]
+
+
+def peak_rss_mb(who: int) -> float:
+    """Peak resident memory of this process or of its (finished) children, in MB."""
+    max_rss = resource.getrusage(who).ru_maxrss
+    # In kB on Linux, in bytes on macOS
+    return max_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(  # nosec
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_scenario(scenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run a search against the mock website, in this process."""
+    from fff.bot import Bot
+    from fff.config import Settings
+    from fff.tracing import tracer
+    from fff.utils.logging import configure_logging
+    from tests.fake_kayak import FakeKayak
+
+    configure_logging("WARNING")
+    workdir = Path(args.workdir)
+    with FakeKayak(
+        latency=args.latency,
+        progress_duration=args.progress,
+        nb_results=args.results,
+    ) as fake_kayak:
+        settings = Settings(
+            WEBSITE_URL=fake_kayak.url,
+            SEARCH_DATE_BEGIN=date.today() + timedelta(days=30),
+            SEARCH_DATE_END=date.today() + timedelta(days=30 + args.days),
+            MAX_PARALLEL_BROWSERS=args.browsers if scenario == "parallel" else 1,
+            REQUESTS_PER_MINUTE=6000,  # Don't throttle the local website
+            CACHE_ENABLED=True,
+            CACHE_PATH=workdir / "results.sqlite3",
+            CHECKPOINT_PATH=workdir / f"{scenario}.jsonl",
+            EXPORT_PATHS="",
+            # The pruned URLs are not cached: the "cached" scenario would scrap them again
+            PRUNE_DEPARTURE_DATES=False,
+        )
+        bot = Bot(settings=settings)
+        start = perf_counter()
+        # Don't print the flight trips found
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            bot.search(read_cache=scenario == "cached")
+            elapsed = perf_counter() - start
+            bot.quit()
+        nb_urls = len(bot.search_urls or [])
+        return {
+            "urls": nb_urls,
+            "page_loads": sum(
+                path.startswith("/flights/") for path in fake_kayak.requested_paths
+            ),
+            "seconds": round(elapsed, 3),
+            "urls_per_minute": round(nb_urls / elapsed * 60, 2),
+            "flight_trips": len(bot.results),
+            "phases": {
+                phase.name: {
+                    "count": phase.count,
+                    "total": round(phase.total, 4),
+                    "p50": round(phase.p50, 4),
+                    "p95": round(phase.p95, 4),
+                }
+                for phase in tracer.stats()
+            },
+            "peak_rss_mb": round(peak_rss_mb(resource.RUSAGE_SELF), 1),
+            # geckodriver and Firefox
+            "browser_peak_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        }
+
+
+def spawn_scenario(scenario: str, args: argparse.Namespace, workdir: str) -> Dict:
+    """Run a scenario in a new process, and return its results."""
+    process = subprocess.run(  # nosec
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.search",
+            "--run-scenario",
+            scenario,
+            "--workdir",
+            workdir,
+            "--latency",
+            str(args.latency),
+            "--progress",
+            str(args.progress),
+            "--results",
+            str(args.results),
+            "--days",
+            str(args.days),
+            "--browsers",
+            str(args.browsers),
+        ],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"The {scenario} scenario failed (a web browser is needed):\n{process.stderr}"
+        )
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def compare(previous: Dict, current: Dict) -> List[str]:
+    """Lines comparing the scenarios of two benchmark results."""
+    lines = [f"Compared with {previous['commit']} ({previous['date']}):"]
+    for scenario, results in current["scenarios"].items():
+        before = previous["scenarios"].get(scenario)
+        if before is None:
+            continue
+        speed = results["urls_per_minute"] / before["urls_per_minute"] - 1
+        memory = results["peak_rss_mb"] - before["peak_rss_mb"]
+        lines.append(
+            f"  {scenario:<11} {speed:+.0%} URLs per minute, {memory:+.1f} MB peak memory"
+        )
+    return lines
+
+
+def print_results(results: Dict) -> None:
+    for scenario, scenario_results in results["scenarios"].items():
+        print(
+            f"{scenario}: {scenario_results['urls']} URL(s) in {scenario_results['seconds']:.1f}s, "
+            f"{scenario_results['urls_per_minute']:.1f} URLs per minute, "
+            f"peak memory {scenario_results['peak_rss_mb']:.0f} MB "
+            f"(browser: {scenario_results['browser_peak_rss_mb']:.0f} MB)"
+        )
+        for name, phase in scenario_results["phases"].items():
+            print(
+                f"  {name:<20} {phase['count']:>6} x  p50 {phase['p50'] * 1000:>8.1f} ms  "
+                f"p95 {phase['p95'] * 1000:>8.1f} ms  total {phase['total']:>7.2f}s"
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.search", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="seconds before each answer"
+    )
+    parser.add_argument(
+        "--progress",
+        type=float,
+        default=1.0,
+        help="seconds for the progress bar to fill",
+    )
+    parser.add_argument(
+        "--results", type=int, default=15, help="return results per page"
+    )
+    parser.add_argument(
+        "--days", type=int, default=60, help="length of the search period"
+    )
+    parser.add_argument(
+        "--browsers", type=int, default=3, help="browsers of the parallel scenario"
+    )
+    parser.add_argument("--output", type=Path, help="default: benchmarks/results/")
+    parser.add_argument("--compare", type=Path, metavar="PREVIOUS_RESULTS")
+    parser.add_argument("--run-scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.run_scenario:
+        print(json.dumps(run_scenario(args.run_scenario, args)))
+        return
+
+    scenarios = [s for s in SCENARIOS if s in (args.scenario or SCENARIOS)]
+    commit = git_commit()
+    results: Dict[str, Any] = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "knobs": {
+            "latency": args.latency,
+            "progress": args.progress,
+            "results": args.results,
+            "days": args.days,
+            "browsers": args.browsers,
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        if scenarios == ["cached"]:
+            # Fill the cache first
+            spawn_scenario("sequential", args, workdir)
+        for scenario in scenarios:
+            print(f"Running the {scenario} scenario...")
+            results["scenarios"][scenario] = spawn_scenario(scenario, args, workdir)
+
+    print_results(results)
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+    if args.compare:
+        print("\n".join(compare(json.loads(args.compare.read_text()), results)))
+
+
+if __name__ == "__main__":
+    main()
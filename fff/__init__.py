@@ -1,2 +1,7 @@
 """Flexible Flight Finder"""
 __version__ = "0.2023.01.12-alpha"
+
+APP_NAME = "Flexible Flight Finder"
+APP_DESCRIPTION = (
+    "Find the cheapest flight with more flexible dates than online flight comparators."
+)
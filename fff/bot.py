@@ -1,184 +1,194 @@
-import html
-from datetime import date, datetime
-from time import sleep
-from typing import List, Union
-from urllib.parse import urljoin
-
-from price_parser import Price
-from pydantic import BaseModel, HttpUrl
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Callable, Dict, Iterator, List, Sequence, TypeVar
+
 from selenium import webdriver
 from selenium.common.exceptions import (
     NoSuchElementException,
-    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
 )
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 
-from fff.config import settings
-from fff.schemas.airport import AirPort, AirportTrip
-from fff.schemas.baggage import BaggageList
-from fff.schemas.flexible_calendar import DateWindow, FlexibleCalendar
-from fff.schemas.flight_duration import FlightDurationFilter
-from fff.schemas.flight_search import FlightSearchParameters
-from fff.schemas.layover import LayoverFilter
-from fff.schemas.passenger import PassengerList
-from fff.schemas.stop import MaxStopFilter
-from fff.utils.datetime import parse_date, split_date_window
+from fff.browser import (
+    PAGE_TRANSFER_SIZE_SCRIPT,
+    PageLoadStats,
+    lean_firefox_preferences,
+)
+from fff.browser_pool import BrowserLease, BrowserPoolClient
+from fff.calendar_scan import (
+    calendar_cells,
+    cells_by_url,
+    cheapest_cells,
+    format_calendar_table,
+)
+from fff.config import Settings, get_settings
+from fff.exceptions import CaptchaError, ScrapingError
+from fff.history import PriceHistory
+from fff.merger import Pruner, SearchResults, TopFlightTrips
+from fff.parser import (
+    CALENDAR_PRICE_XPATH,
+    RETURN_RESULT_XPATHS,
+    CalendarPrice,
+    parse_calendar_prices,
+    parse_flight_trips,
+)
+from fff.pool import BotPool
+from fff.price_matrix import PriceMatrix, save_price_matrix
+from fff.schemas.calendar_cell import CalendarCell
+from fff.schemas.flight_trip import FlightTrip
+from fff.schemas.url_result import UrlResult
+from fff.session import SearchSession
+from fff.throttle import (
+    CAPTCHA_ELEMENT_SCRIPT,
+    PageOutcome,
+    RequestScheduler,
+    is_captcha_page,
+)
+from fff.tracing import traced, tracer
+from fff.url_generator import UrlGenerator
+from fff.utils.datetime import split_date_window  # noqa: F401 (re-exported)
 from fff.utils.logging import logger
-from fff.utils.progress_bar import progressbar_is_full
+from fff.utils.progress_bar import elements_are_stable, progressbar_is_full
+
+T = TypeVar("T")
 
+# The return flights of a departure date are displayed once they did not change
+# for this many polls in a row
+RETURN_RESULTS_STABLE_POLLS = 3
+RETURN_RESULTS_POLL_INTERVAL = 0.25  # seconds
+
+# Run in the browser: click on the calendar cell at the given index.
+CLICK_CALENDAR_PRICE_SCRIPT = """
+document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+).snapshotItem(arguments[1]).click();
+"""
+
+
+class ScheduledRequest:
+    """A page interaction holding a slot of the request scheduler."""
 
-class UrlGenerator:
     def __init__(self):
-        self.flexible_calendar = FlexibleCalendar(
-            min_nights=settings.MIN_NIGHTS, max_nights=settings.MAX_NIGHTS
-        )
-        self.passenger_list = PassengerList(
-            adults=settings.PASSENGER_ADULTS,
-            children=settings.PASSENGER_CHILDREN,
-            infant_on_lap=settings.PASSENGER_INFANTS_ON_LAP,
-            seniors=settings.PASSENGER_SENIORS,
-            students=settings.PASSENGER_STUDENTS,
-            toddlers_in_seat=settings.PASSENGER_TODDLERS_IN_OWN_SEAT,
-            youths=settings.PASSENGER_YOUTHS,
-        )
-        self.baggage_list = BaggageList(
-            checked_bags=settings.CHECKED_BAG_PER_PASSENGER,
-            carry_on_bags=settings.CARRY_ON_BAG_PER_PASSENGER,
-        )
-        self.max_stop_filter = MaxStopFilter(number_of_stops=settings.MAX_STOPS)
-        self.flight_duration_filter = FlightDurationFilter(
-            max_time=settings.MAX_FLIGHT_DURATION
-        )
-        self.layover_filter = LayoverFilter(
-            min_time=settings.MIN_LAYOVER_DURATION,
-            max_time=settings.MAX_LAYOVER_DURATION,
-        )
-        self.search_parameters = FlightSearchParameters(
-            passenger_list=self.passenger_list,
-            baggage_list=self.baggage_list,
-            max_stop_filter=self.max_stop_filter,
-            layover_filter=self.layover_filter,
-            flight_duration_filter=self.flight_duration_filter,
-        )
-        # # Avoid looking for dates in the past
-        if settings.SEARCH_DATE_BEGIN > date.today():
-            search_date_begin = settings.SEARCH_DATE_BEGIN
-        else:
-            search_date_begin = date.today()
-            logger.warning(
-                f"Cannot search a flight from a date in the past ({settings.SEARCH_DATE_BEGIN}). The research will start from today ({search_date_begin})."
-            )
+        # How long the page took to load. Default to the whole interaction.
+        self.load_time: float | None = None
 
-        if settings.SEARCH_DATE_END <= search_date_begin:
-            raise ValueError(
-                f"End of search date ({settings.SEARCH_DATE_END}) should be later than the begin of search date ({search_date_begin}). Please check your settings or env file."
-            )
 
-        self.date_tuples = split_date_window(
-            search_date_begin, settings.SEARCH_DATE_END
-        )
+class AttachedDriver(webdriver.Remote):
+    """Web driver of a browser session launched by another process: the browser pool."""
 
-        self.from_airport = AirPort(
-            code=settings.FROM_AIRPORT,
-            allow_nearby_airports=settings.FROM_ALLOW_NEARBY_AIRPORTS,
-        )
-        self.destination_airport = AirPort(
-            code=settings.DESTINATION_AIRPORT,
-            allow_nearby_airports=settings.DESTINATION_ALLOW_NEARBY_AIRPORTS,
-        )
-        self.round_trip = AirportTrip(
-            from_airport=self.from_airport, destination_airport=self.destination_airport
+    def __init__(self, lease: BrowserLease):
+        self.lease = lease
+        super().__init__(
+            command_executor=lease.executor_url, options=webdriver.FirefoxOptions()
         )
 
-    @property
-    def date_begin(self) -> date:
-        return self.date_tuples[0][0]
+    def start_session(self, capabilities: dict, browser_profile=None) -> None:
+        # Attach to the existing session, instead of creating a new one
+        self.session_id = self.lease.session_id
+        self.caps = self.lease.capabilities
 
-    @property
-    def date_end(self) -> date:
-        return self.date_tuples[-1][1]
 
-    def generate_url(
+class Bot:
+    def __init__(
         self,
-        start_date: date,
-        end_date: date,
-        date_window: Union[DateWindow, None] = None,
-    ) -> str:
+        page_loads: PageLoadStats | None = None,
+        settings: Settings | None = None,
+        url_generator: UrlGenerator | None = None,
+        scheduler: RequestScheduler | None = None,
+        price_matrix: PriceMatrix | None = None,
+    ):
         """
-        Generate the search URL for a given date.
-
-        Returns:
-            str: The URL
+        Args:
+            page_loads (PageLoadStats | None): where to record the load of the search pages.
+                May be shared by several bots.
+            settings (Settings | None): the search settings. Default to the environment ones.
+            url_generator (UrlGenerator | None): the search URLs, when shared by several bots
+            scheduler (RequestScheduler | None): paces the page loads. Must be shared by
+                the bots scraping at the same time.
+            price_matrix (PriceMatrix | None): where to record every price seen. May be
+                shared by several bots.
         """
-        url = f"{settings.WEBSITE_URL}/flights/{self.round_trip}/{start_date.isoformat()}/{end_date.isoformat()}"
-        if date_window:
-            url = (
-                url
-                + f"-flexible-calendar-{date_window.min_nights}to{date_window.max_nights}"
+        self.settings = settings if settings is not None else get_settings()
+        self.scheduler = (
+            scheduler
+            if scheduler is not None
+            else RequestScheduler(
+                requests_per_minute=self.settings.REQUESTS_PER_MINUTE,
+                max_concurrency=self.settings.MAX_PARALLEL_BROWSERS,
+                slow_page_load=self.settings.SLOW_PAGE_LOAD,
             )
-        url = url + str(self.search_parameters)
-        return url
-
-    def generate_urls(self, flexible_calendar: bool = True) -> List[str]:
-        """Generate the list of URL to scrap
-
-        Returns:
-            List[str]: The list of URLs
-        """
-
-        urls: List[str] = []
-        for date_window in self.flexible_calendar.date_windows:
-            for start_date, end_date in self.date_tuples:
-                url = self.generate_url(start_date, end_date, date_window)
-                logger.debug(f"Adding URL: {url}")
-                urls.append(url)
-        return urls
-
-
-class FlightDateElement(BaseModel):
-    web_element: WebElement
-    price: Price
-
-    class Config:
-        arbitrary_types_allowed = True
-
-    def __repr__(self):
-        return f"Flight: {self.price.amount}"
-
-
-class FlightTrip(BaseModel):
-    search_link: Union[HttpUrl, None]  # Search link for other flights at this date
-    direct_link: Union[HttpUrl, None]  # Direct link to the selling company
-    first_trip: Union[AirportTrip, None]
-    first_trip_date: datetime | None
-    return_trip: Union[AirportTrip, None]
-    return_trip_date: datetime | None
-    price: Price = Price.fromstring("100 €")
-
-    class Config:
-        arbitrary_types_allowed = True
-
-    def __repr__(self):
-        return f"### Flight trip {self.first_trip.from_airport}-{self.first_trip.destination_airport} at {self.first_trip_date.date().isoformat()}, return {self.return_trip.from_airport}-{self.return_trip.destination_airport} at {self.return_trip_date.date().isoformat()}, price {self.price.currency}{self.price.amount_text} ###\n#\n# Booking link: {self.direct_link}\n#\n# Other flights at this date:{self.search_link}\n###"
-
-    def __str__(self):
-        return self.__repr__()
-
-
-class Bot:
-    def __init__(self):
+        )
         self.default_timeout = 10
+        # Time spent loading the return flights of the departure dates clicked on
+        self.clicks_time = 0.0
+        self.nb_clicks = 0
+        self.page_loads = page_loads if page_loads is not None else PageLoadStats()
+        # Search URLs loading in background tabs: URL -> window handle
+        self.prefetched_tabs: Dict[str, str] = {}
+        # Lease of the web browser, when borrowed from the browser pool
+        self.pool_client: BrowserPoolClient | None = None
+        # Pages loaded by the web browser
+        self.nb_pages = 0
+        self.driver: webdriver.Remote = self._launch_driver()
+        # The web browsers of the pool are already on the website
+        self.started = self.pool_client is not None
+        self.search_urls: List[str] | None = None
+        self.url_generator = (
+            url_generator
+            if url_generator is not None
+            else UrlGenerator(settings=self.settings)
+        )
+        self.price_matrix = (
+            price_matrix
+            if price_matrix is not None
+            else PriceMatrix.for_search(self.url_generator)
+        )
+
+    def _launch_driver(self) -> webdriver.Remote:
+        if self.settings.BROWSER_POOL:
+            borrowed_driver = self._borrow_driver()
+            if borrowed_driver is not None:
+                return borrowed_driver
         options = webdriver.FirefoxOptions()
-        options.headless = settings.HEADLESS_MODE
+        options.headless = self.settings.HEADLESS_MODE
+        if self.settings.LEAN_BROWSING:
+            for name, value in lean_firefox_preferences().items():
+                options.set_preference(name, value)
         # Use Firefox browser (geckodriver)
-        self.driver: webdriver.Remote = webdriver.Firefox(options=options)
-        self.driver.implicitly_wait(self.default_timeout)
-        self.started = False
-        self.search_urls: List[str] | None = None
-        self.url_generator = UrlGenerator()
+        driver = webdriver.Firefox(options=options)
+        driver.implicitly_wait(self.default_timeout)
+        return driver
+
+    def _borrow_driver(self) -> webdriver.Remote | None:
+        """Borrow a warmed web browser from the browser pool, if it is running."""
+        address = self.settings.BROWSER_POOL_ADDRESS
+        try:
+            client = BrowserPoolClient(address)
+        except OSError as e:
+            logger.warning(
+                f"Cannot reach the browser pool on {address} ({e}). Launching a web browser."
+            )
+            return None
+        try:
+            lease = client.acquire()
+        except OSError as e:
+            logger.warning(
+                f"The browser pool did not lend a web browser ({e}). Launching a web browser."
+            )
+            client.release(pages=0)
+            return None
+        self.pool_client = client
+        self.nb_pages = 0
+        driver = AttachedDriver(lease)
+        driver.implicitly_wait(self.default_timeout)
+        logger.debug(f"Borrowed the web browser session {lease.session_id}")
+        return driver
 
     def _force_click(self, element: WebElement):
         """Replace classical Selenium click when the latter is not possible.
@@ -227,11 +237,89 @@ class Bot:
             )
             logger.exception(e)
 
+    @contextmanager
+    def _scheduled_request(self, url: str) -> Iterator[ScheduledRequest]:
+        """Interact with a page once the request scheduler allows it, and report how it went.
+
+        The slot is held until the interaction ends: the page load, then the clicks.
+
+        Args:
+            url (str): the page URL, to log the failed loads
+        """
+        with tracer.span("wait_request_slot"):
+            self.scheduler.acquire()
+        self.nb_pages += 1
+        start = perf_counter()
+        request = ScheduledRequest()
+        outcome = PageOutcome.ERROR
+        try:
+            yield request
+            outcome = PageOutcome.OK
+        except CaptchaError:
+            outcome = PageOutcome.CAPTCHA
+            raise
+        except TimeoutException:
+            outcome = PageOutcome.TIMEOUT
+            raise
+        finally:
+            load_time = (
+                request.load_time
+                if request.load_time is not None
+                else perf_counter() - start
+            )
+            self.scheduler.release(outcome, load_time=load_time)
+            if outcome is not PageOutcome.OK:
+                logger.debug(
+                    f"Page load outcome: {outcome.value} after {load_time:.1f}s. URL: {url}"
+                )
+
+    def _check_captcha(self, url: str) -> None:
+        """Raise a CaptchaError if the website displays a captcha instead of the page."""
+        if is_captcha_page(
+            self.driver.current_url, self.driver.title
+        ) or self.driver.execute_script(CAPTCHA_ELEMENT_SCRIPT):
+            raise CaptchaError(url)
+
+    @traced("start")
     def start(self):
-        self.driver.get(settings.WEBSITE_URL)
+        with self._scheduled_request(self.settings.WEBSITE_URL):
+            self.driver.get(self.settings.WEBSITE_URL)
+            self._check_captcha(self.settings.WEBSITE_URL)
         self.hide_cookies_disclaimer()
         self.started = True
 
+    def quit(self):
+        """Close the web browser, or give it back to the browser pool."""
+        if self.pool_client is not None:
+            self.pool_client.release(pages=self.nb_pages)
+            self.pool_client = None
+        else:
+            self.driver.quit()
+        self.started = False
+
+    def restart(self):
+        """Launch a new web browser, if the current one does not respond anymore."""
+        try:
+            self.driver.title
+            return
+        except WebDriverException:
+            logger.warning("The web browser does not respond anymore. Restarting it.")
+        if self.pool_client is not None:
+            # The pool replaces it
+            self.pool_client.release(pages=self.nb_pages, broken=True)
+            self.pool_client = None
+        else:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+        self.driver = self._launch_driver()
+        self.prefetched_tabs = {}
+        self.started = self.pool_client is not None
+        if not self.started:
+            self.start()
+
+    @traced("wait_progress_bar")
     def wait_progress_bar(self):
         """Wait for the website progress bar to finish (if there is one)."""
         header_containing_progress_bar = self.driver.find_element(
@@ -242,7 +330,12 @@ class Bot:
         )
         try:
             self.driver.implicitly_wait(3)
-            if header_containing_progress_bar.find_element(By.XPATH, progressbar_xpath):
+            # Stalls for the whole implicit wait when there is no progress bar
+            with tracer.span("find_progress_bar"):
+                progress_bar = header_containing_progress_bar.find_element(
+                    By.XPATH, progressbar_xpath
+                )
+            if progress_bar:
                 browser_wait = WebDriverWait(self.driver, 60)
                 browser_wait.until(progressbar_is_full((By.XPATH, progressbar_xpath)))
         except NoSuchElementException:
@@ -250,172 +343,523 @@ class Bot:
             pass
         self.revert_default_timeout()
 
-    def _get_best_dates(
-        self, web_element: WebElement, nb_results: int
-    ) -> List[FlightDateElement]:
-        flight_date_webelements = web_element.find_elements(
-            By.XPATH, "//div[@class='price']"
-        )
-        flight_dates: List[FlightDateElement] = []
+    def prefetch(self, urls: Sequence[str]) -> None:
+        """Open the next search URLs in background tabs.
 
-        for web_element in flight_date_webelements:
-            try:
-                raw_price = web_element.text
-                # Make sure the departure date case is not empty
-                if raw_price:
-                    price = Price.fromstring(raw_price)
-                    if price.amount:
-                        flight_dates.append(
-                            FlightDateElement(
-                                web_element=web_element,
-                                price=price,
-                            )
-                        )
-            except StaleElementReferenceException as e:
-                logger.exception(e)
+        The website runs their searches while the current tab is being scraped, so their
+        progress bar is already full when the bot switches to them.
+
+        Args:
+            urls (Sequence[str]): the next URLs to scrap. Only the first PREFETCH_TABS ones
+                are opened.
+        """
+        current_tab = self.driver.current_window_handle
+        for url in urls[0 : self.settings.PREFETCH_TABS]:
+            if url in self.prefetched_tabs:
+                continue
+            if not self.scheduler.try_acquire_token():
+                logger.debug("Not prefetching: the request rate limit is reached.")
+                break
+            self.nb_pages += 1
+            self.driver.switch_to.new_window("tab")
+            # Don't wait for the page to load, unlike driver.get()
+            self.driver.execute_script("window.location.href = arguments[0];", url)
+            self.prefetched_tabs[url] = self.driver.current_window_handle
+            logger.debug(f"Prefetching URL in a background tab: {url}")
+        self.driver.switch_to.window(current_tab)
+
+    def _open(self, url: str) -> None:
+        """Display a search URL: switch to its tab if it was prefetched, otherwise load it."""
+        tab = self.prefetched_tabs.pop(url, None)
+        if tab is None or tab not in self.driver.window_handles:
+            self.driver.get(url)
+            return
+        # The current tab is not needed anymore
+        self.driver.close()
+        self.driver.switch_to.window(tab)
+
+    @traced("get_best_dates")
+    def _get_best_dates(self, url: str, nb_results: int) -> List[CalendarPrice]:
+        flight_dates = parse_calendar_prices(self.driver.page_source)
+        if url in self.url_generator.url_searches:
+            self._record_calendar_prices(url, flight_dates)
         flight_dates.sort(key=lambda x: x.price)
         chosen_dates = flight_dates[0:nb_results]
         return chosen_dates
 
-    def _get_best_departure_dates(
-        self, url: str, nb_results: int
-    ) -> List[FlightDateElement]:
-        self.driver.get(url)
+    def _record_calendar_prices(
+        self, url: str, calendar_prices: List[CalendarPrice]
+    ) -> List[CalendarCell]:
+        """Date the calendar prices of a search URL, and record them in the price matrix."""
+        cells = calendar_cells(
+            url,
+            route=str(self.url_generator.url_round_trips[url]),
+            planned_search=self.url_generator.url_searches[url],
+            calendar_prices=calendar_prices,
+        )
+        self.price_matrix.add_cells(cells)
+        return cells
+
+    def _load_search_page(self, url: str, request: ScheduledRequest) -> None:
+        """Display a search URL and wait for its search to finish.
+
+        Args:
+            url (str): the search URL
+            request (ScheduledRequest): the interaction with the page, holding its slot
+        """
+        load_start = perf_counter()
+        with tracer.span("page_load"):
+            self._open(url)
+        self._check_captcha(url)
         self.wait_progress_bar()
+        request.load_time = perf_counter() - load_start
+        self.page_loads.record(
+            url,
+            load_time=request.load_time,
+            transferred_bytes=self.driver.execute_script(PAGE_TRANSFER_SIZE_SCRIPT),
+        )
 
-        return self._get_best_dates(
-            web_element=self.driver.find_element(By.XPATH, "//html"),
-            nb_results=nb_results,
+    def _load_return_results(self, departure_dates: List[CalendarPrice]) -> None:
+        """Click on each departure date and wait for its return flights to be displayed.
+
+        Args:
+            departure_dates (List[CalendarPrice]): the departure dates to click on
+        """
+        return_result_locator = (By.XPATH, RETURN_RESULT_XPATHS["item"])
+        start = perf_counter()
+        with tracer.span("click_loop"):
+            # No implicit wait: we don't want to stall while there is no return result yet.
+            self.driver.implicitly_wait(0)
+            try:
+                for d in departure_dates:
+                    self.driver.execute_script(
+                        CLICK_CALENDAR_PRICE_SCRIPT, CALENDAR_PRICE_XPATH, d.index
+                    )
+                    try:
+                        browser_wait = WebDriverWait(
+                            self.driver,
+                            self.default_timeout,
+                            poll_frequency=RETURN_RESULTS_POLL_INTERVAL,
+                        )
+                        browser_wait.until(
+                            elements_are_stable(
+                                return_result_locator, RETURN_RESULTS_STABLE_POLLS
+                            )
+                        )
+                    except TimeoutException:
+                        logger.warning(
+                            f"Return flights still changing after {self.default_timeout}s for the departure date priced {d.price.amount_text}."
+                        )
+                    self._press_key(Keys.ESCAPE)
+            finally:
+                self.revert_default_timeout()
+
+        waiting_time = perf_counter() - start
+        self.clicks_time += waiting_time
+        self.nb_clicks += len(departure_dates)
+        # Time the fixed pauses would have taken: 1s per departure date, then 1.5s.
+        fixed_pauses_time = len(departure_dates) * 1 + 1.5
+        logger.info(
+            f"Return flights of {len(departure_dates)} departure date(s) loaded in {waiting_time:.1f}s "
+            f"instead of {fixed_pauses_time:.1f}s of fixed pauses (saved {fixed_pauses_time - waiting_time:.1f}s)."
         )
 
-    def get_best_flights(self, url: str, nb_results: int) -> List[FlightTrip]:
+    @property
+    def seconds_per_click(self) -> float:
+        """Average time to load the return flights of a departure date."""
+        if not self.nb_clicks:
+            # Former fixed pause after each click
+            return 1.0
+        return self.clicks_time / self.nb_clicks
+
+    @traced("get_best_flights")
+    def get_best_flights(
+        self,
+        url: str,
+        nb_results: int,
+        pruner: Pruner | None = None,
+        next_urls: Sequence[str] = (),
+    ) -> UrlResult:
         # Add a margin in case they are several dates with the same price
         margin = 2
-        departure_dates: List[FlightDateElement] = self._get_best_departure_dates(
-            url, nb_results + margin
+        with self._scheduled_request(url) as request:
+            self._load_search_page(url, request)
+            departure_dates = self._get_best_dates(url, nb_results=nb_results + margin)
+            if self.settings.PREFETCH_TABS:
+                self.prefetch(next_urls)
+            pruned = False
+            if pruner is not None:
+                kept_dates = pruner.prune(
+                    url, departure_dates, seconds_per_click=self.seconds_per_click
+                )
+                pruned = len(kept_dates) < len(departure_dates)
+                departure_dates = kept_dates
+                if not departure_dates:
+                    # Nothing on this page can beat the flights already found.
+                    return UrlResult(flight_trips=[], pruned=True)
+            self._load_return_results(departure_dates)
+            return self._parse_best_flights(url, nb_results, pruned=pruned)
+
+    def _parse_best_flights(
+        self, url: str, nb_results: int, pruned: bool = False
+    ) -> UrlResult:
+        """Parse the return flights displayed on the page, and keep the cheapest ones."""
+        best_flight_trips = TopFlightTrips(size=nb_results)
+        searched_flight_trips: List[FlightTrip] = []
+        flight_trips = parse_flight_trips(
+            self.driver.page_source,
+            self.settings.WEBSITE_URL,
+            source_url=url,
+            language=self.settings.WEBSITE_LANGUAGE,
+            date_window=(self.url_generator.date_begin, self.url_generator.date_end),
         )
-        result: List[FlightTrip]
-        result = []
-        for d in departure_dates:
-            self._force_click(d.web_element)
-            sleep(1)
-            self._press_key(Keys.ESCAPE)
-
-        sleep(1.5)
-        return_result_list: List[WebElement] = self.driver.find_elements(
-            By.XPATH, "//div[@class='returnResultItem']"
+        if url in self.url_generator.url_round_trips:
+            self.price_matrix.add_flight_trips(
+                str(self.url_generator.url_round_trips[url]), flight_trips
+            )
+        for flight_trip in flight_trips:
+            flight_trip.search_link = self.url_generator.generate_url(
+                flight_trip.first_trip_date.date(),
+                flight_trip.return_trip_date.date(),
+                round_trip=self.url_generator.url_round_trips.get(url),
+            )
+
+            # Add the trip to the list
+            if flight_trip.return_trip_date.date() < self.url_generator.date_end:
+                searched_flight_trips.append(flight_trip)
+                best_flight_trips.add(flight_trip)
+            else:
+                # "Flight trip not added because return date exceeds the maximum specified date."
+                pass
+
+        result = best_flight_trips.best()
+        logger.debug(
+            f"Found {len(result)} flight(s) for this URL, {best_flight_trips.nb_duplicates} duplicate(s) removed."
+        )
+        return UrlResult(
+            flight_trips=result, all_flight_trips=searched_flight_trips, pruned=pruned
         )
 
-        # For each departure date, there is a return result list.
-        for return_result_item in return_result_list:
-            try:
-                # Check all return results in the list
-                flight_trip = FlightTrip()
+    def scan_calendar(
+        self, url: str, next_urls: Sequence[str] = ()
+    ) -> List[CalendarCell]:
+        """Read the price of every departure date of a search URL, without clicking on them.
 
-                # Parse price
-                price_web_element = return_result_item.find_element(
-                    By.XPATH, ".//span[@class='price-text']"
-                )
+        Args:
+            url (str): the search URL
+            next_urls (Sequence[str]): the URLs to scan next, to prefetch in background tabs
 
-                flight_trip.price = Price.fromstring(
-                    price_web_element.get_attribute("textContent")
-                )
+        Returns:
+            List[CalendarCell]: the priced cells of the calendar
+        """
+        with self._scheduled_request(url) as request:
+            self._load_search_page(url, request)
+            if self.settings.PREFETCH_TABS:
+                self.prefetch(next_urls)
+            return self._record_calendar_prices(
+                url, parse_calendar_prices(self.driver.page_source)
+            )
 
-                # Parse dates
-                date_webelements = return_result_item.find_elements(
-                    By.XPATH,
-                    ".//div[contains(@class, 'section') and contains(@class, 'date')]",
-                )
-                date_first_trip_webelement = date_webelements[0]
-                date_first_trip = parse_date(
-                    date_first_trip_webelement.get_attribute("textContent")
-                )
-                flight_trip.first_trip_date = date_first_trip
-                date_return_trip_webelement = date_webelements[1]
+    def resolve_cells(
+        self, url: str, cells: List[CalendarCell], nb_results: int
+    ) -> List[FlightTrip]:
+        """Get the best flights of some departure dates of a search URL.
 
-                date_return_trip = parse_date(
-                    date_return_trip_webelement.get_attribute("textContent")
-                )
-                flight_trip.return_trip_date = date_return_trip
+        Args:
+            url (str): the search URL
+            cells (List[CalendarCell]): the calendar cells to click on
+            nb_results (int): how many flight trips to keep
 
-                # Parse booking link
-                booking_link_web_element = return_result_item.find_element(
-                    By.XPATH, ".//a[@class='booking-link ']"
-                )
-                booking_link = booking_link_web_element.get_attribute("href")
-                escaped_booking_link = html.unescape(booking_link)
-                flight_trip.direct_link = urljoin(
-                    settings.WEBSITE_URL, escaped_booking_link
-                )
+        Returns:
+            List[FlightTrip]: the best flights
+        """
+        with self._scheduled_request(url) as request:
+            self._load_search_page(url, request)
+            self._load_return_results(
+                [CalendarPrice(index=cell.index, price=cell.price) for cell in cells]
+            )
+            return self._parse_best_flights(url, nb_results).flight_trips
 
-                # For search link, we need departure date, return date and airports
-                first_trip_from_airport_str = return_result_item.find_element(
-                    By.XPATH, ".//div[contains(@id, 'leg-0-origin-airport')]"
-                ).get_attribute("textContent")
-                first_trip_to_airport_str = return_result_item.find_element(
-                    By.XPATH, ".//div[contains(@id, 'leg-0-destination-airport')]"
-                ).get_attribute("textContent")
-                flight_trip.first_trip = AirportTrip(
-                    from_airport=AirPort.from_string(first_trip_from_airport_str),
-                    destination_airport=AirPort.from_string(first_trip_to_airport_str),
-                )
+    def _with_retries(self, url: str, scrap: Callable[[], T]) -> T:
+        """Scrap a URL, with several attempts if it fails.
 
-                return_trip_from_airport_str = return_result_item.find_element(
-                    By.XPATH, ".//div[contains(@id, 'leg-1-origin-airport')]"
-                ).get_attribute("textContent")
+        Between two attempts, wait (with an exponential backoff) and restart the web browser
+        if it crashed.
 
-                return_trip_to_airport_str = return_result_item.find_element(
-                    By.XPATH, ".//div[contains(@id, 'leg-1-destination-airport')]"
-                ).get_attribute("textContent")
-                flight_trip.return_trip = AirportTrip(
-                    from_airport=AirPort.from_string(return_trip_from_airport_str),
-                    destination_airport=AirPort.from_string(return_trip_to_airport_str),
-                )
+        Args:
+            url (str): the search URL
+            scrap (Callable[[], T]): scrap the URL
 
-                flight_trip.search_link = self.url_generator.generate_url(
-                    date_first_trip.date(),
-                    date_return_trip.date(),
-                )
+        Raises:
+            ScrapingError: if every attempt failed
 
-                # Add the trip to the list
-                if flight_trip.return_trip_date.date() < self.url_generator.date_end:
-                    result.append(flight_trip)
-                else:
-                    # "Flight trip not added because return date exceeds the maximum specified date."
-                    pass
-            except StaleElementReferenceException as e:
-                logger.exception(e)
-            except IndexError as e:
-                logger.exception(e)
-                logger.error(
-                    f"A prolem might have occurred with the date for this flight. Let's pass on this one. URL: {url}"
+        Returns:
+            T: what was scraped
+        """
+        for attempt in range(1, self.settings.URL_MAX_ATTEMPTS + 1):
+            try:
+                return scrap()
+            except Exception as e:
+                if attempt == self.settings.URL_MAX_ATTEMPTS:
+                    raise ScrapingError(url, attempts=attempt, error=e) from e
+                backoff = self.settings.URL_RETRY_BACKOFF * 2 ** (attempt - 1)
+                logger.warning(
+                    f"Attempt {attempt}/{self.settings.URL_MAX_ATTEMPTS} failed ({type(e).__name__}: {e}). Retrying in {backoff:.0f}s. URL: {url}"
                 )
+                sleep(backoff)
+                try:
+                    self.restart()
+                except WebDriverException as restart_error:
+                    # The next attempt will fail as well, and report it.
+                    logger.exception(restart_error)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def scrap_url(
+        self,
+        url: str,
+        nb_results: int,
+        pruner: Pruner | None = None,
+        next_urls: Sequence[str] = (),
+    ) -> UrlResult:
+        """Get the best flights of a URL, with several attempts if it fails.
 
-        result.sort(key=lambda x: x.price)
-        result = result[0:nb_results]
-        logger.debug(f"Found {len(result)} flight(s) for this URL.")
-        return result
+        Args:
+            url (str): the search URL
+            nb_results (int): how many flight trips to keep
+            pruner (Pruner | None): skip the departure dates which cannot enter the top N
+            next_urls (Sequence[str]): the URLs to scrap next, to prefetch in background tabs
 
-    def search(self):
-        if not self.started:
-            self.start()
+        Raises:
+            ScrapingError: if every attempt failed
+
+        Returns:
+            UrlResult: the best flights
+        """
+        return self._with_retries(
+            url,
+            lambda: self.get_best_flights(
+                url, nb_results=nb_results, pruner=pruner, next_urls=next_urls
+            ),
+        )
+
+    def _scrap_urls(
+        self,
+        urls: List[str],
+        on_result: Callable[[str, UrlResult, float], None],
+        on_failure: Callable[[str, ScrapingError], None],
+        pruner: Pruner | None = None,
+    ) -> None:
+        """Scrap the URLs, with a pool of web browsers if several are allowed."""
+        nb_browsers = min(self.settings.MAX_PARALLEL_BROWSERS, len(urls))
+        if nb_browsers > 1:
+            # Each additional browser is launched by its own worker.
+            pool = BotPool(
+                bot_factory=lambda: Bot(
+                    page_loads=self.page_loads,
+                    settings=self.settings,
+                    url_generator=self.url_generator,
+                    scheduler=self.scheduler,
+                    price_matrix=self.price_matrix,
+                ),
+                size=nb_browsers,
+                first_bot=self,
+                prefetch=self.settings.PREFETCH_TABS,
+            )
+            pool.run(
+                urls,
+                nb_results=self.settings.NUMBER_OF_RESULTS,
+                on_result=on_result,
+                on_failure=on_failure,
+                pruner=pruner,
+            )
+        elif urls:
+            if not self.started:
+                self.start()
+            start = perf_counter()
+            for i, url in enumerate(urls):
+                print(f"Scraping the website... [URL {i+1}/{len(urls)}]")
+                url_start = perf_counter()
+                try:
+                    result = self.scrap_url(
+                        url,
+                        nb_results=self.settings.NUMBER_OF_RESULTS,
+                        pruner=pruner,
+                        next_urls=urls[i + 1 :],
+                    )
+                except ScrapingError as e:
+                    logger.error(e)
+                    on_failure(url, e)
+                    continue
+                scraping_time = perf_counter() - url_start
+                logger.info(f"URL {i+1}/{len(urls)} scraped in {scraping_time:.1f}s")
+                on_result(url, result, scraping_time)
+            logger.info(f"{len(urls)} URL(s) scraped in {perf_counter() - start:.1f}s")
+
+    def search(
+        self,
+        read_cache: bool = True,
+        resume: bool = False,
+        history: PriceHistory | None = None,
+        export_paths: Sequence[Path] = (),
+    ):
+        """Search the cheapest flights and print them.
 
+        Args:
+            read_cache (bool): use the results of the URLs scraped recently, if the cache
+                is enabled. Otherwise, scrap every URL again (the cache is still refreshed).
+            resume (bool): resume the previous run from its checkpoint journal: only scrap
+                the URLs which are missing or failed.
+            history (PriceHistory | None): record the flight trips in this price history,
+                and only scrap again the URLs worth it
+            export_paths (Sequence[Path]): export the flight trips to these files, as they
+                are found, in addition to the EXPORT_PATHS setting
+        """
+        tracer.reset()
+        self.price_matrix.reset()
         self.search_urls = self.url_generator.generate_urls()
+        session = SearchSession(
+            self.settings,
+            self.url_generator,
+            self.search_urls,
+            read_cache=read_cache,
+            resume=resume,
+            history=history,
+            export_paths=export_paths,
+        )
+        try:
+            self._scrap_urls(
+                session.urls_to_scrap,
+                on_result=session.on_result,
+                on_failure=session.on_failure,
+                pruner=session.pruner,
+            )
+        finally:
+            # Complete the exported files, even if the search failed
+            session.close()
+        self.page_loads.log_stats(lean_browsing=self.settings.LEAN_BROWSING)
+        self.scheduler.log_stats()
+        self._save_price_matrix()
+        tracer.report(self.settings.TRACE_PATH, self.settings.METRICS_PATH)
+
+        self.results: List[FlightTrip] = session.results
+        self.route_results: Dict[str, List[FlightTrip]] = session.route_results
+        session.print_results()
+
+    def _save_price_matrix(self) -> None:
+        if self.settings.PRICE_MATRIX_PATH is not None:
+            save_price_matrix(
+                self.price_matrix,
+                self.settings.PRICE_MATRIX_PATH,
+                max_age=timedelta(hours=self.settings.CACHE_TTL),
+            )
+
+    def watch(self, cycles: int | None = None, export_paths: Sequence[Path] = ()):
+        """Search again and again, every WATCH_INTERVAL minutes, to catch the fare drops.
 
-        self.results: List[FlightTrip]
-        self.results = []
+        Every flight trip found is recorded in the price history. Each cycle only scraps
+        again the URLs whose prices were volatile or close to the cheapest flights, and
+        prints an alert line when a fare beats the recorded minimum of its route. The result
+        cache is not read: it would hide the fare changes.
 
+        Args:
+            cycles (int | None): how many searches to run. Default to forever.
+            export_paths (Sequence[Path]): export the flight trips of every search to these
+                files, in addition to the EXPORT_PATHS setting
+        """
+        history = PriceHistory(self.settings.HISTORY_PATH)
+        cycle = 0
+        try:
+            while cycles is None or cycle < cycles:
+                cycle_start = perf_counter()
+                logger.info(f"Watching the fares: search #{cycle + 1}")
+                self.search(
+                    read_cache=False, history=history, export_paths=export_paths
+                )
+                cycle += 1
+                if cycles is None or cycle < cycles:
+                    next_cycle = self.settings.WATCH_INTERVAL * 60 - (
+                        perf_counter() - cycle_start
+                    )
+                    print(f"Next search in {max(0, next_cycle) / 60:.0f} minute(s).")
+                    sleep(max(0, next_cycle))
+        finally:
+            history.close()
+
+    def scan_calendars(self, resolve: bool = False):
+        """Print the price of every departure date and night window, without clicking on them.
+
+        Much faster than a full search, as each URL is only loaded once.
+
+        Args:
+            resolve (bool): then get the flights of the N cheapest cells of all the calendars,
+                and print them like a full search
+        """
+        tracer.reset()
+        self.price_matrix.reset()
+        self.search_urls = self.url_generator.generate_urls()
+        if not self.started:
+            self.start()
+
+        cells: List[CalendarCell] = []
+        failed_urls: List[str] = []
+        start = perf_counter()
         for i, url in enumerate(self.search_urls):
-            print(f"Scraping the website... [URL {i+1}/{len(self.search_urls)}]")
-            flight_trips = self.get_best_flights(
-                url, nb_results=settings.NUMBER_OF_RESULTS
+            print(f"Scanning the calendars... [URL {i+1}/{len(self.search_urls)}]")
+            try:
+                cells.extend(
+                    self._with_retries(
+                        url,
+                        lambda: self.scan_calendar(
+                            url, next_urls=self.search_urls[i + 1 :]
+                        ),
+                    )
+                )
+            except ScrapingError as e:
+                logger.error(e)
+                failed_urls.append(url)
+        logger.info(
+            f"{len(cells)} calendar price(s) read on {len(self.search_urls)} URL(s) in {perf_counter() - start:.1f}s."
+        )
+        if failed_urls:
+            logger.warning(
+                f"{len(failed_urls)} URL(s) could not be scanned: the calendar is incomplete."
             )
-            self.results.extend(flight_trips)
-
-        self.results.sort(key=lambda x: x.price)
-        self.results = self.results[0 : settings.NUMBER_OF_RESULTS]
+        self.calendar_table = cells
+        print(
+            "Departure date | Nights | Route | Price\n"
+            + format_calendar_table(cells)
+            + "\n"
+        )
+        if not resolve:
+            self._save_price_matrix()
+            tracer.report(self.settings.TRACE_PATH, self.settings.METRICS_PATH)
+            print("Done!")
+            return
+
+        # Second pass: only click on the globally cheapest cells
+        search_results = SearchResults(
+            size=self.settings.NUMBER_OF_RESULTS,
+            route_of=lambda url: str(self.url_generator.url_round_trips[url]),
+        )
+        for url, url_cells in cells_by_url(
+            cheapest_cells(cells, self.settings.NUMBER_OF_RESULTS)
+        ).items():
+            try:
+                flight_trips = self._with_retries(
+                    url,
+                    lambda: self.resolve_cells(
+                        url, url_cells, nb_results=self.settings.NUMBER_OF_RESULTS
+                    ),
+                )
+            except ScrapingError as e:
+                logger.error(e)
+                continue
+            search_results.extend(url, flight_trips)
+        self._save_price_matrix()
+        tracer.report(self.settings.TRACE_PATH, self.settings.METRICS_PATH)
+        self.results = search_results.overall.best()
         print(
-            f"Here are the {len(self.results)} cheapest flights matching your criterias:\n\n"
+            f"Here are the {len(self.results)} cheapest flights of the cheapest calendar prices:\n\n"
             + "\n\n".join([str(result) for result in self.results])
             + "\n\nDone!"
         )
@@ -0,0 +1,228 @@
+"""Web browser configuration, and measurement of the pages it loads."""
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import quote, urlsplit
+from urllib.request import getproxies
+
+from fff.utils.logging import logger
+
+# Third-party hosts serving ads, analytics and trackers. Nothing the bot reads comes from them.
+BLOCKED_HOSTS: Tuple[str, ...] = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "google-analytics.com",
+    "adservice.google.com",
+    "facebook.net",
+    "facebook.com",
+    "criteo.com",
+    "criteo.net",
+    "adnxs.com",
+    "amazon-adsystem.com",
+    "scorecardresearch.com",
+    "hotjar.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "taboola.com",
+    "outbrain.com",
+    "quantserve.com",
+    "rubiconproject.com",
+    "pubmatic.com",
+    "casalemedia.com",
+    "demdex.net",
+    "omtrdc.net",
+    "everesttech.net",
+    "tiqcdn.com",
+    "branch.io",
+)
+
+# Sum up what the current page transferred, from the browser Navigation and Resource Timing.
+# Blocked requests and resources served from the browser cache count as 0 bytes.
+PAGE_TRANSFER_SIZE_SCRIPT = """
+return performance.getEntriesByType('navigation')
+    .concat(performance.getEntriesByType('resource'))
+    .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+
+def system_proxy(proxies: Dict[str, str] | None = None) -> Tuple[str | None, List[str]]:
+    """The proxy the web browser would use, as a proxy auto-config result.
+
+    Read from the environment variables (``https_proxy``, ``http_proxy``, ``no_proxy``),
+    or from the system settings on macOS and Windows.
+
+    Args:
+        proxies (Dict[str, str] | None): the proxy URLs by scheme, as returned by
+            ``urllib.request.getproxies``. Default to the system ones.
+
+    Returns:
+        Tuple[str | None, List[str]]: the proxy, eg: "PROXY proxy.corp:3128", or None to
+            connect directly. Then the hosts to connect to directly anyway.
+    """
+    proxies = getproxies() if proxies is None else proxies
+    bypass_hosts = [
+        host.strip().lstrip(".") for host in proxies.get("no", "").split(",")
+    ]
+    bypass_hosts = [host for host in bypass_hosts if host]
+    proxy_url = proxies.get("https") or proxies.get("http")
+    if not proxy_url or "*" in bypass_hosts:
+        return None, []
+    proxy = urlsplit(proxy_url if "://" in proxy_url else f"http://{proxy_url}")
+    if proxy.scheme.startswith("socks"):
+        kind = "SOCKS5" if proxy.scheme.startswith("socks5") else "SOCKS"
+        port = proxy.port or 1080
+    else:
+        kind, port = "PROXY", proxy.port or 80
+    return f"{kind} {proxy.hostname}:{port}", bypass_hosts
+
+
+def _host_condition(hosts: Iterable[str]) -> str:
+    """PAC condition matching the hosts and their subdomains."""
+    return " || ".join(
+        f'host == "{host}" || dnsDomainIs(host, ".{host}")' for host in hosts
+    )
+
+
+def blocking_pac_script(
+    blocked_hosts: Iterable[str] = BLOCKED_HOSTS,
+    proxy: str | None = None,
+    bypass_hosts: Iterable[str] = (),
+) -> str:
+    """Proxy auto-config script sending the blocked hosts (and their subdomains) nowhere.
+
+    The requests to these hosts go to a closed local port, so they fail immediately. The
+    other requests go through the given proxy, if any, as they would without this script.
+
+    Args:
+        blocked_hosts (Iterable[str]): the hosts to block
+        proxy (str | None): the proxy of the other requests, eg: "PROXY proxy.corp:3128".
+            Default to a direct connection.
+        bypass_hosts (Iterable[str]): the hosts to connect to directly, even with a proxy
+    """
+    rules = f' if ({_host_condition(blocked_hosts)}) {{ return "PROXY 127.0.0.1:9"; }}'
+    bypass_hosts = list(bypass_hosts)
+    if proxy is not None and bypass_hosts:
+        rules += f' if ({_host_condition(bypass_hosts)}) {{ return "DIRECT"; }}'
+    return (
+        "function FindProxyForURL(url, host) {"
+        + rules
+        + f' return "{proxy or "DIRECT"}"; }}'
+    )
+
+
+def lean_firefox_preferences(
+    blocked_hosts: Iterable[str] = BLOCKED_HOSTS,
+    proxies: Dict[str, str] | None = None,
+) -> Dict[str, Any]:
+    """Firefox preferences to load only what the bot needs: the page text and scripts.
+
+    Images and web fonts are not downloaded, and the third-party hosts are blocked. The
+    other requests still go through the system proxy, if any.
+
+    Args:
+        blocked_hosts (Iterable[str]): the hosts to block
+        proxies (Dict[str, str] | None): the proxy URLs by scheme. Default to the system ones.
+    """
+    proxy, bypass_hosts = system_proxy(proxies)
+    return {
+        # Don't load any image
+        "permissions.default.image": 2,
+        # Use the system fonts instead of downloading the web fonts
+        "gfx.downloadable_fonts.enabled": False,
+        "browser.display.use_document_fonts": 0,
+        # No video nor sound
+        "media.autoplay.default": 5,
+        "media.autoplay.blocking_policy": 2,
+        # Block the third-party hosts with a proxy auto-config script, chained to the proxy
+        "network.proxy.type": 2,
+        "network.proxy.autoconfig_url": "data:text/javascript,"
+        + quote(blocking_pac_script(blocked_hosts, proxy, bypass_hosts)),
+    }
+
+
+def process_tree_memory(pid: int, proc_dir: Path = Path("/proc")) -> float | None:
+    """Resident memory of a process and of its descendants, in MB.
+
+    Firefox runs the pages in child processes: they count as well. Linux only.
+
+    Args:
+        pid (int): the process ID, eg: the "moz:processID" capability of a Firefox session
+        proc_dir (Path): the proc filesystem
+
+    Returns:
+        float | None: the memory, or None if it cannot be measured
+    """
+    if not (proc_dir / str(pid)).exists():
+        return None
+    children: Dict[int, List[int]] = defaultdict(list)
+    for stat_path in proc_dir.glob("[0-9]*/stat"):
+        try:
+            # The fields after the command name: state, parent PID...
+            fields = stat_path.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children[int(fields[1])].append(int(stat_path.parent.name))
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        process = pending.pop()
+        try:
+            status = (proc_dir / str(process) / "status").read_text()
+        except OSError:
+            # The process just ended
+            continue
+        match = re.search(r"^VmRSS:\s+(\d+) kB", status, re.MULTILINE)
+        if match:
+            total_kb += int(match.group(1))
+        pending.extend(children.get(process, []))
+    return total_kb / 1024
+
+
+class PageLoadStats:
+    """Load time and bytes transferred of the search pages. May be shared by several bots."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (load time in seconds, bytes transferred)
+        self.page_loads: List[Tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.page_loads)
+
+    def record(self, url: str, load_time: float, transferred_bytes: int) -> None:
+        with self._lock:
+            self.page_loads.append((load_time, transferred_bytes))
+        logger.debug(
+            f"Page loaded in {load_time:.1f}s, {transferred_bytes / 1024:.0f} KB transferred. URL: {url}"
+        )
+
+    @property
+    def average_load_time(self) -> float:
+        """Average load time of a page, in seconds."""
+        if not self.page_loads:
+            return 0.0
+        return sum(load_time for load_time, _ in self.page_loads) / len(self)
+
+    @property
+    def average_transferred_bytes(self) -> float:
+        """Average bytes transferred by a page."""
+        if not self.page_loads:
+            return 0.0
+        return sum(size for _, size in self.page_loads) / len(self)
+
+    def log_stats(self, lean_browsing: bool) -> None:
+        """Log the average load time and size of a page.
+
+        Args:
+            lean_browsing (bool): whether the lean browsing mode was on, to compare the runs
+        """
+        if self.page_loads:
+            logger.info(
+                f"Page loads (lean browsing {'on' if lean_browsing else 'off'}): {len(self)} page(s), "
+                f"{self.average_load_time:.1f}s and {self.average_transferred_bytes / 1024:.0f} KB per page on average."
+            )
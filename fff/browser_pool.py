@@ -0,0 +1,313 @@
+"""
+Keep warmed web browsers alive between runs, and lend them to the bots.
+
+``python -m fff --serve-browsers`` launches MAX_PARALLEL_BROWSERS web browsers, with the
+website loaded and its cookies disclaimer closed, and lends them over a local TCP socket.
+With the BROWSER_POOL setting, each bot borrows one of them instead of launching its own
+web browser: a search starts scraping right away.
+
+A lease is a connection, with a JSON object per line:
+
+- the client sends ``{"command": "acquire"}``, and gets the WebDriver session to attach to,
+  or ``{"error": "..."}`` if the pool has no web browser left
+- once done, it sends ``{"command": "release", "pages": 12, "broken": false}``
+
+A web browser is replaced once it has loaded BROWSER_POOL_MAX_PAGES pages, once it uses
+more than BROWSER_POOL_MAX_MEMORY, or when it does not respond anymore.
+"""
+import json
+import socket
+import socketserver
+import threading
+from queue import Empty, Queue
+from time import sleep
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Tuple
+
+from fff.browser import process_tree_memory
+from fff.config import Settings
+from fff.utils.logging import logger
+
+if TYPE_CHECKING:
+    from fff.bot import Bot
+
+# Attempts to launch a web browser replacing a retired one, before giving up on it
+RELAUNCH_ATTEMPTS = 3
+# Seconds between two launch attempts
+RELAUNCH_BACKOFF = 5.0
+# How often a client waiting for a free web browser checks that the pool still has one
+IDLE_POLL_INTERVAL = 1.0
+
+
+class BrowserLease(NamedTuple):
+    """A WebDriver session lent by the pool."""
+
+    executor_url: str  # URL of the WebDriver server (geckodriver)
+    session_id: str
+    capabilities: Dict[str, Any]
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Parse a "host:port" address."""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class BrowserPoolClient:
+    """Borrow a web browser from the pool, for the lifetime of the connection."""
+
+    def __init__(self, address: str):
+        """
+        Args:
+            address (str): "host:port" of the pool
+
+        Raises:
+            OSError: if the pool cannot be reached
+        """
+        self.connection = socket.create_connection(parse_address(address))
+        self.file = self.connection.makefile("rw", encoding="utf-8")
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(message) + "\n")
+        self.file.flush()
+
+    def acquire(self) -> BrowserLease:
+        """Wait for a free web browser, and borrow it.
+
+        Raises:
+            ConnectionError: if the pool closed the connection, or has no web browser left
+        """
+        self._send({"command": "acquire"})
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The browser pool closed the connection.")
+        message = json.loads(line)
+        if "error" in message:
+            raise ConnectionError(message["error"])
+        return BrowserLease(**message)
+
+    def release(self, pages: int, broken: bool = False) -> None:
+        """Give the web browser back, and close the connection.
+
+        Args:
+            pages (int): how many pages it loaded
+            broken (bool): whether it does not respond anymore
+        """
+        try:
+            self._send({"command": "release", "pages": pages, "broken": broken})
+        except OSError as e:
+            logger.debug(f"Cannot release the borrowed web browser: {e}")
+        finally:
+            self.file.close()
+            self.connection.close()
+
+
+class PooledBrowser:
+    """A warmed web browser of the pool."""
+
+    def __init__(self, bot: "Bot"):
+        self.bot = bot
+        self.nb_pages = 0
+
+    def lease(self) -> BrowserLease:
+        driver = self.bot.driver
+        return BrowserLease(
+            executor_url=driver.command_executor._url,
+            session_id=driver.session_id,
+            capabilities=driver.capabilities,
+        )
+
+    def memory(self) -> float | None:
+        """Memory of the web browser, in MB, if it can be measured."""
+        pid = self.bot.driver.capabilities.get("moz:processID")
+        return process_tree_memory(int(pid)) if pid else None
+
+    def reset(self) -> bool:
+        """Close the tabs opened by the borrower.
+
+        Returns:
+            bool: whether the web browser still responds
+        """
+        try:
+            driver = self.bot.driver
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            return True
+        except Exception as e:
+            logger.debug(f"The web browser does not respond anymore: {e}")
+            return False
+
+
+class ReusableTCPServer(socketserver.ThreadingTCPServer):
+    """A threaded TCP server which can listen again on its address right after a restart."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class BrowserPoolServer:
+    """Launch warmed web browsers, and lend them to the bots over a local TCP socket."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        bot_factory: Callable[[], "Bot"] | None = None,
+    ):
+        """
+        Args:
+            settings (Settings): the pool settings (size, address, recycling thresholds)
+            bot_factory (Callable[[], Bot] | None): launches a web browser, loaded with the
+                website. Default to a Firefox bot.
+        """
+        self.settings = settings
+        self.bot_factory = (
+            bot_factory if bot_factory is not None else self._default_bot_factory
+        )
+        self.idle: "Queue[PooledBrowser]" = Queue()
+        self.browsers: List[PooledBrowser] = []
+        # Web browsers lent or idle, or being replaced. Those which cannot be replaced are lost.
+        self.size = 0
+        self._lock = threading.Lock()
+        self.nb_leases = 0
+        self.nb_replaced = 0
+        pool = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                pool._serve(self.rfile, self.wfile)
+
+        self.server = ReusableTCPServer(
+            parse_address(settings.BROWSER_POOL_ADDRESS), Handler
+        )
+
+    def _default_bot_factory(self) -> "Bot":
+        # Imported on first use: selenium is only needed to actually scrap
+        from fff.bot import Bot
+
+        return Bot(settings=self.settings.copy(update={"BROWSER_POOL": False}))
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def _launch(self) -> PooledBrowser:
+        bot = self.bot_factory()
+        if not bot.started:
+            bot.start()
+        browser = PooledBrowser(bot)
+        with self._lock:
+            self.browsers.append(browser)
+        return browser
+
+    def _retire(self, browser: PooledBrowser) -> None:
+        with self._lock:
+            self.browsers.remove(browser)
+        try:
+            browser.bot.quit()
+        except Exception as e:
+            logger.debug(f"Cannot close the web browser: {e}")
+
+    def _take_back(self, browser: PooledBrowser, pages: int, broken: bool) -> None:
+        """Put a returned web browser back in the pool, or replace it."""
+        browser.nb_pages += pages
+        memory = browser.memory()
+        reason = None
+        if broken or not browser.reset():
+            reason = "it does not respond anymore"
+        elif browser.nb_pages >= self.settings.BROWSER_POOL_MAX_PAGES:
+            reason = f"it loaded {browser.nb_pages} pages"
+        elif memory is not None and memory > self.settings.BROWSER_POOL_MAX_MEMORY:
+            reason = f"it uses {memory:.0f} MB"
+        if reason is None:
+            self.idle.put(browser)
+            return
+        logger.info(f"Replacing a web browser of the pool, as {reason}.")
+        self._retire(browser)
+        self.nb_replaced += 1
+        for attempt in range(1, RELAUNCH_ATTEMPTS + 1):
+            try:
+                self.idle.put(self._launch())
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Attempt {attempt}/{RELAUNCH_ATTEMPTS} to launch a web browser for the pool failed: {e}"
+                )
+            if attempt < RELAUNCH_ATTEMPTS:
+                sleep(RELAUNCH_BACKOFF)
+        with self._lock:
+            self.size -= 1
+        logger.error(
+            f"Cannot replace a web browser: the pool has {self.size} web browser(s) left."
+        )
+
+    def _wait_idle(self) -> PooledBrowser | None:
+        """Wait for a free web browser, or None if the pool has none left."""
+        while True:
+            try:
+                return self.idle.get(timeout=IDLE_POLL_INTERVAL)
+            except Empty:
+                with self._lock:
+                    if self.size <= 0:
+                        return None
+
+    def _serve(self, rfile, wfile) -> None:
+        """Serve a lease: lend a web browser, then take it back."""
+        request = rfile.readline()
+        if not request or json.loads(request).get("command") != "acquire":
+            return
+        browser = self._wait_idle()
+        if browser is None:
+            # The client launches its own web browser instead.
+            error = {"error": "The browser pool has no web browser left."}
+            wfile.write((json.dumps(error) + "\n").encode())
+            wfile.flush()
+            return
+        with self._lock:
+            self.nb_leases += 1
+        pages, broken = 0, False
+        try:
+            wfile.write((json.dumps(browser.lease()._asdict()) + "\n").encode())
+            wfile.flush()
+            # Until the client releases the web browser, or disconnects
+            release = rfile.readline()
+            if release:
+                message = json.loads(release)
+                pages = int(message.get("pages", 0))
+                broken = bool(message.get("broken", False))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Lost a client of the browser pool: {e}")
+        finally:
+            self._take_back(browser, pages, broken)
+
+    def start(self) -> None:
+        """Launch the web browsers, and listen to the bots in a background thread."""
+        for _ in range(self.settings.MAX_PARALLEL_BROWSERS):
+            self.idle.put(self._launch())
+            self.size += 1
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(
+            f"Browser pool: {len(self.browsers)} web browser(s) ready on {self.address}"
+        )
+
+    def stop(self) -> None:
+        """Stop listening, and close the web browsers."""
+        self.server.shutdown()
+        self.server.server_close()
+        for browser in list(self.browsers):
+            self._retire(browser)
+        logger.info(
+            f"Browser pool: {self.nb_leases} lease(s), {self.nb_replaced} web browser(s) replaced."
+        )
+
+    def serve_forever(self) -> None:
+        """Lend the web browsers until interrupted (Ctrl+C)."""
+        self.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
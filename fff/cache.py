@@ -0,0 +1,208 @@
+"""Persistent cache of the flight trips found for each search URL."""
+import json
+import sqlite3
+from datetime import timedelta
+from pathlib import Path
+from time import time
+from typing import List
+
+from fff.schemas.flight_trip import FlightTrip, unique_flight_trips
+from fff.utils.logging import logger
+
+# What a URL tells about a flight trip, at the time it is scraped
+FARE_FIELDS = {"price", "direct_link"}
+
+
+class ResultCache:
+    """
+    Cache the flight trips found for each search URL in a SQLite database.
+
+    Fares for dates months away don't change minute to minute: a URL scraped less than
+    ``ttl`` ago doesn't need to be scraped again. When the database grows over ``max_size``,
+    the oldest entries are evicted.
+
+    The flight trips are stored once, by ``FlightTrip.trip_id``: a trip found on several
+    URLs (overlapping date windows) is shared by their entries. Its fare and booking link
+    are stored by entry, as each URL may have found it at another fare.
+    """
+
+    def __init__(self, path: Path, ttl: timedelta, max_size: int):
+        """
+        Args:
+            path (Path): the SQLite database file. It is created if it doesn't exist.
+            ttl (timedelta): how long the results of a URL stay fresh
+            max_size (int): maximum size of the cached flight trips, in bytes
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        columns = [
+            row[1] for row in self.connection.execute("PRAGMA table_info(results)")
+        ]
+        result_trip_columns = [
+            row[1] for row in self.connection.execute("PRAGMA table_info(result_trips)")
+        ]
+        if "flight_trips" in columns or (
+            result_trip_columns and "fare" not in result_trip_columns
+        ):
+            # Cache of an older version: start afresh.
+            self.connection.executescript(
+                """
+                DROP TABLE IF EXISTS results;
+                DROP TABLE IF EXISTS result_trips;
+                DROP TABLE IF EXISTS trips;
+                """
+            )
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                nb_results INTEGER NOT NULL,
+                scraping_time REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS result_trips (
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                trip_id TEXT NOT NULL,
+                fare TEXT NOT NULL,
+                PRIMARY KEY (url, position)
+            );
+            CREATE INDEX IF NOT EXISTS result_trips_trip ON result_trips (trip_id);
+            CREATE TABLE IF NOT EXISTS trips (
+                trip_id TEXT PRIMARY KEY,
+                flight_trip TEXT NOT NULL
+            );
+            """
+        )
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+        # Scraping time of the URLs found in the cache, in seconds
+        self.saved_time = 0.0
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return time() - created_at < self.ttl.total_seconds()
+
+    def get(self, url: str, nb_results: int) -> List[FlightTrip] | None:
+        """Get the flight trips of a URL, if they are still fresh.
+
+        Args:
+            url (str): the search URL
+            nb_results (int): how many flight trips were asked for this URL
+
+        Returns:
+            List[FlightTrip] | None: the cached flight trips, or None if the URL must be scraped
+        """
+        row = self.connection.execute(
+            "SELECT created_at, nb_results, scraping_time FROM results WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is not None:
+            created_at, cached_nb_results, scraping_time = row
+            # Fewer results may have been kept when the URL was scraped.
+            if self._is_fresh(created_at) and cached_nb_results >= nb_results:
+                self.hits += 1
+                self.saved_time += scraping_time
+                logger.debug(f"Results found in the cache for URL: {url}")
+                rows = self.connection.execute(
+                    """
+                    SELECT flight_trip, fare FROM result_trips JOIN trips USING (trip_id)
+                    WHERE url = ? ORDER BY position LIMIT ?
+                    """,
+                    (url, nb_results),
+                ).fetchall()
+                return [
+                    FlightTrip.parse_obj(
+                        {**json.loads(flight_trip), **json.loads(fare)}
+                    )
+                    for flight_trip, fare in rows
+                ]
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        url: str,
+        flight_trips: List[FlightTrip],
+        nb_results: int,
+        scraping_time: float,
+    ) -> None:
+        """Store the flight trips found for a URL.
+
+        Args:
+            url (str): the search URL
+            flight_trips (List[FlightTrip]): the flight trips found
+            nb_results (int): how many flight trips were asked for this URL
+            scraping_time (float): how long it took to scrap the URL, in seconds
+        """
+        flight_trips = unique_flight_trips(flight_trips)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (url, time(), nb_results, scraping_time),
+        )
+        self.connection.execute("DELETE FROM result_trips WHERE url = ?", (url,))
+        self.connection.executemany(
+            "INSERT INTO result_trips VALUES (?, ?, ?, ?)",
+            [
+                (url, position, trip.trip_id, trip.json(include=FARE_FIELDS))
+                for position, trip in enumerate(flight_trips)
+            ],
+        )
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO trips VALUES (?, ?)",
+            [(trip.trip_id, trip.json(exclude=FARE_FIELDS)) for trip in flight_trips],
+        )
+        self.connection.commit()
+        self.evict()
+
+    def _delete(self, urls: List[str]) -> None:
+        """Delete the entries of some URLs, and the flight trips no other entry shares."""
+        self.connection.executemany(
+            "DELETE FROM results WHERE url = ?", [(url,) for url in urls]
+        )
+        self.connection.executemany(
+            "DELETE FROM result_trips WHERE url = ?", [(url,) for url in urls]
+        )
+        self.connection.execute(
+            "DELETE FROM trips WHERE trip_id NOT IN (SELECT trip_id FROM result_trips)"
+        )
+
+    def _size(self) -> int:
+        return self.connection.execute(
+            """
+            SELECT (SELECT COALESCE(SUM(LENGTH(flight_trip)), 0) FROM trips)
+                + (SELECT COALESCE(SUM(LENGTH(fare)), 0) FROM result_trips)
+            """
+        ).fetchone()[0]
+
+    def evict(self) -> None:
+        """Remove the expired entries, then the oldest ones while the cache is too big."""
+        expired_urls = self.connection.execute(
+            "SELECT url FROM results WHERE created_at <= ?",
+            (time() - self.ttl.total_seconds(),),
+        ).fetchall()
+        self._delete([url for (url,) in expired_urls])
+        if self._size() > self.max_size:
+            oldest_urls = self.connection.execute(
+                "SELECT url FROM results ORDER BY created_at, rowid"
+            ).fetchall()
+            for (url,) in oldest_urls:
+                # The shared flight trips are only freed with their last entry.
+                self._delete([url])
+                if self._size() <= self.max_size:
+                    break
+        self.connection.commit()
+
+    def log_stats(self) -> None:
+        """Log the cache hit ratio and the time saved."""
+        nb_lookups = self.hits + self.misses
+        if nb_lookups:
+            logger.info(
+                f"Result cache: {self.hits}/{nb_lookups} URL(s) found (hit ratio {self.hits / nb_lookups:.0%}), "
+                f"saving about {self.saved_time:.0f}s of scraping."
+            )
+
+    def close(self) -> None:
+        self.connection.close()
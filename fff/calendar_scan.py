@@ -0,0 +1,111 @@
+"""
+Fast scan of the flexible calendars: read the price of every departure date, without
+clicking on them.
+"""
+from datetime import date, timedelta
+from typing import Dict, List
+
+from fff.parser import CalendarPrice
+from fff.planner import PlannedSearch
+from fff.schemas.calendar_cell import CalendarCell
+from fff.utils.logging import logger
+
+
+def calendar_first_date(
+    url: str, planned_search: PlannedSearch, calendar_prices: List[CalendarPrice]
+) -> date:
+    """The date of the first cell of a calendar, told by the days displayed in the cells.
+
+    The calendar may start before the searched period, eg: on the first day of its month.
+    Its cells are consecutive days, and it shows the start date of the period.
+
+    Args:
+        url (str): the search URL, for logging purposes
+        planned_search (PlannedSearch): the period searched by the URL
+        calendar_prices (List[CalendarPrice]): the calendar prices found on the page
+
+    Returns:
+        date: the latest date, up to the start date of the period, matching the day of
+            every cell. The start date of the period if the cells don't show their day.
+    """
+    days = [(c.index, c.day) for c in calendar_prices if c.day is not None]
+    if not days:
+        return planned_search.start_date
+    for offset in range(max(index for index, _ in days) + 1):
+        first_date = planned_search.start_date - timedelta(days=offset)
+        if all((first_date + timedelta(days=index)).day == day for index, day in days):
+            return first_date
+    logger.warning(
+        f"The days of the calendar don't match its search period, dated from its start date. URL: {url}"
+    )
+    return planned_search.start_date
+
+
+def calendar_cells(
+    url: str,
+    route: str,
+    planned_search: PlannedSearch,
+    calendar_prices: List[CalendarPrice],
+) -> List[CalendarCell]:
+    """Date the calendar prices of a search URL.
+
+    The calendar cells are consecutive departure dates, dated by the day they display
+    (see ``calendar_first_date``). The cells out of the searched period are ignored.
+
+    Args:
+        url (str): the search URL
+        route (str): the route searched by the URL
+        planned_search (PlannedSearch): the period and night window searched by the URL
+        calendar_prices (List[CalendarPrice]): the calendar prices found on the page
+
+    Returns:
+        List[CalendarCell]: the priced cells of the calendar
+    """
+    first_date = calendar_first_date(url, planned_search, calendar_prices)
+    cells: List[CalendarCell] = []
+    for calendar_price in calendar_prices:
+        departure_date = first_date + timedelta(days=calendar_price.index)
+        if not planned_search.start_date <= departure_date <= planned_search.end_date:
+            continue
+        cells.append(
+            CalendarCell(
+                url=url,
+                route=route,
+                departure_date=departure_date,
+                date_window=planned_search.date_window,
+                index=calendar_price.index,
+                price=calendar_price.price,
+            )
+        )
+    return cells
+
+
+def cheapest_cells(cells: List[CalendarCell], nb_cells: int) -> List[CalendarCell]:
+    """The N cheapest cells of all the calendars, from the cheapest."""
+    return sorted(
+        (cell for cell in cells if cell.price.amount is not None),
+        key=lambda cell: cell.price.amount,
+    )[0:nb_cells]
+
+
+def cells_by_url(cells: List[CalendarCell]) -> Dict[str, List[CalendarCell]]:
+    """Group the cells by search URL, so each page is loaded only once."""
+    result: Dict[str, List[CalendarCell]] = {}
+    for cell in cells:
+        result.setdefault(cell.url, []).append(cell)
+    return result
+
+
+def format_calendar_table(cells: List[CalendarCell]) -> str:
+    """A compact table of the cells, by departure date then night window."""
+    return "\n".join(
+        str(cell)
+        for cell in sorted(
+            cells,
+            key=lambda cell: (
+                cell.departure_date,
+                cell.date_window.min_nights,
+                cell.route,
+            ),
+        )
+    )
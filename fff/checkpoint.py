@@ -0,0 +1,84 @@
+"""Checkpoint journal of a search, to resume it after a crash."""
+import json
+import os
+from pathlib import Path
+from time import time
+from typing import Dict, List
+
+from fff.schemas.flight_trip import FlightTrip
+from fff.utils.logging import logger
+
+
+class CheckpointJournal:
+    """
+    Record the outcome of each search URL as soon as it is known, one JSON line per URL.
+
+    When a run is interrupted, the next one can be resumed from the journal:
+    only the URLs which are missing or failed are scraped again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def reset(self) -> None:
+        """Start a new journal, forgetting the previous run."""
+        self.path.write_text("")
+
+    def _append(self, entry: Dict) -> None:
+        with self.path.open("a") as journal:
+            journal.write(json.dumps(entry) + "\n")
+            journal.flush()
+            # The journal must survive a crash of the whole process
+            os.fsync(journal.fileno())
+
+    def record_success(
+        self, url: str, flight_trips: List[FlightTrip], scraping_time: float
+    ) -> None:
+        self._append(
+            {
+                "url": url,
+                "status": "done",
+                "time": time(),
+                "scraping_time": scraping_time,
+                "flight_trips": [json.loads(trip.json()) for trip in flight_trips],
+            }
+        )
+
+    def record_failure(self, url: str, error: Exception) -> None:
+        self._append(
+            {
+                "url": url,
+                "status": "failed",
+                "time": time(),
+                "error": str(error),
+            }
+        )
+
+    def completed(self) -> Dict[str, List[FlightTrip]]:
+        """Read the flight trips of the URLs successfully scraped.
+
+        Returns:
+            Dict[str, List[FlightTrip]]: the flight trips of each successful URL
+        """
+        results: Dict[str, List[FlightTrip]] = {}
+        if not self.path.exists():
+            return results
+        with self.path.open() as journal:
+            for line_number, line in enumerate(journal, start=1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be truncated if the process was killed while writing it.
+                    logger.warning(
+                        f"Ignoring invalid line {line_number} of the checkpoint journal {self.path}"
+                    )
+                    continue
+                if entry["status"] == "done":
+                    results[entry["url"]] = [
+                        FlightTrip.parse_obj(trip) for trip in entry["flight_trips"]
+                    ]
+                else:
+                    # The last outcome of a URL wins
+                    results.pop(entry["url"], None)
+        return results
@@ -4,9 +4,18 @@ from datetime import date
 from functools import lru_cache
 from pathlib import Path
 
-from pydantic import BaseSettings, Field, NonNegativeFloat, NonNegativeInt
+from pydantic import (
+    BaseSettings,
+    Field,
+    NonNegativeFloat,
+    NonNegativeInt,
+    PositiveFloat,
+    PositiveInt,
+    validator,
+)
 from pydantic.datetime_parse import parse_date
 
+from fff import APP_DESCRIPTION, APP_NAME
 from fff.schemas.stop import MaxNumberOfStops
 
 # Project root directory
@@ -18,18 +27,71 @@ class Settings(BaseSettings):
     Application settings. Can be overriden by environment variables.
     """
 
-    APP_NAME: str = "Flexible Flight Finder"
-    APP_DESCRIPTION: str = "Find the cheapest flight with more flexible dates than online flight comparators."
+    APP_NAME: str = APP_NAME
+    APP_DESCRIPTION: str = APP_DESCRIPTION
 
     ### For debugging and development only.
     # Application log level. Can be any python log level: NOTSET, DEBUG, INFO, WARNING, ERROR, FATAL.
     LOG_LEVEL: str = "INFO"
     HEADLESS_MODE: bool = True  # Run without browser GUI
+    LEAN_BROWSING: bool = False  # Don't load images, fonts, ads and trackers
 
     ### Comparator website URL ###
     WEBSITE_URL: str = "https://www.kayak.com"  # your locale Kayak website.
     WEBSITE_LANGUAGE: str = "en"  # needed to parse dates correctly
     NUMBER_OF_RESULTS: NonNegativeInt = 3  # How many flight search results to keep
+    MAX_PARALLEL_BROWSERS: PositiveInt = (
+        1  # How many web browsers scrap the website at the same time
+    )
+    PRUNE_DEPARTURE_DATES: bool = False  # Skip the dates that can't beat the results
+    PREFETCH_TABS: NonNegativeInt = 0  # Next URLs to open in background tabs
+    REQUESTS_PER_MINUTE: PositiveFloat = 20  # Page loads, for all the browsers
+    SLOW_PAGE_LOAD: PositiveFloat = 30  # In seconds. Slower pages reduce concurrency
+
+    ### Result cache ###
+    CACHE_ENABLED: bool = True  # Don't scrap again the URLs scraped recently
+    CACHE_PATH: Path = PROJECT_DIR / "cache" / "results.sqlite3"
+    CACHE_TTL: NonNegativeFloat = 6  # In hours. How long the results stay fresh
+    CACHE_MAX_SIZE: NonNegativeFloat = 50  # In MB. The oldest results go first
+
+    ### Export ###
+    # Comma-separated files to export the flight trips to: .jsonl, .csv or .parquet
+    EXPORT_PATHS: str = ""
+
+    ### Failures ###
+    URL_MAX_ATTEMPTS: PositiveInt = 3  # How many times a URL is scraped before failing
+    URL_RETRY_BACKOFF: NonNegativeFloat = 10  # In seconds, doubled at each new attempt
+    CHECKPOINT_PATH: Path = PROJECT_DIR / "cache" / "checkpoint.jsonl"
+    URL_TIMEOUT: PositiveFloat = 300  # In seconds, for each attempt (async search)
+    # Stop once the results did not improve for N URLs in a row. 0 to scrap every URL.
+    CONVERGENCE_PATIENCE: NonNegativeInt = 0
+
+    ### Watch mode ###
+    HISTORY_PATH: Path = PROJECT_DIR / "cache" / "history.sqlite3"
+    WATCH_INTERVAL: PositiveFloat = 60  # In minutes, between two searches
+    WATCH_ALERT_THRESHOLD: NonNegativeFloat = 5  # In percent, below the minimum fare
+
+    ### Browser pool ###
+    # Borrow the browsers of `python -m fff --serve-browsers`
+    BROWSER_POOL: bool = False
+    BROWSER_POOL_ADDRESS: str = "127.0.0.1:4445"  # Where the browser pool listens
+    # Pages loaded before a browser is replaced
+    BROWSER_POOL_MAX_PAGES: PositiveInt = 200
+    BROWSER_POOL_MAX_MEMORY: PositiveFloat = 1500  # In MB. Bigger browsers are replaced
+
+    ### Price matrix ###
+    # Every price seen by the latest search, for `python -m fff --price-matrix`
+    PRICE_MATRIX_PATH: Path | None = None
+
+    ### Distributed search ###
+    # Shared by `--coordinate` and the `--worker` processes: a SQLite file path
+    WORK_QUEUE: str = str(PROJECT_DIR / "cache" / "queue.sqlite3")
+    # In seconds. Then another worker takes the URL
+    WORK_QUEUE_LEASE: PositiveFloat = 600
+
+    ### Instrumentation ###
+    TRACE_PATH: Path | None = None  # Chrome trace JSON of the time spent per phase
+    METRICS_PATH: Path | None = None  # Prometheus textfile of the phase durations
 
     ### Trip dates and destinations ###
     FROM_AIRPORT: str = "PAR"
@@ -66,6 +128,15 @@ class Settings(BaseSettings):
         case_sensitive = True
         use_enum_values = True
 
+    @validator("MAX_NIGHTS")
+    def max_nights_above_min_nights(cls, max_nights, values):
+        min_nights = values.get("MIN_NIGHTS")
+        if min_nights is not None and max_nights < min_nights:
+            raise ValueError(
+                f"Please specify a valid number of nights at destination: MAX_NIGHTS (={max_nights}) should be higher or equal than MIN_NIGHTS (={min_nights})"
+            )
+        return max_nights
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -75,14 +146,11 @@ def get_settings() -> Settings:
     Getting the settings via a function is a dependency injection to facilitate testing.
     LRU cached to avoid reading the .env file at every call.
     """
-    settings = Settings()
-
-    if settings.MAX_NIGHTS < settings.MIN_NIGHTS:
-        raise ValueError(
-            f"Please specify a valid number of nights at destination: MAX_NIGHTS (={settings.MAX_NIGHTS}) should be higher or equal than MIN_NIGHTS (={settings.MIN_NIGHTS})"
-        )
-
-    return settings
+    return Settings()
 
 
-settings = get_settings()
+def __getattr__(name: str):
+    """``fff.config.settings``: the environment settings, only read on first use."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,273 @@
+"""
+Search with several machines (or processes), sharing a work queue.
+
+- ``python -m fff --coordinate`` generates the search URLs, publishes them with the search
+  settings to the WORK_QUEUE, then merges the flight trips reported by the workers into
+  the global top N (and the checkpoint journal, cache, exports).
+- ``python -m fff --worker``, on any number of machines, claims the URLs one at a time and
+  scraps them with its own web browser, until the queue is drained.
+
+The workers search with the settings of the coordinator, except for their machine-local
+settings (``WORKER_SETTINGS``): eg: each machine can run its web browser in headless mode
+or not, or borrow it from its own browser pool.
+"""
+import json
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, Callable, Dict, Iterator
+
+from fff.config import Settings
+from fff.exceptions import ScrapingError
+from fff.merger import Pruner, SearchResults
+from fff.session import SearchSession
+from fff.tracing import tracer
+from fff.url_generator import UrlGenerator
+from fff.utils.logging import logger
+from fff.work_queue import MAX_CLAIMS, WorkItem, WorkQueue
+
+if TYPE_CHECKING:
+    from fff.bot import Bot
+
+# Settings of the machine running a worker, rather than of the search
+WORKER_SETTINGS = {
+    "LOG_LEVEL",
+    "HEADLESS_MODE",
+    "LEAN_BROWSING",
+    "REQUESTS_PER_MINUTE",
+    "SLOW_PAGE_LOAD",
+    "URL_MAX_ATTEMPTS",
+    "URL_RETRY_BACKOFF",
+    "BROWSER_POOL",
+    "BROWSER_POOL_ADDRESS",
+    "BROWSER_POOL_MAX_PAGES",
+    "BROWSER_POOL_MAX_MEMORY",
+    "WORK_QUEUE",
+    "WORK_QUEUE_LEASE",
+    "TRACE_PATH",
+    "METRICS_PATH",
+}
+# How often the queue is polled, in seconds
+POLL_INTERVAL = 1.0
+
+
+def worker_settings(search_settings: str, local_settings: Settings) -> Settings:
+    """The settings of the published search, with the machine-local settings of the worker.
+
+    Args:
+        search_settings (str): the settings published by the coordinator, as JSON
+        local_settings (Settings): the settings of the worker machine
+    """
+    return Settings(
+        **{
+            **json.loads(search_settings),
+            **local_settings.dict(include=WORKER_SETTINGS),
+        }
+    )
+
+
+def _default_bot_factory(settings: Settings) -> "Bot":
+    # Imported on first use: selenium is only needed to actually scrap
+    from fff.bot import Bot
+
+    bot = Bot(settings=settings)
+    # Same URLs as the coordinator: the bot knows the route and dates of each one.
+    bot.url_generator.generate_urls()
+    return bot
+
+
+def run_worker(
+    queue: WorkQueue,
+    settings: Settings,
+    bot_factory: Callable[[Settings], "Bot"] | None = None,
+    worker_id: str | None = None,
+    wait_for_search: float = 60,
+) -> int:
+    """Scrap the URLs of the queue with a web browser, until the queue is drained.
+
+    Args:
+        queue (WorkQueue): the work queue of the search
+        settings (Settings): the settings of this machine
+        bot_factory (Callable[[Settings], Bot] | None): creates the bot, from the search
+            settings. Default to a Firefox bot.
+        worker_id (str | None): identifies the worker in the queue. Default to the host name
+            and the process ID.
+        wait_for_search (float): how long to wait for a search to be published, in seconds
+
+    Returns:
+        int: how many URLs the worker scraped
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    lease = settings.WORK_QUEUE_LEASE
+    deadline = perf_counter() + wait_for_search
+    while (search_settings := queue.search_settings()) is None:
+        if perf_counter() > deadline:
+            logger.warning(f"Worker {worker_id}: no search was published to the queue.")
+            return 0
+        sleep(POLL_INTERVAL)
+    settings = worker_settings(search_settings, settings)
+    bot = (bot_factory or _default_bot_factory)(settings)
+    # The top N of this worker only, to prune its departure dates
+    routes: Dict[str, str] = {}
+    search_results = SearchResults(
+        size=settings.NUMBER_OF_RESULTS, route_of=lambda url: routes[url]
+    )
+    pruner = Pruner(search_results.top_of) if settings.PRUNE_DEPARTURE_DATES else None
+    nb_scraped = 0
+    logger.info(f"Worker {worker_id}: scraping the URLs of the queue.")
+    try:
+        while True:
+            item = queue.claim(worker_id, lease=lease)
+            if item is None:
+                if queue.is_drained():
+                    break
+                # The other URLs are claimed: wait in case a worker drops one.
+                sleep(POLL_INTERVAL)
+                continue
+            routes[item.url] = item.route
+            if not bot.started:
+                bot.start()
+            url_start = perf_counter()
+            try:
+                with _renewing(queue, item, lease):
+                    result = bot.scrap_url(
+                        item.url, nb_results=settings.NUMBER_OF_RESULTS, pruner=pruner
+                    )
+            except ScrapingError as e:
+                logger.error(f"Worker {worker_id}: {e}")
+                queue.fail(item, f"{type(e.error).__name__}: {e.error}")
+                continue
+            scraping_time = perf_counter() - url_start
+            queue.complete(item, result, scraping_time)
+            search_results.extend(item.url, result.flight_trips)
+            nb_scraped += 1
+            logger.info(
+                f"Worker {worker_id}: URL scraped in {scraping_time:.1f}s ({nb_scraped} so far)"
+            )
+    finally:
+        bot.quit()
+        if pruner is not None:
+            pruner.log_stats()
+        tracer.report(settings.TRACE_PATH, settings.METRICS_PATH)
+    logger.info(
+        f"Worker {worker_id}: the queue is drained, {nb_scraped} URL(s) scraped."
+    )
+    return nb_scraped
+
+
+@contextmanager
+def _renewing(queue: WorkQueue, item: WorkItem, lease: float) -> Iterator[None]:
+    """Renew the lease of a URL in a background thread, while it is scraped."""
+    done = threading.Event()
+
+    def renew() -> None:
+        while not done.wait(lease / 3):
+            try:
+                queue.renew(item, lease)
+            except Exception as e:
+                logger.warning(f"Cannot renew the lease of {item.url}: {e}")
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def coordinate(
+    queue: WorkQueue,
+    settings: Settings,
+    read_cache: bool = True,
+    resume: bool = False,
+    idle_timeout: float | None = None,
+) -> SearchSession:
+    """Publish the URLs of a search to the queue, and merge the results of the workers.
+
+    Args:
+        queue (WorkQueue): the work queue shared with the workers
+        settings (Settings): the search settings
+        read_cache (bool): use the results of the URLs scraped recently, if the cache
+            is enabled
+        resume (bool): resume the previous run from its checkpoint journal
+        idle_timeout (float | None): give up on the URLs left once none finished for this
+            long, in seconds (eg: every worker is gone). They are reported as failed, for
+            a resumed search to scrap them. Default to MAX_CLAIMS leases.
+
+    Returns:
+        SearchSession: the search, with its results
+    """
+    start = perf_counter()
+    url_generator = UrlGenerator(settings=settings)
+    search_urls = url_generator.generate_urls()
+    session = SearchSession(
+        settings, url_generator, search_urls, read_cache=read_cache, resume=resume
+    )
+    urls = session.urls_to_scrap
+    queue.publish(
+        settings.json(exclude=WORKER_SETTINGS),
+        {url: str(url_generator.url_round_trips[url]) for url in urls},
+    )
+    print(
+        f"{len(urls)} URL(s) published to the work queue. Run 'python -m fff --worker' to scrap them."
+    )
+    if idle_timeout is None:
+        idle_timeout = MAX_CLAIMS * settings.WORK_QUEUE_LEASE
+    unfinished_urls = set(urls)
+    sequence = 0
+    last_finished = perf_counter()
+    try:
+        while unfinished_urls:
+            # The workers may all be gone: don't wait for them to give up on their URLs.
+            queue.expire()
+            finished_urls = queue.finished(after=sequence)
+            for finished in finished_urls:
+                unfinished_urls.discard(finished.url)
+                if finished.result is None:
+                    session.on_failure(
+                        finished.url,
+                        ScrapingError(
+                            finished.url,
+                            attempts=finished.claims * settings.URL_MAX_ATTEMPTS,
+                            error=RuntimeError(finished.error),
+                        ),
+                    )
+                else:
+                    session.on_result(
+                        finished.url, finished.result, finished.scraping_time
+                    )
+                sequence = finished.sequence
+            if finished_urls:
+                last_finished = perf_counter()
+                progress = queue.progress()
+                print(
+                    f"Scraping the website... [{len(urls) - len(unfinished_urls)}/{len(urls)} URL(s), {progress['claimed']} being scraped]"
+                )
+            elif perf_counter() - last_finished > idle_timeout:
+                logger.error(
+                    f"No URL finished for {idle_timeout:.0f}s: giving up on the {len(unfinished_urls)} URL(s) left. Are the workers running?"
+                )
+                for url in urls:
+                    if url in unfinished_urls:
+                        session.on_failure(
+                            url,
+                            ScrapingError(
+                                url,
+                                attempts=0,
+                                error=TimeoutError(
+                                    f"No worker reported it for {idle_timeout:.0f}s"
+                                ),
+                            ),
+                        )
+                break
+            else:
+                sleep(POLL_INTERVAL)
+    finally:
+        session.close()
+    logger.info(
+        f"{len(urls) - len(unfinished_urls)}/{len(urls)} URL(s) scraped by the workers in {perf_counter() - start:.1f}s."
+    )
+    return session
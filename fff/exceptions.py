@@ -0,0 +1,20 @@
+class ScrapingError(Exception):
+    """A search URL could not be scraped, even after several attempts."""
+
+    def __init__(self, url: str, attempts: int, error: Exception):
+        self.url = url
+        self.attempts = attempts
+        self.error = error
+        super().__init__(
+            f"Could not scrap URL after {attempts} attempt(s) ({type(error).__name__}: {error}). URL: {url}"
+        )
+
+
+class CaptchaError(Exception):
+    """The website displayed a captcha instead of the search results."""
+
+    def __init__(self, url: str):
+        self.url = url
+        super().__init__(
+            f"The website suspects a bot and displayed a captcha. URL: {url}"
+        )
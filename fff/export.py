@@ -0,0 +1,178 @@
+"""
+Export the flight trips as they are found, for other tools to analyse them.
+
+The format depends on the file extension:
+
+- ``.jsonl``: one JSON object per line
+- ``.csv``: one row per line, with a header
+- ``.parquet``: a columnar file. It needs the optional ``pyarrow`` package.
+
+The rows are written as soon as each search URL is done, so nothing is kept in memory
+and the file is readable while the search runs. The JSONL and CSV files are appended to,
+so they keep the rows of the previous runs (eg: of every ``--watch`` cycle). A Parquet
+file cannot be appended to: each run writes its own file.
+"""
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fff.schemas.flight_trip import FlightTrip
+
+# The columns of an exported flight trip
+EXPORT_FIELDS = [
+    "route",
+    "first_trip",
+    "departure_date",
+    "return_trip",
+    "return_date",
+    "price",
+    "currency",
+    "direct_link",
+    "search_link",
+    "source_url",
+]
+
+
+def trip_row(source_url: str, route: str, flight_trip: FlightTrip) -> Dict[str, Any]:
+    """The exported fields of a flight trip.
+
+    Args:
+        source_url (str): the search URL where the flight trip was found
+        route (str): the route searched by the URL, eg: "PAR-YUL"
+        flight_trip (FlightTrip): the flight trip
+
+    Returns:
+        Dict[str, Any]: the row, with the EXPORT_FIELDS keys
+    """
+    return {
+        "route": route,
+        "first_trip": str(flight_trip.first_trip) if flight_trip.first_trip else None,
+        "departure_date": flight_trip.first_trip_date.isoformat()
+        if flight_trip.first_trip_date
+        else None,
+        "return_trip": str(flight_trip.return_trip)
+        if flight_trip.return_trip
+        else None,
+        "return_date": flight_trip.return_trip_date.isoformat()
+        if flight_trip.return_trip_date
+        else None,
+        "price": None
+        if flight_trip.price.amount is None
+        else float(flight_trip.price.amount),
+        "currency": flight_trip.price.currency,
+        "direct_link": flight_trip.direct_link,
+        "search_link": flight_trip.search_link,
+        "source_url": source_url,
+    }
+
+
+class Exporter:
+    """Write flight trip rows to a file, as they come."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.nb_rows = 0
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self.nb_rows += len(rows)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesExporter(Exporter):
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.file = path.open("a", encoding="utf-8")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        super().write(rows)
+        for row in rows:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CsvExporter(Exporter):
+    def __init__(self, path: Path):
+        super().__init__(path)
+        is_new = not path.exists() or path.stat().st_size == 0
+        self.file = path.open("a", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=EXPORT_FIELDS)
+        if is_new:
+            self.writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        super().write(rows)
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetExporter(Exporter):
+    """
+    Write a row group per search URL. The file is only readable once closed.
+
+    If the file exists, the rows go to the next free ``<name>-<n>.parquet`` file instead:
+    read them all with ``pyarrow.parquet.read_table`` on the directory, or a glob.
+    """
+
+    def __init__(self, path: Path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                f"Exporting to {path} needs the pyarrow package: pip install pyarrow"
+            ) from e
+        run_path = path
+        run = 1
+        while run_path.exists():
+            run += 1
+            run_path = path.with_name(f"{path.stem}-{run}{path.suffix}")
+        super().__init__(run_path)
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                (field, pa.float64() if field == "price" else pa.string())
+                for field in EXPORT_FIELDS
+            ]
+        )
+        self.writer = pq.ParquetWriter(str(run_path), self.schema)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        super().write(rows)
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+EXPORTERS = {
+    ".jsonl": JsonLinesExporter,
+    ".csv": CsvExporter,
+    ".parquet": ParquetExporter,
+}
+
+
+def open_exporter(path: Path) -> Exporter:
+    """Open an exporter, depending on the file extension.
+
+    Raises:
+        ValueError: if the file extension is not supported
+    """
+    try:
+        exporter_class = EXPORTERS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Cannot export to {path}: the file extension must be one of {', '.join(EXPORTERS)}."
+        )
+    return exporter_class(path)
@@ -0,0 +1,283 @@
+"""Price history of the search URLs, to watch the fares over several runs."""
+import sqlite3
+from decimal import Decimal
+from pathlib import Path
+from time import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from fff.schemas.flight_trip import FlightTrip, unique_flight_trips
+from fff.utils.logging import logger
+
+# Relative change of the cheapest price of a URL between two scrapes, below which it is stable
+STABLE_PRICE_CHANGE = 0.02
+# A stable URL is checked 2, 4, then at most 8 times less often
+MAX_STABLE_BACKOFF = 3
+# How many scrapes of a URL are used to measure its volatility
+VOLATILITY_WINDOW = 5
+
+
+class UrlPriceStats(NamedTuple):
+    """How the cheapest price of a search URL changed over its last scrapes."""
+
+    last_observed_at: float
+    last_price: Decimal | None  # None if no flight trip was found
+    volatility: float  # (max - min) / min of the cheapest prices
+    stable_runs: int  # Scrapes in a row where the cheapest price did not change
+
+
+def _same_price(newer: Decimal | None, older: Decimal | None) -> bool:
+    if newer is None or older is None or older == 0:
+        return newer == older
+    return abs(newer - older) / older <= Decimal(str(STABLE_PRICE_CHANGE))
+
+
+class PriceHistory:
+    """
+    Time series of every flight trip scraped, in a SQLite database.
+
+    Each scrape of a URL is an observation, with the flight trips found then. The history
+    tells which URLs are worth scraping again: the volatile ones, and the ones close to the
+    top N. The stable ones are checked less and less often.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path (Path): the SQLite database file. It is created if it doesn't exist.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS observations (
+                url TEXT NOT NULL,
+                route TEXT NOT NULL,
+                observed_at REAL NOT NULL,
+                min_price TEXT
+            );
+            CREATE INDEX IF NOT EXISTS observations_url ON observations (url, observed_at);
+            CREATE TABLE IF NOT EXISTS prices (
+                url TEXT NOT NULL,
+                route TEXT NOT NULL,
+                observed_at REAL NOT NULL,
+                departure_date TEXT,
+                return_date TEXT,
+                price REAL,
+                currency TEXT,
+                flight_trip TEXT NOT NULL,
+                trip_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS prices_url ON prices (url, observed_at);
+            CREATE INDEX IF NOT EXISTS prices_route ON prices (route, price);
+            """
+        )
+        columns = [
+            row[1] for row in self.connection.execute("PRAGMA table_info(prices)")
+        ]
+        # Histories recorded before the trips were identified
+        if "trip_id" not in columns:
+            self.connection.execute("ALTER TABLE prices ADD COLUMN trip_id TEXT")
+            rows = self.connection.execute(
+                "SELECT rowid, flight_trip FROM prices"
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE prices SET trip_id = ? WHERE rowid = ?",
+                [
+                    (FlightTrip.parse_raw(flight_trip).trip_id, rowid)
+                    for rowid, flight_trip in rows
+                ],
+            )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS prices_trip ON prices (trip_id, observed_at)"
+        )
+        self.connection.commit()
+
+    def record(
+        self,
+        url: str,
+        route: str,
+        flight_trips: List[FlightTrip],
+        observed_at: float | None = None,
+    ) -> None:
+        """Append the flight trips found by a scrape of a URL.
+
+        Args:
+            url (str): the search URL
+            route (str): the route searched by the URL
+            flight_trips (List[FlightTrip]): the flight trips found
+            observed_at (float | None): timestamp of the scrape. Default to now.
+        """
+        observed_at = time() if observed_at is None else observed_at
+        prices = [t.price.amount for t in flight_trips if t.price.amount is not None]
+        self.connection.execute(
+            "INSERT INTO observations VALUES (?, ?, ?, ?)",
+            (url, route, observed_at, str(min(prices)) if prices else None),
+        )
+        self.connection.executemany(
+            "INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    url,
+                    route,
+                    observed_at,
+                    trip.first_trip_date.isoformat() if trip.first_trip_date else None,
+                    trip.return_trip_date.isoformat()
+                    if trip.return_trip_date
+                    else None,
+                    None if trip.price.amount is None else float(trip.price.amount),
+                    trip.price.currency,
+                    trip.json(),
+                    trip.trip_id,
+                )
+                for trip in unique_flight_trips(flight_trips)
+            ],
+        )
+        self.connection.commit()
+
+    def latest(self, url: str) -> List[FlightTrip] | None:
+        """The flight trips found by the last scrape of a URL, or None if it was never scraped."""
+        row = self.connection.execute(
+            "SELECT MAX(observed_at) FROM observations WHERE url = ?", (url,)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return [
+            FlightTrip.parse_raw(flight_trip)
+            for (flight_trip,) in self.connection.execute(
+                "SELECT flight_trip FROM prices WHERE url = ? AND observed_at = ? ORDER BY rowid",
+                (url, row[0]),
+            )
+        ]
+
+    def first_seen(self, flight_trip: FlightTrip) -> float | None:
+        """When a trip was first recorded, on any URL, or None if it never was."""
+        row = self.connection.execute(
+            "SELECT MIN(observed_at) FROM prices WHERE trip_id = ?",
+            (flight_trip.trip_id,),
+        ).fetchone()
+        return row[0]
+
+    def minimum_price(self, route: str) -> Decimal | None:
+        """The cheapest price ever recorded for a route."""
+        row = self.connection.execute(
+            "SELECT MIN(price) FROM prices WHERE route = ?", (route,)
+        ).fetchone()
+        return None if row[0] is None else Decimal(str(row[0]))
+
+    def url_stats(self, url: str) -> UrlPriceStats | None:
+        """How the cheapest price of a URL changed, or None if it was never scraped."""
+        rows = self.connection.execute(
+            "SELECT observed_at, min_price FROM observations WHERE url = ? ORDER BY observed_at DESC LIMIT ?",
+            (url, VOLATILITY_WINDOW),
+        ).fetchall()
+        if not rows:
+            return None
+        prices = [None if price is None else Decimal(price) for _, price in rows]
+        known_prices = [price for price in prices if price is not None]
+        volatility = (
+            float((max(known_prices) - min(known_prices)) / min(known_prices))
+            if known_prices and min(known_prices) > 0
+            else 0.0
+        )
+        stable_runs = 0
+        for newer, older in zip(prices, prices[1:]):
+            if not _same_price(newer, older):
+                break
+            stable_runs += 1
+        return UrlPriceStats(
+            last_observed_at=rows[0][0],
+            last_price=prices[0],
+            volatility=volatility,
+            stable_runs=stable_runs,
+        )
+
+    def plan(
+        self,
+        urls: List[str],
+        interval: float,
+        price_to_beat: Decimal | None,
+        now: float | None = None,
+    ) -> Tuple[List[str], Dict[str, List[FlightTrip]]]:
+        """Choose the URLs to scrap again.
+
+        The volatile URLs and the ones close to the top N are checked at every call, i.e. every
+        ``interval``. The re-check interval of the other ones doubles at each stable scrape.
+        The URLs never scraped are always due.
+
+        Args:
+            urls (List[str]): the search URLs
+            interval (float): the shortest re-check interval, in seconds
+            price_to_beat (Decimal | None): the price of the Nth best trip known, if any
+            now (float | None): the current timestamp. Default to now.
+
+        Returns:
+            Tuple[List[str], Dict[str, List[FlightTrip]]]: the URLs due, the most promising
+                first, and the latest flight trips of the URLs which are not due
+        """
+        now = time() if now is None else now
+        due: List[Tuple[Tuple[int, float], str]] = []
+        not_due: Dict[str, List[FlightTrip]] = {}
+        for url in urls:
+            stats = self.url_stats(url)
+            if stats is None:
+                due.append(((0, 0.0), url))
+                continue
+            close_to_top = (
+                price_to_beat is None
+                or stats.last_price is None
+                or stats.last_price
+                <= price_to_beat * (1 + Decimal(str(STABLE_PRICE_CHANGE)))
+            )
+            volatile = stats.volatility > STABLE_PRICE_CHANGE
+            backoff = (
+                1
+                if close_to_top or volatile
+                else 2 ** min(stats.stable_runs, MAX_STABLE_BACKOFF)
+            )
+            # Due if it would be late at the next check, in an interval
+            if now + interval - stats.last_observed_at >= interval * backoff:
+                due.append(((0 if close_to_top else 1, -stats.volatility), url))
+            else:
+                not_due[url] = self.latest(url) or []
+        due.sort(key=lambda entry: entry[0])
+        logger.info(
+            f"Price history: {len(due)}/{len(urls)} URL(s) to scrap again, "
+            f"the other ones did not change recently."
+        )
+        return [url for _, url in due], not_due
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def fare_drop_alert(
+    route: str,
+    flight_trips: List[FlightTrip],
+    previous_minimum: Decimal | None,
+    threshold: float,
+) -> str | None:
+    """An alert line if the cheapest flight trip beats the previous minimum of its route.
+
+    Args:
+        route (str): the route of the flight trips
+        flight_trips (List[FlightTrip]): the flight trips just found
+        previous_minimum (Decimal | None): the cheapest price recorded for this route
+        threshold (float): minimum price drop to alert, in percent
+
+    Returns:
+        str | None: the alert line, or None if there is nothing to alert
+    """
+    priced_trips = [t for t in flight_trips if t.price.amount is not None]
+    if previous_minimum is None or not priced_trips:
+        return None
+    cheapest = min(priced_trips, key=lambda t: t.price.amount)
+    amount: Decimal = cheapest.price.amount  # type: ignore[assignment]
+    drop = float((previous_minimum - amount) / previous_minimum * 100)
+    if drop < threshold or amount >= previous_minimum:
+        return None
+    return (
+        f"ALERT: fare drop on {route}: {cheapest.price.currency}{cheapest.price.amount_text} "
+        f"({drop:.0f}% below the previous minimum of {previous_minimum}), "
+        f"departure {cheapest.first_trip_date:%Y-%m-%d}, return {cheapest.return_trip_date:%Y-%m-%d}. "
+        f"Booking link: {cheapest.direct_link}"
+    )
@@ -1,17 +1,146 @@
 #!/usr/bin/env python3
 
+import argparse
+from pathlib import Path
+from typing import List
 
-from fff.bot import Bot
-from fff.utils.logging import logger
+from fff import APP_DESCRIPTION, APP_NAME
+
+
+def parse_args(args: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="fff", description=f"{APP_NAME}: {APP_DESCRIPTION}"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="scrap every URL again instead of using the results cached by previous runs. Always the case with --watch.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the previous run: only scrap the URLs which are missing or failed",
+    )
+    parser.add_argument(
+        "--export",
+        action="append",
+        default=[],
+        type=Path,
+        metavar="PATH",
+        help="export the flight trips to a .jsonl, .csv or .parquet file. Can be repeated.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="search again every WATCH_INTERVAL minutes, and alert on fare drops",
+    )
+    parser.add_argument(
+        "--serve-browsers",
+        action="store_true",
+        help="keep MAX_PARALLEL_BROWSERS web browsers ready for the searches run with BROWSER_POOL",
+    )
+    parser.add_argument(
+        "--calendar-only",
+        action="store_true",
+        help="only read the calendar price of every departure date, without clicking on them",
+    )
+    parser.add_argument(
+        "--resolve",
+        action="store_true",
+        help="with --calendar-only, then get the flights of the cheapest calendar prices",
+    )
+    parser.add_argument(
+        "--price-matrix",
+        action="store_true",
+        help="analyse the prices seen by the latest search, without scraping: heatmap, cheapest weeks and trip lengths",
+    )
+    parser.add_argument(
+        "--coordinate",
+        action="store_true",
+        help="publish the search URLs to the WORK_QUEUE, and merge the results of the workers",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="scrap the URLs of the WORK_QUEUE until it is drained. Can run on several machines.",
+    )
+    namespace = parser.parse_args(args)
+    if namespace.resolve and not namespace.calendar_only:
+        parser.error("--resolve only works with --calendar-only")
+    if namespace.watch and namespace.calendar_only:
+        parser.error("--watch and --calendar-only cannot be used together")
+    if namespace.resume and (namespace.watch or namespace.calendar_only):
+        parser.error("--resume only works with a single search")
+    if namespace.export and namespace.calendar_only:
+        parser.error("--export does not work with --calendar-only")
+    return namespace
 
 
 def main():
+    args = parse_args()
+    # Imported once the arguments are valid: selenium and the settings take a while to load
+    from fff.bot import Bot
+    from fff.config import get_settings
+    from fff.utils.logging import configure_logging, logger
+
+    configure_logging(get_settings().LOG_LEVEL)
     with logger.catch():
+        if args.serve_browsers:
+            from fff.browser_pool import BrowserPoolServer
+
+            print("Launching the web browsers of the pool. Press Ctrl+C to stop.")
+            BrowserPoolServer(get_settings()).serve_forever()
+            return
+        if args.price_matrix:
+            from fff.price_matrix import PriceMatrix
+
+            path = get_settings().PRICE_MATRIX_PATH
+            if path is None or not path.exists():
+                print("No price matrix yet: set PRICE_MATRIX_PATH, and run a search.")
+                return
+            price_matrix = PriceMatrix.load(path)
+            if len(price_matrix.routes) > 1:
+                for route in price_matrix.routes:
+                    print(price_matrix.report(route) + "\n")
+            print(price_matrix.report())
+            return
+        if args.coordinate or args.worker:
+            from fff.distributed import coordinate, run_worker
+            from fff.work_queue import open_work_queue
+
+            settings = get_settings()
+            queue = open_work_queue(settings.WORK_QUEUE)
+            try:
+                if args.worker:
+                    run_worker(queue, settings)
+                else:
+                    coordinate(
+                        queue,
+                        settings,
+                        read_cache=not args.no_cache,
+                        resume=args.resume,
+                    ).print_results()
+            finally:
+                queue.close()
+            return
         print(
             "Starting the bot. The scraping will take several minutes depending on your configuration."
         )
         bot = Bot()
-        bot.search()
+        try:
+            if args.watch:
+                bot.watch(export_paths=args.export)
+            elif args.calendar_only:
+                bot.scan_calendars(resolve=args.resolve)
+            else:
+                bot.search(
+                    read_cache=not args.no_cache,
+                    resume=args.resume,
+                    export_paths=args.export,
+                )
+        finally:
+            # Or give it back to the browser pool
+            bot.quit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+"""Merge the flight trips found on every search URL, keeping only the cheapest ones."""
+import heapq
+import threading
+from decimal import Decimal
+from itertools import count
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from fff.parser import CalendarPrice
+from fff.schemas.flight_trip import FlightTrip
+from fff.utils.logging import logger
+
+
+class TopFlightTrips:
+    """
+    The N cheapest flight trips seen so far.
+
+    The trips are kept in a bounded max-heap of size N, so the memory stays in O(N)
+    whatever the number of URLs. A trip (same ``FlightTrip.key``) found again, on an
+    overlapping date window, is only kept once, at its cheapest fare. Among trips with the
+    same price, the first ones found are kept.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # Heap entries: (-price, -insertion order, key). The root is the trip
+        # to evict first: the most expensive one, and the latest found among equals.
+        self._heap: List[Tuple[Decimal, int, str]] = []
+        self._flight_trips: Dict[str, FlightTrip] = {}
+        self._counter = count()
+        # Trips found again while they were in the top N
+        self.nb_duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._heap) >= self.size
+
+    @property
+    def worst_price(self) -> Decimal | None:
+        """Price to beat to enter the top N, or None while it is not full."""
+        if not self.is_full or not self._heap:
+            return None
+        return -self._heap[0][0]
+
+    def add(self, flight_trip: FlightTrip) -> bool:
+        """Add a flight trip if it is among the N cheapest ones.
+
+        Returns:
+            bool: whether the flight trip was kept
+        """
+        amount = flight_trip.price.amount
+        if amount is None or self.size == 0:
+            return False
+        key = flight_trip.key
+        kept = self._flight_trips.get(key)
+        if kept is not None:
+            self.nb_duplicates += 1
+            if amount >= kept.price.amount:
+                return False
+            # The same trip at a lower fare: it replaces the one kept
+            self._heap = [entry for entry in self._heap if entry[2] != key]
+            heapq.heapify(self._heap)
+            del self._flight_trips[key]
+        entry = (-amount, -next(self._counter), key)
+        if not self.is_full:
+            heapq.heappush(self._heap, entry)
+        elif amount < -self._heap[0][0]:
+            _, _, evicted = heapq.heapreplace(self._heap, entry)
+            del self._flight_trips[evicted]
+        else:
+            return False
+        self._flight_trips[key] = flight_trip
+        return True
+
+    def extend(self, flight_trips: Iterable[FlightTrip]) -> int:
+        """Add several flight trips.
+
+        Returns:
+            int: how many of them were kept
+        """
+        return sum(self.add(flight_trip) for flight_trip in flight_trips)
+
+    def best(self) -> List[FlightTrip]:
+        """The N cheapest flight trips, from the cheapest to the most expensive."""
+        return [
+            self._flight_trips[key]
+            for _, _, key in sorted(self._heap, key=lambda e: (-e[0], -e[1]))
+        ]
+
+
+class SearchResults:
+    """
+    The N cheapest flight trips of each route, and of all the routes together.
+
+    A trip already found on another URL is only kept once: each top N drops the duplicates
+    of its own trips, so the memory stays in O(N).
+    """
+
+    def __init__(self, size: int, route_of: Callable[[str], str]):
+        """
+        Args:
+            size (int): how many flight trips to keep (N)
+            route_of (Callable[[str], str]): give the route of a search URL
+        """
+        self.size = size
+        self.route_of = route_of
+        self.overall = TopFlightTrips(size)
+        self.routes: Dict[str, TopFlightTrips] = {}
+
+    def top_of(self, url: str) -> TopFlightTrips:
+        """The top N of the route searched by a URL."""
+        route = self.route_of(url)
+        if route not in self.routes:
+            self.routes[route] = TopFlightTrips(self.size)
+        return self.routes[route]
+
+    @property
+    def nb_duplicates(self) -> int:
+        """How many trips were found again while they were among the N cheapest ones."""
+        return self.overall.nb_duplicates
+
+    def extend(self, url: str, flight_trips: List[FlightTrip]) -> bool:
+        """Add the flight trips found on a search URL.
+
+        Returns:
+            bool: whether the overall top N changed
+        """
+        self.top_of(url).extend(flight_trips)
+        return self.overall.extend(flight_trips) > 0
+
+
+class Pruner:
+    """
+    Skip the departure dates which cannot enter the top N (branch and bound).
+
+    The calendar price of a departure date is the cheapest price of its trips: once the top N
+    is full, a date priced at least as much as the Nth best trip cannot improve the results,
+    so there is no need to click on it. May be shared by several workers.
+    """
+
+    def __init__(self, top_of: Callable[[str], TopFlightTrips]):
+        """
+        Args:
+            top_of (Callable[[str], TopFlightTrips]): give the top N that the flight trips of
+                a search URL compete with
+        """
+        self.top_of = top_of
+        self._lock = threading.Lock()
+        self.pruned_urls = 0
+        self.pruned_clicks = 0
+        self.pruned_time = 0.0  # Estimated, in seconds
+
+    def prune(
+        self, url: str, departure_dates: List[CalendarPrice], seconds_per_click: float
+    ) -> List[CalendarPrice]:
+        """Keep the departure dates cheaper than the Nth best trip found so far.
+
+        Args:
+            url (str): the search URL, for logging purposes
+            departure_dates (List[CalendarPrice]): the departure dates to click on
+            seconds_per_click (float): average time to load the return flights of a date
+
+        Returns:
+            List[CalendarPrice]: the departure dates worth clicking on
+        """
+        price_to_beat = self.top_of(url).worst_price
+        if price_to_beat is None:
+            return departure_dates
+        kept_dates = [
+            d
+            for d in departure_dates
+            if d.price.amount is not None and d.price.amount < price_to_beat
+        ]
+        nb_pruned = len(departure_dates) - len(kept_dates)
+        if nb_pruned:
+            with self._lock:
+                self.pruned_clicks += nb_pruned
+                self.pruned_time += nb_pruned * seconds_per_click
+                if not kept_dates:
+                    self.pruned_urls += 1
+            logger.debug(
+                f"Skipping {nb_pruned}/{len(departure_dates)} departure date(s) priced {price_to_beat} or more. URL: {url}"
+            )
+        return kept_dates
+
+    def log_stats(self) -> None:
+        if self.pruned_clicks:
+            logger.info(
+                f"Pruning: {self.pruned_clicks} departure date click(s) skipped, "
+                f"including every click of {self.pruned_urls} URL(s), saving about {self.pruned_time:.0f}s."
+            )
@@ -0,0 +1,336 @@
+"""
+Asyncio orchestration of a search.
+
+The web browsers are driven by blocking Selenium calls: each bot runs them in its own
+executor thread, while the event loop schedules the URLs, retries them, enforces their
+timeout, merges the results and reports the progress.
+
+Usage as a library::
+
+    from fff.config import Settings
+    from fff.orchestrator import search
+
+    flight_trips = await search(Settings(FROM_AIRPORT="PAR", DESTINATION_AIRPORT="YUL"))
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Deque, List, Tuple
+
+from fff.browser import PageLoadStats
+from fff.config import Settings, get_settings
+from fff.exceptions import ScrapingError
+from fff.price_matrix import PriceMatrix, save_price_matrix
+from fff.schemas.flight_trip import FlightTrip
+from fff.schemas.url_result import UrlResult
+from fff.session import SearchSession
+from fff.throttle import RequestScheduler
+from fff.tracing import tracer
+from fff.url_generator import UrlGenerator
+from fff.utils.logging import logger
+
+if TYPE_CHECKING:
+    from fff.bot import Bot
+
+# How often the progress is printed, in seconds
+PROGRESS_INTERVAL = 10
+
+
+class BotWorker:
+    """A bot and the executor thread running its blocking calls."""
+
+    def __init__(self, worker_id: int, bot_factory: Callable[[], "Bot"]):
+        self.worker_id = worker_id
+        self.bot_factory = bot_factory
+        self.bot: "Bot | None" = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"fff-browser-{worker_id}"
+        )
+
+    async def call(self, function: Callable, *args, **kwargs):
+        """Run a blocking call in the executor thread of the bot."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(function, *args, **kwargs)
+        )
+
+    async def start(self) -> "Bot":
+        if self.bot is None:
+            self.bot = await self.call(self.bot_factory)
+        if not self.bot.started:
+            await self.call(self.bot.start)
+        return self.bot
+
+    async def abort(self) -> None:
+        """Close the web browser, even if the executor thread is stuck in a blocking call.
+
+        The stuck call then fails, and frees the executor thread.
+        """
+        if self.bot is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self.bot.quit)
+            except Exception as e:
+                logger.debug(f"Worker {self.worker_id}: cannot close the browser: {e}")
+
+    async def close(self) -> None:
+        await self.abort()
+        self.executor.shutdown(wait=False)
+
+
+class AsyncOrchestrator:
+    """
+    Scrap the URLs of a search with several bots, coordinated by asyncio tasks.
+
+    - a worker task per bot takes the next URL, and retries it with an exponential backoff
+    - a merger task merges the flight trips and records them (checkpoint journal, cache)
+    - a progress task prints the progress at regular intervals
+
+    Once the top N has not improved for ``CONVERGENCE_PATIENCE`` URLs in a row, the search
+    is considered converged: the remaining URLs are cancelled.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        bot_factory: Callable[[], "Bot"] | None = None,
+        url_generator: UrlGenerator | None = None,
+    ):
+        """
+        Args:
+            settings (Settings): the search settings
+            bot_factory (Callable[[], Bot] | None): creates a bot for each worker. Default
+                to a Firefox bot sharing the URL generator.
+            url_generator (UrlGenerator | None): the generator of the search URLs
+        """
+        self.settings = settings
+        self.url_generator = (
+            url_generator
+            if url_generator is not None
+            else UrlGenerator(settings=settings)
+        )
+        self.page_loads = PageLoadStats()
+        self.price_matrix = PriceMatrix.for_search(self.url_generator)
+        self.scheduler = RequestScheduler(
+            requests_per_minute=settings.REQUESTS_PER_MINUTE,
+            max_concurrency=settings.MAX_PARALLEL_BROWSERS,
+            slow_page_load=settings.SLOW_PAGE_LOAD,
+        )
+        self.bot_factory = (
+            bot_factory if bot_factory is not None else self._default_bot_factory
+        )
+        self.nb_done = 0
+        self.nb_urls = 0
+
+    def _default_bot_factory(self) -> "Bot":
+        # Imported on first use: selenium is only needed to actually scrap
+        from fff.bot import Bot
+
+        return Bot(
+            page_loads=self.page_loads,
+            settings=self.settings,
+            url_generator=self.url_generator,
+            scheduler=self.scheduler,
+            price_matrix=self.price_matrix,
+        )
+
+    async def _scrap(self, worker: BotWorker, url: str, next_urls: List[str]):
+        """Scrap a URL, with several attempts and a timeout for each one.
+
+        Raises:
+            ScrapingError: if every attempt failed
+        """
+        max_attempts = self.settings.URL_MAX_ATTEMPTS
+        for attempt in range(1, max_attempts + 1):
+            # Not being able to launch a web browser is not specific to the URL: stop.
+            bot = await worker.start()
+            try:
+                return await asyncio.wait_for(
+                    worker.call(
+                        bot.get_best_flights,
+                        url,
+                        nb_results=self.settings.NUMBER_OF_RESULTS,
+                        pruner=self.session.pruner,
+                        next_urls=next_urls,
+                    ),
+                    timeout=self.settings.URL_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                error: Exception = TimeoutError(
+                    f"No result after {self.settings.URL_TIMEOUT:.0f}s"
+                )
+                # Unblock the executor thread: a new browser is launched by the next attempt
+                await worker.abort()
+                worker.bot = None
+            except Exception as e:
+                error = e
+            if attempt == max_attempts:
+                raise ScrapingError(url, attempts=attempt, error=error) from error
+            backoff = self.settings.URL_RETRY_BACKOFF * 2 ** (attempt - 1)
+            logger.warning(
+                f"Worker {worker.worker_id}: attempt {attempt}/{max_attempts} failed ({type(error).__name__}: {error}). Retrying in {backoff:.0f}s. URL: {url}"
+            )
+            await asyncio.sleep(backoff)
+            if worker.bot is not None:
+                try:
+                    await worker.call(worker.bot.restart)
+                except Exception as restart_error:
+                    # The next attempt will fail as well, and report it.
+                    logger.exception(restart_error)
+
+    async def _work(
+        self,
+        worker: BotWorker,
+        pending_urls: Deque[str],
+        result_queue: "asyncio.Queue[Tuple[str, UrlResult | ScrapingError, float]]",
+    ) -> None:
+        """Worker task: scrap the pending URLs until there is none left."""
+        # URLs taken by this worker: the current one, then the ones its bot prefetches
+        backlog: Deque[str] = deque()
+        while True:
+            while len(backlog) <= self.settings.PREFETCH_TABS and pending_urls:
+                backlog.append(pending_urls.popleft())
+            if not backlog:
+                break
+            url = backlog.popleft()
+            url_start = perf_counter()
+            try:
+                result = await self._scrap(worker, url, next_urls=list(backlog))
+            except ScrapingError as e:
+                logger.error(f"Worker {worker.worker_id}: {e}")
+                await result_queue.put((url, e, 0.0))
+                continue
+            await result_queue.put((url, result, perf_counter() - url_start))
+
+    async def _merge(
+        self,
+        result_queue: "asyncio.Queue[Tuple[str, UrlResult | ScrapingError, float]]",
+    ) -> None:
+        """Merger task: merge the results, until every URL is done or the search converged."""
+        patience = self.settings.CONVERGENCE_PATIENCE
+        nb_unchanged = 0
+        while self.nb_done < self.nb_urls:
+            url, result, scraping_time = await result_queue.get()
+            self.nb_done += 1
+            if isinstance(result, ScrapingError):
+                self.session.on_failure(url, result)
+                continue
+            if self.session.on_result(url, result, scraping_time):
+                nb_unchanged = 0
+            else:
+                nb_unchanged += 1
+            if patience and nb_unchanged >= patience and self.session.results:
+                logger.info(
+                    f"The cheapest flights did not change for {nb_unchanged} URL(s): "
+                    f"stopping the search, {self.nb_urls - self.nb_done} URL(s) left unscraped."
+                )
+                return
+
+    async def _report_progress(self) -> None:
+        """Progress task: print how many URLs are done, at regular intervals."""
+        nb_reported = -1
+        while True:
+            if self.nb_done != nb_reported:
+                print(f"Scraping the website... [{self.nb_done}/{self.nb_urls} URL(s)]")
+                nb_reported = self.nb_done
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    async def run(self, read_cache: bool = True, resume: bool = False) -> SearchSession:
+        """Search the cheapest flights.
+
+        Args:
+            read_cache (bool): use the results of the URLs scraped recently, if the cache
+                is enabled
+            resume (bool): resume the previous run from its checkpoint journal
+
+        Returns:
+            SearchSession: the search, with its results
+        """
+        start = perf_counter()
+        tracer.reset()
+        self.price_matrix.reset()
+        search_urls = self.url_generator.generate_urls()
+        self.session = SearchSession(
+            self.settings,
+            self.url_generator,
+            search_urls,
+            read_cache=read_cache,
+            resume=resume,
+        )
+        urls = self.session.urls_to_scrap
+        self.nb_urls = len(urls)
+        self.nb_done = 0
+
+        pending_urls = deque(urls)
+        result_queue: "asyncio.Queue[Tuple[str, UrlResult | ScrapingError, float]]" = (
+            asyncio.Queue()
+        )
+        workers = [
+            BotWorker(worker_id, self.bot_factory)
+            for worker_id in range(min(self.settings.MAX_PARALLEL_BROWSERS, len(urls)))
+        ]
+        worker_tasks = [
+            asyncio.create_task(self._work(worker, pending_urls, result_queue))
+            for worker in workers
+        ]
+        progress_task = asyncio.create_task(self._report_progress())
+        merger_task = asyncio.create_task(self._merge(result_queue))
+        try:
+            tasks = {merger_task, *worker_tasks}
+            while merger_task in tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    # Raise the unexpected errors of the workers
+                    task.result()
+        finally:
+            # Cancel the remaining work, if the search converged or failed.
+            for task in [*worker_tasks, merger_task, progress_task]:
+                task.cancel()
+            await asyncio.gather(
+                *worker_tasks, merger_task, progress_task, return_exceptions=True
+            )
+            await asyncio.gather(*(worker.close() for worker in workers))
+            self.page_loads.log_stats(lean_browsing=self.settings.LEAN_BROWSING)
+            self.scheduler.log_stats()
+            self.session.close()
+            if self.settings.PRICE_MATRIX_PATH is not None:
+                save_price_matrix(
+                    self.price_matrix,
+                    self.settings.PRICE_MATRIX_PATH,
+                    max_age=timedelta(hours=self.settings.CACHE_TTL),
+                )
+            tracer.report(self.settings.TRACE_PATH, self.settings.METRICS_PATH)
+
+        logger.info(
+            f"{self.nb_done}/{len(urls)} URL(s) scraped by {len(workers)} browser(s) in {perf_counter() - start:.1f}s."
+        )
+        return self.session
+
+
+async def search(
+    settings: Settings | None = None,
+    read_cache: bool = True,
+    resume: bool = False,
+) -> List[FlightTrip]:
+    """Search the cheapest flights, and print them.
+
+    Args:
+        settings (Settings | None): the search settings. Default to the environment ones.
+        read_cache (bool): use the results of the URLs scraped recently, if the cache
+            is enabled
+        resume (bool): resume the previous run from its checkpoint journal
+
+    Returns:
+        List[FlightTrip]: the cheapest flight trips, from the cheapest
+    """
+    orchestrator = AsyncOrchestrator(
+        settings if settings is not None else get_settings()
+    )
+    session = await orchestrator.run(read_cache=read_cache, resume=resume)
+    session.print_results()
+    return session.results
@@ -0,0 +1,219 @@
+"""
+Parse the website pages into flight trips.
+
+The parsing works on the HTML source of the pages, so it does not need a web browser:
+the bot only fetches the page source.
+"""
+import html
+from datetime import date
+from typing import Dict, List, Tuple
+from urllib.parse import urljoin
+
+import lxml.html
+from price_parser import Price
+from pydantic import BaseModel
+
+from fff.schemas.airport import AirPort, AirportTrip
+from fff.schemas.flight_trip import FlightTrip
+from fff.utils.datetime import parse_date
+from fff.utils.logging import logger
+
+# Price of a departure date in the flexible calendar
+CALENDAR_PRICE_XPATH = "//div[@class='price']"
+# Day of the month of a calendar cell, relative to its price
+CALENDAR_DAY_XPATH = "../div[@class='date']"
+
+# For each departure date, there is a return result list.
+# The field XPaths are relative to a return result item.
+RETURN_RESULT_XPATHS: Dict[str, str] = {
+    "item": "//div[@class='returnResultItem']",
+    "price": ".//span[@class='price-text']",
+    "dates": ".//div[contains(@class, 'section') and contains(@class, 'date')]",
+    "booking_link": ".//a[@class='booking-link ']",
+    "first_trip_origin": ".//div[contains(@id, 'leg-0-origin-airport')]",
+    "first_trip_destination": ".//div[contains(@id, 'leg-0-destination-airport')]",
+    "return_trip_origin": ".//div[contains(@id, 'leg-1-origin-airport')]",
+    "return_trip_destination": ".//div[contains(@id, 'leg-1-destination-airport')]",
+}
+
+
+class CalendarPrice(BaseModel):
+    """Price of a departure date in the flexible calendar."""
+
+    index: int  # Position of the cell among the CALENDAR_PRICE_XPATH matches
+    price: Price
+    day: int | None = None  # Day of the month displayed in the cell, if any
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __repr__(self):
+        return f"Flight: {self.price.amount}"
+
+
+class ReturnResultRow(BaseModel):
+    """Raw text fields of a return result item, as they appear on the page."""
+
+    price: str
+    dates: List[str]  # Departure date, then return date
+    booking_link: str
+    first_trip_origin: str
+    first_trip_destination: str
+    return_trip_origin: str
+    return_trip_destination: str
+
+
+def parse_flight_trip(
+    row: ReturnResultRow,
+    website_url: str,
+    language: str = "en",
+    date_window: Tuple[date, date] | None = None,
+) -> FlightTrip:
+    """Parse a return result row into a flight trip.
+
+    The search link is not set: it depends on the search parameters.
+
+    Args:
+        row (ReturnResultRow): the raw fields of the return result item
+        website_url (str): the website URL, to make the booking link absolute
+        language (str): the website language, to parse the dates
+        date_window (Tuple[date, date] | None): the first and last dates of the search,
+            to tell the year of the dates
+
+    Raises:
+        IndexError: if the row does not contain both departure and return dates
+        ValueError: if a date cannot be parsed
+
+    Returns:
+        FlightTrip: the flight trip
+    """
+    flight_trip = FlightTrip()
+    flight_trip.price = Price.fromstring(row.price)
+    flight_trip.first_trip_date = parse_date(row.dates[0], language, date_window)
+    flight_trip.return_trip_date = parse_date(row.dates[1], language, date_window)
+    flight_trip.direct_link = urljoin(website_url, html.unescape(row.booking_link))
+    flight_trip.first_trip = AirportTrip(
+        from_airport=AirPort.from_string(row.first_trip_origin),
+        destination_airport=AirPort.from_string(row.first_trip_destination),
+    )
+    flight_trip.return_trip = AirportTrip(
+        from_airport=AirPort.from_string(row.return_trip_origin),
+        destination_airport=AirPort.from_string(row.return_trip_destination),
+    )
+    return flight_trip
+
+
+def _first_text(element: lxml.html.HtmlElement, xpath: str) -> str | None:
+    nodes = element.xpath(xpath)
+    return nodes[0].text_content() if nodes else None
+
+
+def parse_calendar_prices(page_source: str) -> List[CalendarPrice]:
+    """Parse the prices of the flexible calendar.
+
+    Args:
+        page_source (str): the HTML source of the result page
+
+    Returns:
+        List[CalendarPrice]: the departure dates with a price, in calendar order
+    """
+    document = lxml.html.fromstring(page_source)
+    calendar_prices: List[CalendarPrice] = []
+    for index, cell in enumerate(document.xpath(CALENDAR_PRICE_XPATH)):
+        raw_price = cell.text_content().strip()
+        # Make sure the departure date case is not empty
+        if raw_price:
+            price = Price.fromstring(raw_price)
+            if price.amount:
+                raw_day = (_first_text(cell, CALENDAR_DAY_XPATH) or "").strip()
+                calendar_prices.append(
+                    CalendarPrice(
+                        index=index,
+                        price=price,
+                        day=int(raw_day) if raw_day.isdigit() else None,
+                    )
+                )
+    return calendar_prices
+
+
+def extract_return_result_rows(page_source: str) -> List[Dict]:
+    """Extract the raw fields of every return result item.
+
+    The fields of an item may be missing (None): validate them with ``ReturnResultRow``.
+
+    Args:
+        page_source (str): the HTML source of the result page
+
+    Returns:
+        List[Dict]: the raw fields of each return result item
+    """
+    document = lxml.html.fromstring(page_source)
+    rows: List[Dict] = []
+    for item in document.xpath(RETURN_RESULT_XPATHS["item"]):
+        booking_links = item.xpath(RETURN_RESULT_XPATHS["booking_link"])
+        rows.append(
+            {
+                "price": _first_text(item, RETURN_RESULT_XPATHS["price"]),
+                "dates": [
+                    node.text_content()
+                    for node in item.xpath(RETURN_RESULT_XPATHS["dates"])
+                ],
+                "booking_link": booking_links[0].get("href") if booking_links else None,
+                "first_trip_origin": _first_text(
+                    item, RETURN_RESULT_XPATHS["first_trip_origin"]
+                ),
+                "first_trip_destination": _first_text(
+                    item, RETURN_RESULT_XPATHS["first_trip_destination"]
+                ),
+                "return_trip_origin": _first_text(
+                    item, RETURN_RESULT_XPATHS["return_trip_origin"]
+                ),
+                "return_trip_destination": _first_text(
+                    item, RETURN_RESULT_XPATHS["return_trip_destination"]
+                ),
+            }
+        )
+    return rows
+
+
+def parse_flight_trips(
+    page_source: str,
+    website_url: str,
+    source_url: str = "",
+    language: str = "en",
+    date_window: Tuple[date, date] | None = None,
+) -> List[FlightTrip]:
+    """Parse every return result item of a page into flight trips.
+
+    The items that cannot be parsed are logged and skipped.
+
+    Args:
+        page_source (str): the HTML source of the result page
+        website_url (str): the website URL, to make the booking links absolute
+        source_url (str): URL of the page, for logging purposes
+        language (str): the website language (WEBSITE_LANGUAGE setting), to parse the
+            dates
+        date_window (Tuple[date, date] | None): the first and last dates of the search,
+            to tell the year of the dates. Default to their next occurrence.
+
+    Returns:
+        List[FlightTrip]: the flight trips, in page order
+    """
+    flight_trips: List[FlightTrip] = []
+    for raw_row in extract_return_result_rows(page_source):
+        try:
+            row = ReturnResultRow.parse_obj(raw_row)
+            flight_trips.append(
+                parse_flight_trip(row, website_url, language, date_window)
+            )
+        except IndexError as e:
+            logger.exception(e)
+            logger.error(
+                f"A prolem might have occurred with the date for this flight. Let's pass on this one. URL: {source_url}"
+            )
+        except ValueError as e:
+            logger.exception(e)
+            logger.error(
+                f"A return result could not be parsed. Let's pass on this one. URL: {source_url}"
+            )
+    return flight_trips
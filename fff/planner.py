@@ -0,0 +1,108 @@
+"""
+Plan the search URLs to scrap.
+
+A flexible calendar search URL covers a period of departure dates (35 days at most) and a
+window of nights at destination (8 nights at most). The planner chooses the periods and
+night windows so that every valid (departure date, nights) pair is covered exactly once,
+with as few URLs as possible.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from fff.schemas.flexible_calendar import WEBSITE_MAXIMUM_DAY_INTERVAL, DateWindow
+from fff.utils.datetime import split_date_window
+
+
+class PlannedSearch(NamedTuple):
+    """A search URL to scrap: departure dates between start and end dates, for a night window."""
+
+    start_date: date
+    end_date: date
+    date_window: DateWindow
+
+
+def last_departure_date(search_date_end: date, nights: int) -> date:
+    """The last departure date for a stay of N nights.
+
+    The return date must be strictly before the end of the search.
+    """
+    return search_date_end - timedelta(days=nights + 1)
+
+
+def plan_searches(
+    search_date_begin: date, search_date_end: date, min_nights: int, max_nights: int
+) -> List[PlannedSearch]:
+    """Plan the minimum number of search URLs covering every valid (departure date, nights) pair.
+
+    For a night window, the departure dates stop as soon as the shortest stay would return
+    after the end of the search: the longer the stays, the shorter the period to scrap.
+    The night windows are chosen by dynamic programming to minimize the number of periods.
+
+    Args:
+        search_date_begin (date): first departure date
+        search_date_end (date): end of the search. Returns must be strictly before this date.
+        min_nights (int): minimum number of nights at destination
+        max_nights (int): maximum number of nights at destination
+
+    Returns:
+        List[PlannedSearch]: the searches to scrap, by night window then by period
+    """
+
+    def periods(nights: int) -> List[Tuple[date, date]]:
+        last_departure = last_departure_date(search_date_end, nights)
+        if last_departure < search_date_begin:
+            return []
+        return split_date_window(search_date_begin, last_departure)
+
+    # plans[n]: best plan (number of URLs, night windows) for the nights from n to max_nights
+    plans: Dict[int, Tuple[int, List[DateWindow]]] = {max_nights + 1: (0, [])}
+    for first_night in range(max_nights, min_nights - 1, -1):
+        best_plan: Tuple[int, List[DateWindow]] | None = None
+        # Prefer the largest windows when the number of URLs is the same
+        for last_night in range(
+            min(first_night + WEBSITE_MAXIMUM_DAY_INTERVAL, max_nights),
+            first_night - 1,
+            -1,
+        ):
+            nb_urls, date_windows = plans[last_night + 1]
+            nb_urls += len(periods(first_night))
+            if best_plan is None or nb_urls < best_plan[0]:
+                window = DateWindow(min_nights=first_night, max_nights=last_night)
+                best_plan = (nb_urls, [window] + date_windows)
+        assert best_plan is not None  # nosec
+        plans[first_night] = best_plan
+
+    return [
+        PlannedSearch(start_date, end_date, date_window)
+        for date_window in plans[min_nights][1]
+        for start_date, end_date in periods(date_window.min_nights)
+    ]
+
+
+def valid_pairs(
+    search_date_begin: date, search_date_end: date, min_nights: int, max_nights: int
+) -> Set[Tuple[date, int]]:
+    """Every (departure date, nights) pair matching the search."""
+    return {
+        (search_date_begin + timedelta(days=day), nights)
+        for nights in range(min_nights, max_nights + 1)
+        for day in range(
+            (last_departure_date(search_date_end, nights) - search_date_begin).days + 1
+        )
+    }
+
+
+def covered_pairs(
+    planned_search: PlannedSearch, search_date_end: date
+) -> Set[Tuple[date, int]]:
+    """The valid (departure date, nights) pairs displayed by a search URL."""
+    return {
+        (planned_search.start_date + timedelta(days=day), nights)
+        for nights in range(
+            planned_search.date_window.min_nights,
+            planned_search.date_window.max_nights + 1,
+        )
+        for day in range((planned_search.end_date - planned_search.start_date).days + 1)
+        if planned_search.start_date + timedelta(days=day)
+        <= last_departure_date(search_date_end, nights)
+    }
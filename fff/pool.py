@@ -0,0 +1,186 @@
+"""Pool of bots scraping the website in parallel, each one with its own web browser."""
+import threading
+from collections import deque
+from queue import Empty, Queue
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Deque, List, Tuple
+
+from fff.exceptions import ScrapingError
+from fff.utils.logging import logger
+
+if TYPE_CHECKING:
+    from fff.bot import Bot
+    from fff.merger import Pruner
+    from fff.schemas.url_result import UrlResult
+
+
+class BotPool:
+    """
+    Scrap a list of URLs with several bots.
+
+    Each worker owns a bot (and therefore a web browser). Workers pull URLs from a shared queue
+    and send the flight trips they found to a single merger, which runs in the calling thread.
+    """
+
+    def __init__(
+        self,
+        bot_factory: Callable[[], "Bot"],
+        size: int,
+        first_bot: "Bot | None" = None,
+        prefetch: int = 0,
+    ):
+        """
+        Args:
+            bot_factory (Callable[[], Bot]): creates a new bot for a worker
+            size (int): number of workers (i.e. web browsers)
+            first_bot (Bot | None): an already running bot to use as the first worker.
+                It won't be closed at the end of the run.
+            prefetch (int): how many URLs each worker reserves in advance, so its bot can
+                prefetch them in background tabs
+        """
+        self.bot_factory = bot_factory
+        self.size = size
+        self.first_bot = first_bot
+        self.prefetch = prefetch
+
+    def _work(
+        self,
+        worker_id: int,
+        url_queue: "Queue[Tuple[int, str]]",
+        result_queue: "Queue[Tuple[str, UrlResult | BaseException, float]]",
+        nb_results: int,
+        nb_urls: int,
+        stop: threading.Event,
+        pruner: "Pruner | None",
+    ) -> None:
+        """Worker loop: scrap URLs from the queue until it's empty."""
+        worker_start = perf_counter()
+        busy_time = 0.0
+        nb_scraped = 0
+        bot: "Bot | None" = None
+        own_bot = not (worker_id == 0 and self.first_bot is not None)
+        # URLs taken from the queue by this worker: the current one, then the prefetched ones
+        backlog: Deque[Tuple[int, str]] = deque()
+        try:
+            bot = self.bot_factory() if own_bot else self.first_bot
+            assert bot is not None  # nosec
+            if not bot.started:
+                bot.start()
+            while not stop.is_set():
+                while len(backlog) <= self.prefetch:
+                    try:
+                        backlog.append(url_queue.get_nowait())
+                    except Empty:
+                        break
+                if not backlog:
+                    break
+                index, url = backlog.popleft()
+                print(f"Scraping the website... [URL {index+1}/{nb_urls}]")
+                url_start = perf_counter()
+                try:
+                    result = bot.scrap_url(
+                        url,
+                        nb_results=nb_results,
+                        pruner=pruner,
+                        next_urls=[next_url for _, next_url in backlog],
+                    )
+                except ScrapingError as e:
+                    # The other URLs can still be scraped.
+                    busy_time += perf_counter() - url_start
+                    logger.error(f"Worker {worker_id}: {e}")
+                    result_queue.put((url, e, 0.0))
+                    continue
+                url_time = perf_counter() - url_start
+                busy_time += url_time
+                nb_scraped += 1
+                logger.info(
+                    f"Worker {worker_id}: URL {index+1}/{nb_urls} scraped in {url_time:.1f}s"
+                )
+                result_queue.put((url, result, url_time))
+        except BaseException as e:
+            # Stop the other workers, the merger will raise the error.
+            stop.set()
+            result_queue.put(("", e, 0.0))
+        finally:
+            if own_bot and bot is not None:
+                bot.quit()
+            logger.info(
+                f"Worker {worker_id}: {nb_scraped} URL(s) scraped in {perf_counter() - worker_start:.1f}s (busy {busy_time:.1f}s)"
+            )
+
+    def run(
+        self,
+        urls: List[str],
+        nb_results: int,
+        on_result: Callable[[str, "UrlResult", float], None] | None = None,
+        on_failure: Callable[[str, ScrapingError], None] | None = None,
+        pruner: "Pruner | None" = None,
+    ) -> None:
+        """Scrap the URLs and merge the flight trips found by every worker.
+
+        Args:
+            urls (List[str]): the URLs to scrap
+            nb_results (int): how many flight trips to keep per URL
+            on_result (Callable[[str, UrlResult, float], None] | None): called by the
+                merger with each URL, its flight trips and its scraping time (in seconds)
+            on_failure (Callable[[str, ScrapingError], None] | None): called by the merger
+                with each URL which could not be scraped
+            pruner (Pruner | None): skip the departure dates which cannot enter the top N
+        """
+        start = perf_counter()
+        url_queue: "Queue[Tuple[int, str]]" = Queue()
+        for index, url in enumerate(urls):
+            url_queue.put((index, url))
+        result_queue: "Queue[Tuple[str, UrlResult | BaseException, float]]" = Queue()
+        stop = threading.Event()
+
+        nb_workers = min(self.size, len(urls))
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(
+                    worker_id,
+                    url_queue,
+                    result_queue,
+                    nb_results,
+                    len(urls),
+                    stop,
+                    pruner,
+                ),
+                name=f"fff-worker-{worker_id}",
+                daemon=True,
+            )
+            for worker_id in range(nb_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Merge the results in the calling thread
+        error: BaseException | None = None
+        nb_merged = 0
+        scraping_time = 0.0
+        while nb_merged < len(urls) and error is None:
+            url, result, url_time = result_queue.get()
+            if isinstance(result, ScrapingError):
+                if on_failure is not None:
+                    on_failure(url, result)
+                nb_merged += 1
+            elif isinstance(result, BaseException):
+                error = result
+            else:
+                if on_result is not None:
+                    on_result(url, result, url_time)
+                scraping_time += url_time
+                nb_merged += 1
+
+        for thread in threads:
+            thread.join()
+        if error is not None:
+            raise error
+
+        wall_clock_time = perf_counter() - start
+        logger.info(
+            f"{len(urls)} URL(s) scraped by {nb_workers} browsers in {wall_clock_time:.1f}s. "
+            f"Scraping them one after the other would have taken about {scraping_time:.1f}s "
+            f"(speedup x{scraping_time / wall_clock_time:.1f})."
+        )
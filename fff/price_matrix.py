@@ -0,0 +1,373 @@
+"""
+Every price seen during a search, by route, departure date and number of nights.
+
+The calendar of a search page prices every departure date for a night window (eg: 14 to
+21 nights), and the return flights clicked on price exact trips. Both are kept in a
+matrix over the whole search space, so that the cheapest week, the cheapest trip length
+or the price percentiles are answered at once, without scraping again::
+
+    python -m fff --price-matrix
+"""
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Sequence
+
+import numpy as np
+
+from fff.schemas.calendar_cell import CalendarCell
+from fff.schemas.flight_trip import FlightTrip
+from fff.utils.logging import logger
+
+if TYPE_CHECKING:
+    from fff.url_generator import UrlGenerator
+
+# From the cheapest to the most expensive prices, by ninth of the price range
+HEATMAP_SHADES = ".:-=+*#%@"
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class PricePoint(NamedTuple):
+    route: str
+    departure_date: date
+    nights: int
+    price: float
+
+
+class PriceMatrix:
+    """
+    Cheapest price seen by route, departure date and number of nights. Thread-safe.
+
+    A calendar price is the cheapest of its night window: it is recorded for every number
+    of nights of the window, until a flight trip of that length gives its exact price. So
+    the cheapest price of a departure date or of a week is known as soon as its calendar
+    is read, while the price of a given number of nights may be a lower bound.
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[str],
+        date_begin: date,
+        date_end: date,
+        min_nights: int,
+        max_nights: int,
+    ):
+        """
+        Args:
+            routes (Sequence[str]): the searched routes, eg: ["PAR-YUL"]
+            date_begin (date): the first departure date
+            date_end (date): the last departure date
+            min_nights (int): the minimum number of nights
+            max_nights (int): the maximum number of nights
+        """
+        self.routes = list(routes)
+        self.date_begin = date_begin
+        self.min_nights = min_nights
+        shape = (
+            len(self.routes),
+            (date_end - date_begin).days + 1,
+            max_nights - min_nights + 1,
+        )
+        # NaN: no price seen
+        self.prices = np.full(shape, np.nan)
+        # Whether the price is the one of a flight trip, rather than of a night window
+        self.exact = np.zeros(shape, dtype=bool)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_search(cls, url_generator: "UrlGenerator") -> "PriceMatrix":
+        """An empty matrix over the routes, departure dates and nights of a search.
+
+        The departure dates are the ones of the planned searches: from today at the
+        earliest, until the last date a stay can return before the end of the search.
+        """
+        planned_searches = url_generator.planned_searches
+        date_begin = min(
+            (search.start_date for search in planned_searches),
+            default=url_generator.date_begin,
+        )
+        return cls(
+            routes=[str(round_trip) for round_trip in url_generator.round_trips],
+            date_begin=date_begin,
+            date_end=max(
+                (search.end_date for search in planned_searches), default=date_begin
+            ),
+            min_nights=url_generator.settings.MIN_NIGHTS,
+            max_nights=url_generator.settings.MAX_NIGHTS,
+        )
+
+    def reset(self) -> None:
+        """Forget the prices, for a new search."""
+        with self._lock:
+            self.prices.fill(np.nan)
+            self.exact.fill(False)
+
+    @property
+    def date_end(self) -> date:
+        return self.date_begin + timedelta(days=self.prices.shape[1] - 1)
+
+    @property
+    def max_nights(self) -> int:
+        return self.min_nights + self.prices.shape[2] - 1
+
+    @property
+    def nb_prices(self) -> int:
+        """How many (route, departure date, nights) prices are known."""
+        return int(np.count_nonzero(~np.isnan(self.prices)))
+
+    def _index(self, route: str, departure_date: date) -> tuple[int, int] | None:
+        day = (departure_date - self.date_begin).days
+        if route not in self.routes or not 0 <= day < self.prices.shape[1]:
+            return None
+        return self.routes.index(route), day
+
+    def _nights_slice(self, min_nights: int, max_nights: int) -> slice:
+        return slice(
+            max(min_nights, self.min_nights) - self.min_nights,
+            max(min(max_nights, self.max_nights) - self.min_nights + 1, 0),
+        )
+
+    def add_cells(self, cells: Iterable[CalendarCell]) -> None:
+        """Record the calendar prices, for every number of nights of their window."""
+        with self._lock:
+            for cell in cells:
+                index = self._index(cell.route, cell.departure_date)
+                if index is None or cell.price.amount is None:
+                    continue
+                nights = self._nights_slice(
+                    cell.date_window.min_nights, cell.date_window.max_nights
+                )
+                prices = self.prices[index][nights]
+                window_prices = np.fmin(prices, float(cell.price.amount))
+                self.prices[index][nights] = np.where(
+                    self.exact[index][nights], prices, window_prices
+                )
+
+    def add_flight_trips(self, route: str, flight_trips: Iterable[FlightTrip]) -> None:
+        """Record the exact price of the flight trips."""
+        with self._lock:
+            for trip in flight_trips:
+                index = self._index(route, trip.first_trip_date.date())
+                nights = (
+                    trip.return_trip_date.date() - trip.first_trip_date.date()
+                ).days
+                if (
+                    index is None
+                    or trip.price.amount is None
+                    or not self.min_nights <= nights <= self.max_nights
+                ):
+                    continue
+                cell = (*index, nights - self.min_nights)
+                price = float(trip.price.amount)
+                if self.exact[cell]:
+                    price = min(price, self.prices[cell])
+                self.prices[cell] = price
+                self.exact[cell] = True
+
+    def route_prices(self, route: str | None = None) -> np.ndarray:
+        """The departure date × nights prices of a route, or the cheapest of all routes."""
+        if route is not None:
+            return self.prices[self.routes.index(route)]
+        # fmin ignores the NaN, without warning on the all-NaN cells
+        return np.fmin.reduce(self.prices, axis=0)
+
+    def cheapest_by_week(self, route: str | None = None) -> Dict[date, float]:
+        """The cheapest price of each week, by Monday, for the weeks with a known price."""
+        by_departure = np.fmin.reduce(self.route_prices(route), axis=1)
+        first_monday = self.date_begin - timedelta(days=self.date_begin.weekday())
+        weeks = (np.arange(len(by_departure)) + self.date_begin.weekday()) // 7
+        week_starts = np.flatnonzero(np.diff(weeks, prepend=-1))
+        by_week = np.fmin.reduceat(by_departure, week_starts)
+        return {
+            first_monday + timedelta(weeks=int(week)): float(price)
+            for week, price in zip(weeks[week_starts], by_week)
+            if not np.isnan(price)
+        }
+
+    def cheapest_by_nights(self, route: str | None = None) -> Dict[int, float]:
+        """The cheapest price of each number of nights, for the known ones."""
+        by_nights = np.fmin.reduce(self.route_prices(route), axis=0)
+        return {
+            self.min_nights + int(i): float(by_nights[i])
+            for i in np.flatnonzero(~np.isnan(by_nights))
+        }
+
+    def percentiles(
+        self, percents: Sequence[int] = PERCENTILES, route: str | None = None
+    ) -> Dict[int, float]:
+        """The percentiles of the known prices, or nothing if there is none."""
+        prices = self.route_prices(route)
+        prices = prices[~np.isnan(prices)]
+        if not prices.size:
+            return {}
+        return {
+            percent: float(price)
+            for percent, price in zip(percents, np.percentile(prices, percents))
+        }
+
+    def cheapest(self, nb_prices: int, route: str | None = None) -> List[PricePoint]:
+        """The N cheapest (departure date, nights) of a route, or of all the routes."""
+        prices = (
+            self.prices if route is None else self.prices[[self.routes.index(route)]]
+        )
+        routes = self.routes if route is None else [route]
+        flat_prices = prices.ravel()
+        known = np.flatnonzero(~np.isnan(flat_prices))
+        cheapest = known[np.argsort(flat_prices[known], kind="stable")[:nb_prices]]
+        return [
+            PricePoint(
+                route=routes[r],
+                departure_date=self.date_begin + timedelta(days=int(d)),
+                nights=self.min_nights + int(n),
+                price=float(prices[r, d, n]),
+            )
+            for r, d, n in zip(*np.unravel_index(cheapest, prices.shape))
+        ]
+
+    def heatmap(self, route: str | None = None) -> str:
+        """An ASCII heatmap of the prices: a line per departure date, a column per night."""
+        prices = self.route_prices(route)
+        known = prices[~np.isnan(prices)]
+        if not known.size:
+            return "No price known."
+        low, high = float(known.min()), float(known.max())
+        # Shade of each price: its ninth of the price range
+        scaled = (
+            np.nan_to_num((prices - low) / (high - low))
+            if high > low
+            else np.zeros(prices.shape)
+        )
+        shades = np.minimum(
+            (scaled * len(HEATMAP_SHADES)).astype(int), len(HEATMAP_SHADES) - 1
+        )
+        chars = np.where(np.isnan(prices), " ", np.array(list(HEATMAP_SHADES))[shades])
+        lines = [
+            " " * 15
+            + "".join(
+                f"{nights:>3}" for nights in range(self.min_nights, self.max_nights + 1)
+            )
+            + "  nights"
+        ]
+        for day, row in enumerate(chars):
+            departure_date = self.date_begin + timedelta(days=day)
+            lines.append(
+                f"{departure_date.isoformat()} {departure_date:%a} "
+                + "".join(f"{char:>3}" for char in row)
+            )
+        step = (high - low) / len(HEATMAP_SHADES)
+        lines.append(
+            "\n"
+            + "  ".join(
+                f"{shade} {low + i * step:.0f}+"
+                for i, shade in enumerate(HEATMAP_SHADES)
+            )
+            + "  (blank: unknown)"
+        )
+        return "\n".join(lines)
+
+    def report(self, route: str | None = None) -> str:
+        """The heatmap, the cheapest week and trip length, and the price percentiles."""
+        lines = [
+            f"Prices of {route or 'all the routes'}, {self.nb_prices} known:",
+            "",
+            self.heatmap(route),
+            "",
+            "Cheapest by week:",
+            *(
+                f"  week of {monday.isoformat()}: {price:.0f}"
+                for monday, price in self.cheapest_by_week(route).items()
+            ),
+            "Cheapest by number of nights:",
+            *(
+                f"  {nights} nights: {price:.0f}"
+                for nights, price in self.cheapest_by_nights(route).items()
+            ),
+            "Percentiles: "
+            + ", ".join(
+                f"p{percent} {price:.0f}"
+                for percent, price in self.percentiles(route=route).items()
+            ),
+            "Cheapest trips:",
+            *(
+                f"  {point.departure_date.isoformat()} | {point.nights} nights | {point.route} | {point.price:.0f}"
+                for point in self.cheapest(5, route=route)
+            ),
+        ]
+        return "\n".join(lines)
+
+    def update(self, older: "PriceMatrix") -> None:
+        """Fill the unknown prices with the ones of an older matrix of the same search."""
+        with self._lock:
+            unknown = np.isnan(self.prices)
+            self.prices[unknown] = older.prices[unknown]
+            self.exact[unknown] = older.exact[unknown]
+
+    def same_search(self, other: "PriceMatrix") -> bool:
+        return (
+            self.routes == other.routes
+            and self.date_begin == other.date_begin
+            and self.min_nights == other.min_nights
+            and self.prices.shape == other.prices.shape
+        )
+
+    def save(self, path: Path) -> None:
+        """Save the matrix to a NumPy .npz file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, path.open("wb") as file:
+            np.savez_compressed(
+                file,
+                routes=np.array(self.routes),
+                date_begin=np.array(self.date_begin.isoformat()),
+                min_nights=np.array(self.min_nights),
+                prices=self.prices,
+                exact=self.exact,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "PriceMatrix":
+        """Load a matrix saved by ``save``.
+
+        Raises:
+            OSError: if the file cannot be read
+        """
+        with np.load(path) as data:
+            prices = data["prices"]
+            matrix = cls(
+                routes=[str(route) for route in data["routes"]],
+                date_begin=date.fromisoformat(str(data["date_begin"])),
+                date_end=date.fromisoformat(str(data["date_begin"]))
+                + timedelta(days=prices.shape[1] - 1),
+                min_nights=int(data["min_nights"]),
+                max_nights=int(data["min_nights"]) + prices.shape[2] - 1,
+            )
+            matrix.prices = prices
+            matrix.exact = data["exact"]
+        return matrix
+
+
+def save_price_matrix(matrix: PriceMatrix, path: Path, max_age: timedelta) -> None:
+    """Save the matrix of a search, with the prices of the previous one still fresh.
+
+    The URLs found in the result cache are not loaded again: their prices are taken from
+    the matrix of the previous search, if it searched the same routes and dates.
+
+    Args:
+        matrix (PriceMatrix): the prices seen by the search
+        path (Path): the .npz file
+        max_age (timedelta): how long the prices of the previous search stay fresh
+    """
+    if (
+        path.exists()
+        and datetime.now() - datetime.fromtimestamp(path.stat().st_mtime) < max_age
+    ):
+        try:
+            previous_matrix = PriceMatrix.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Cannot read the previous price matrix {path}: {e}")
+        else:
+            if matrix.same_search(previous_matrix):
+                matrix.update(previous_matrix)
+    matrix.save(path)
+    logger.info(
+        f"{matrix.nb_prices} price(s) saved to {path}: run 'python -m fff --price-matrix' to analyse them."
+    )
@@ -0,0 +1,27 @@
+from datetime import date
+
+from price_parser import Price
+from pydantic import BaseModel
+
+from fff.schemas.flexible_calendar import DateWindow
+
+
+class CalendarCell(BaseModel):
+    """Cheapest price of a departure date for a night window, read in a flexible calendar."""
+
+    url: str  # The search URL showing this calendar
+    route: str  # eg: "PAR-YUL"
+    departure_date: date
+    date_window: DateWindow
+    index: int  # Position of the cell among the calendar prices of the page
+    price: Price
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __str__(self) -> str:
+        return (
+            f"{self.departure_date.isoformat()} | "
+            f"{self.date_window.min_nights}-{self.date_window.max_nights} nights | "
+            f"{self.route} | {self.price.currency}{self.price.amount_text}"
+        )
@@ -0,0 +1,91 @@
+import hashlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Union
+
+from price_parser import Price
+from pydantic import BaseModel, HttpUrl, validator
+
+from fff.schemas.airport import AirportTrip
+
+
+class FlightTrip(BaseModel):
+    search_link: Union[HttpUrl, None]  # Search link for other flights at this date
+    direct_link: Union[HttpUrl, None]  # Direct link to the selling company
+    first_trip: Union[AirportTrip, None]
+    first_trip_date: datetime | None
+    return_trip: Union[AirportTrip, None]
+    return_trip_date: datetime | None
+    price: Price = Price.fromstring("100 €")
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {
+            Price: lambda price: {
+                "amount": None if price.amount is None else str(price.amount),
+                "currency": price.currency,
+                "amount_text": price.amount_text,
+            }
+        }
+
+    @validator("price", pre=True)
+    def parse_price(cls, value):
+        """Read back the price when it is exported as JSON."""
+        if isinstance(value, dict):
+            return Price(
+                amount=None if value["amount"] is None else Decimal(value["amount"]),
+                currency=value["currency"],
+                amount_text=value["amount_text"],
+            )
+        return value
+
+    @property
+    def key(self) -> str:
+        """Canonical identity of the trip: its legs and dates.
+
+        The same trip found on several URLs (overlapping date windows, or departure dates
+        clicked twice), or at another fare by a later search, has the same key, eg:
+        "CDG-YUL|2023-01-23T00:00|YUL-CDG|2023-02-04T00:00"
+
+        The fare is left out, as it changes over time. So is the booking link: its code
+        changes at each search of the website, and the result pages don't tell the provider.
+        """
+        return "|".join(
+            [
+                str(self.first_trip or ""),
+                self.first_trip_date.isoformat("T", "minutes")
+                if self.first_trip_date
+                else "",
+                str(self.return_trip or ""),
+                self.return_trip_date.isoformat("T", "minutes")
+                if self.return_trip_date
+                else "",
+            ]
+        )
+
+    @property
+    def trip_id(self) -> str:
+        """Short hash of the key, to identify the trip in the result stores."""
+        return hashlib.sha1(self.key.encode(), usedforsecurity=False).hexdigest()[:16]
+
+    def __repr__(self):
+        return f"### Flight trip {self.first_trip.from_airport}-{self.first_trip.destination_airport} at {self.first_trip_date.date().isoformat()}, return {self.return_trip.from_airport}-{self.return_trip.destination_airport} at {self.return_trip_date.date().isoformat()}, price {self.price.currency}{self.price.amount_text} ###\n#\n# Booking link: {self.direct_link}\n#\n# Other flights at this date:{self.search_link}\n###"
+
+    def __str__(self):
+        return self.__repr__()
+
+
+def unique_flight_trips(flight_trips: Iterable[FlightTrip]) -> List[FlightTrip]:
+    """The cheapest fare of each trip (same key), in the order the trips were first found."""
+    unique: Dict[str, FlightTrip] = {}
+    for flight_trip in flight_trips:
+        kept = unique.get(flight_trip.key)
+        if kept is None or _is_cheaper(flight_trip, kept):
+            unique[flight_trip.key] = flight_trip
+    return list(unique.values())
+
+
+def _is_cheaper(flight_trip: FlightTrip, other: FlightTrip) -> bool:
+    return flight_trip.price.amount is not None and (
+        other.price.amount is None or flight_trip.price.amount < other.price.amount
+    )
@@ -0,0 +1,25 @@
+from typing import List
+
+from pydantic import BaseModel, validator
+
+from fff.schemas.flight_trip import FlightTrip
+
+
+class UrlResult(BaseModel):
+    """The flight trips found on a search URL."""
+
+    flight_trips: List[FlightTrip]  # The cheapest ones, at most NUMBER_OF_RESULTS
+    # Every flight trip of the page within the searched dates. Default to the cheapest ones.
+    all_flight_trips: List[FlightTrip] = []
+    # Some departure dates were skipped, as they could not beat the top N of the search:
+    # the flight trips may not be the cheapest of the URL. Such a result is only valid for
+    # the current search: it is neither cached nor recorded.
+    pruned: bool = False
+
+    class Config:
+        # The nested models don't pass their encoders on
+        json_encoders = FlightTrip.__config__.json_encoders
+
+    @validator("all_flight_trips", always=True)
+    def default_to_cheapest(cls, all_flight_trips, values):
+        return all_flight_trips or values.get("flight_trips", [])
@@ -0,0 +1,261 @@
+"""State of a search run, whatever scraps its URLs: merged results, checkpoint and cache."""
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+from fff.cache import ResultCache
+from fff.checkpoint import CheckpointJournal
+from fff.config import Settings
+from fff.exceptions import ScrapingError
+from fff.export import Exporter, open_exporter, trip_row
+from fff.history import PriceHistory, fare_drop_alert
+from fff.merger import Pruner, SearchResults, TopFlightTrips
+from fff.schemas.flight_trip import FlightTrip
+from fff.schemas.url_result import UrlResult
+from fff.utils.logging import logger
+
+if TYPE_CHECKING:
+    from fff.url_generator import UrlGenerator
+
+
+class SearchSession:
+    """
+    A search run over the URLs of a ``UrlGenerator``.
+
+    The URLs already done (resumed from the checkpoint journal, or found in the result cache)
+    are merged right away. The other ones are listed in ``urls_to_scrap``: their outcome must
+    be reported with ``on_result`` or ``on_failure``, from a single thread.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        url_generator: "UrlGenerator",
+        search_urls: List[str],
+        read_cache: bool = True,
+        resume: bool = False,
+        history: PriceHistory | None = None,
+        export_paths: Sequence[Path] = (),
+    ):
+        """
+        Args:
+            settings (Settings): the search settings
+            url_generator (UrlGenerator): the generator of the search URLs
+            search_urls (List[str]): the search URLs
+            read_cache (bool): use the results of the URLs scraped recently, if the cache
+                is enabled. Otherwise, scrap every URL again (the cache is still refreshed).
+            resume (bool): resume the previous run from its checkpoint journal: only scrap
+                the URLs which are missing or failed.
+            history (PriceHistory | None): record every flight trip found, and alert on
+                fare drops. The URLs whose prices were stable recently are not scraped again:
+                their latest flight trips are used.
+            export_paths (Sequence[Path]): export the flight trips to these files, in
+                addition to the EXPORT_PATHS setting
+        """
+        self.settings = settings
+        self.history = history
+        self.url_generator = url_generator
+        self.search_results = SearchResults(
+            size=settings.NUMBER_OF_RESULTS,
+            route_of=lambda url: str(url_generator.url_round_trips[url]),
+        )
+        # The departure dates are pruned against the flight trips of this run and of the
+        # cache only: the latest trips of the stable URLs of the price history may be stale.
+        self.pruning_results: SearchResults | None = None
+        self.pruner: Pruner | None = None
+        if settings.PRUNE_DEPARTURE_DATES:
+            self.pruning_results = SearchResults(
+                size=settings.NUMBER_OF_RESULTS, route_of=self.search_results.route_of
+            )
+            self.pruner = Pruner(self.pruning_results.top_of)
+        self.failed_urls: List[str] = []
+
+        self.journal = CheckpointJournal(settings.CHECKPOINT_PATH)
+        completed_urls: Dict[str, List[FlightTrip]] = {}
+        if resume:
+            completed_urls = self.journal.completed()
+        else:
+            self.journal.reset()
+
+        self.cache: ResultCache | None = None
+        if settings.CACHE_ENABLED:
+            self.cache = ResultCache(
+                path=settings.CACHE_PATH,
+                ttl=timedelta(hours=settings.CACHE_TTL),
+                max_size=int(settings.CACHE_MAX_SIZE * 1024 * 1024),
+            )
+
+        if history is not None:
+            search_urls = self._plan_with_history(search_urls)
+
+        self.urls_to_scrap: List[str] = []
+        for url in search_urls:
+            if url in completed_urls:
+                self._merge(url, completed_urls[url])
+                continue
+            cached_flight_trips = (
+                self.cache.get(url, nb_results=settings.NUMBER_OF_RESULTS)
+                if self.cache is not None and read_cache
+                else None
+            )
+            if cached_flight_trips is None:
+                self.urls_to_scrap.append(url)
+            else:
+                self._merge(url, cached_flight_trips)
+                self.journal.record_success(url, cached_flight_trips, scraping_time=0)
+        if resume:
+            logger.info(
+                f"Resuming the search: {len(search_urls) - len(self.urls_to_scrap)}/{len(search_urls)} URL(s) already done."
+            )
+
+        # Only the flight trips scraped by this run are exported, not the ones merged above.
+        self.exporters: List[Exporter] = [
+            open_exporter(path)
+            for path in [
+                *(
+                    Path(p.strip())
+                    for p in settings.EXPORT_PATHS.split(",")
+                    if p.strip()
+                ),
+                *export_paths,
+            ]
+        ]
+
+    def _plan_with_history(self, search_urls: List[str]) -> List[str]:
+        """Merge the latest flight trips of the stable URLs, and list the URLs to scrap again."""
+        assert self.history is not None  # nosec
+        known_flight_trips = TopFlightTrips(self.settings.NUMBER_OF_RESULTS)
+        for url in search_urls:
+            known_flight_trips.extend(self.history.latest(url) or [])
+        due_urls, stable_urls = self.history.plan(
+            search_urls,
+            interval=self.settings.WATCH_INTERVAL * 60,
+            price_to_beat=known_flight_trips.worst_price,
+        )
+        for url, flight_trips in stable_urls.items():
+            self._merge(url, flight_trips, from_history=True)
+        return due_urls
+
+    def _merge(
+        self, url: str, flight_trips: List[FlightTrip], from_history: bool = False
+    ) -> bool:
+        """Merge the flight trips of a URL.
+
+        Args:
+            url (str): the search URL
+            flight_trips (List[FlightTrip]): its flight trips
+            from_history (bool): the flight trips are the latest ones of the price history.
+                They don't prune the departure dates of the other URLs.
+
+        Returns:
+            bool: whether the overall top N changed
+        """
+        if self.pruning_results is not None and not from_history:
+            self.pruning_results.extend(url, flight_trips)
+        return self.search_results.extend(url, flight_trips)
+
+    def _export(self, url: str, flight_trips: List[FlightTrip]) -> None:
+        if self.exporters:
+            route = str(self.url_generator.url_round_trips[url])
+            rows = [trip_row(url, route, trip) for trip in flight_trips]
+            for exporter in self.exporters:
+                exporter.write(rows)
+
+    def on_result(self, url: str, result: UrlResult, scraping_time: float) -> bool:
+        """Merge the cheapest flight trips of a URL, then export and record all of them.
+
+        A pruned result is only merged: its flight trips may not be the cheapest of the URL,
+        so it is neither cached nor recorded, and a resumed search scraps the URL again.
+
+        Returns:
+            bool: whether the overall top N changed
+        """
+        flight_trips = result.flight_trips
+        changed = self._merge(url, flight_trips)
+        self._export(url, result.all_flight_trips)
+        if changed:
+            print(
+                "Cheapest flights so far: "
+                + ", ".join(
+                    f"{trip.price.currency}{trip.price.amount_text}"
+                    for trip in self.search_results.overall.best()
+                )
+            )
+        if result.pruned:
+            return changed
+        if self.history is not None:
+            route = str(self.url_generator.url_round_trips[url])
+            alert = fare_drop_alert(
+                route,
+                result.all_flight_trips,
+                previous_minimum=self.history.minimum_price(route),
+                threshold=self.settings.WATCH_ALERT_THRESHOLD,
+            )
+            if alert is not None:
+                print(alert)
+            # Every flight trip of the page, not only the ones competing for the top N
+            self.history.record(url, route, result.all_flight_trips)
+        self.journal.record_success(url, flight_trips, scraping_time)
+        if self.cache is not None:
+            self.cache.set(
+                url,
+                flight_trips,
+                nb_results=self.settings.NUMBER_OF_RESULTS,
+                scraping_time=scraping_time,
+            )
+        return changed
+
+    def on_failure(self, url: str, error: ScrapingError) -> None:
+        self.failed_urls.append(url)
+        self.journal.record_failure(url, error)
+
+    def close(self) -> None:
+        """Log the statistics of the run, and close the cache and the exports."""
+        for exporter in self.exporters:
+            exporter.close()
+            logger.info(
+                f"{exporter.nb_rows} flight trip(s) exported to {exporter.path}"
+            )
+        if self.search_results.nb_duplicates:
+            logger.info(
+                f"{self.search_results.nb_duplicates} flight trip(s) of the top N found again on other URLs, kept once."
+            )
+        if self.pruner is not None:
+            self.pruner.log_stats()
+        if self.cache is not None:
+            self.cache.log_stats()
+            self.cache.close()
+        if self.failed_urls:
+            logger.warning(
+                f"{len(self.failed_urls)} URL(s) could not be scraped: the results are incomplete. Run 'python -m fff --resume' to scrap them again."
+            )
+
+    @property
+    def results(self) -> List[FlightTrip]:
+        """The N cheapest flight trips of all the routes."""
+        return self.search_results.overall.best()
+
+    @property
+    def route_results(self) -> Dict[str, List[FlightTrip]]:
+        """The N cheapest flight trips of each route."""
+        return {route: top.best() for route, top in self.search_results.routes.items()}
+
+    def print_results(self) -> None:
+        """Print the cheapest flights of each route, then of all the routes together."""
+        round_trips = self.url_generator.round_trips
+        if len(round_trips) > 1:
+            route_results = self.route_results
+            for round_trip in round_trips:
+                results = route_results.get(str(round_trip), [])
+                print(
+                    f"Here are the {len(results)} cheapest flights from {round_trip.from_airport} to {round_trip.destination_airport}:\n\n"
+                    + "\n\n".join([str(result) for result in results])
+                    + "\n\n"
+                )
+            print("All routes together:\n")
+        results = self.results
+        print(
+            f"Here are the {len(results)} cheapest flights matching your criterias:\n\n"
+            + "\n\n".join([str(result) for result in results])
+            + "\n\nDone!"
+        )
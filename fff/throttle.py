@@ -0,0 +1,174 @@
+"""
+Pace the requests to the website, so that it does not block the bots.
+
+Every page load goes through a ``RequestScheduler``, shared by all the bots:
+
+- a token bucket enforces the maximum request rate
+- a concurrency limit caps the number of pages loading at the same time. It is adjusted
+  AIMD-style (additive increase, multiplicative decrease): it grows slowly while the pages
+  load fast, and is halved when they are slow, time out or show a captcha.
+"""
+import threading
+from enum import Enum
+from time import monotonic
+from typing import Callable
+
+from fff.utils.logging import logger
+
+# Signs of a bot detection page, in its URL or title (lower case)
+CAPTCHA_MARKERS = ("captcha", "/help/bots", "bot detection", "are you a robot")
+# Run in the browser: whether the page displays a captcha widget
+CAPTCHA_ELEMENT_SCRIPT = """
+return document.querySelector(
+    "iframe[src*='captcha'], .g-recaptcha, .h-captcha, #px-captcha"
+) !== null;
+"""
+
+
+class PageOutcome(Enum):
+    OK = "ok"
+    TIMEOUT = "timeout"  # The search did not finish in time
+    CAPTCHA = "captcha"  # The website suspects a bot
+    ERROR = "error"  # Anything else, not related to the request pace
+
+
+def is_captcha_page(url: str, title: str) -> bool:
+    """Whether a page URL or title looks like a bot detection page."""
+    text = f"{url} {title}".lower()
+    return any(marker in text for marker in CAPTCHA_MARKERS)
+
+
+class RequestScheduler:
+    """
+    Token bucket rate limiter and AIMD concurrency controller. Thread-safe.
+
+    Call ``acquire`` before loading a page, and ``release`` with its outcome once it is loaded.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        max_concurrency: int,
+        slow_page_load: float,
+        clock: Callable[[], float] = monotonic,
+    ):
+        """
+        Args:
+            requests_per_minute (float): maximum request rate
+            max_concurrency (int): maximum number of pages loading at the same time
+            slow_page_load (float): a page loading slower than this, in seconds, is a sign
+                of congestion
+            clock (Callable[[], float]): monotonic clock, in seconds
+        """
+        self.max_rate = requests_per_minute / 60
+        self.rate = self.max_rate  # Requests per second
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.slow_page_load = slow_page_load
+        self.clock = clock
+        # Allow all the browsers to start at once
+        self.capacity = float(max(1, max_concurrency))
+        self._tokens = self.capacity
+        self._last_refill = clock()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.nb_requests = 0
+        self.nb_slow = 0
+        self.nb_timeouts = 0
+        self.nb_captchas = 0
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+
+    def _seconds_to_next_token(self) -> float:
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def acquire(self) -> None:
+        """Wait for a token and for a concurrency slot, then take them."""
+        with self._condition:
+            while True:
+                self._refill()
+                has_slot = self._in_flight < int(self.concurrency_limit)
+                if has_slot and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._in_flight += 1
+                    self.nb_requests += 1
+                    return
+                # Without a free slot, wait for a page to be released.
+                self._condition.wait(
+                    timeout=self._seconds_to_next_token() if has_slot else None
+                )
+
+    def try_acquire_token(self) -> bool:
+        """Take a token if one is available, without waiting nor taking a concurrency slot.
+
+        For the optional requests, like prefetching a page in the background.
+        """
+        with self._condition:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.nb_requests += 1
+            return True
+
+    def release(self, outcome: PageOutcome, load_time: float) -> None:
+        """Free the concurrency slot of a page, and adapt the pace to its outcome.
+
+        Args:
+            outcome (PageOutcome): how the page load ended
+            load_time (float): how long the page took to load, in seconds
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if outcome == PageOutcome.CAPTCHA:
+                self.nb_captchas += 1
+                self._decrease("a captcha was displayed", slow_down=True)
+            elif outcome == PageOutcome.TIMEOUT:
+                self.nb_timeouts += 1
+                self._decrease("a search timed out")
+            elif outcome == PageOutcome.OK and load_time > self.slow_page_load:
+                self.nb_slow += 1
+                self._decrease(f"a page took {load_time:.0f}s to load")
+            elif outcome == PageOutcome.OK:
+                self._increase()
+            self._condition.notify_all()
+
+    def _decrease(self, reason: str, slow_down: bool = False) -> None:
+        """Multiplicative decrease of the concurrency limit (and of the rate)."""
+        self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+        if slow_down:
+            # Never slower than 1/64 of the maximum rate
+            self.rate = max(self.max_rate / 64, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+        logger.warning(
+            f"Slowing down, as {reason}: {int(self.concurrency_limit)} page(s) at the same time, "
+            f"{self.rate * 60:.1f} request(s) per minute at most."
+        )
+
+    def _increase(self) -> None:
+        """Additive increase: about one more concurrent page per limit's worth of fast pages."""
+        previous_limit = int(self.concurrency_limit)
+        previous_rate = self.rate
+        self.concurrency_limit = min(
+            float(self.max_concurrency),
+            self.concurrency_limit + 1 / self.concurrency_limit,
+        )
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+        if int(self.concurrency_limit) > previous_limit or self.rate > previous_rate:
+            logger.info(
+                f"Speeding up: {int(self.concurrency_limit)} page(s) at the same time, "
+                f"{self.rate * 60:.1f} request(s) per minute at most."
+            )
+
+    def log_stats(self) -> None:
+        if self.nb_requests:
+            logger.info(
+                f"Request pace: {self.nb_requests} request(s), {self.nb_captchas} captcha(s), "
+                f"{self.nb_timeouts} timeout(s), {self.nb_slow} slow page(s). Final pace: "
+                f"{int(self.concurrency_limit)} page(s) at the same time, {self.rate * 60:.1f} request(s) per minute."
+            )
@@ -0,0 +1,206 @@
+"""
+Time the phases of a search, to find out where a run spends its time.
+
+The hot paths are wrapped in named spans::
+
+    with tracer.span("page_load"):
+        ...
+
+    @traced("parse_date")
+    def parse_date(...):
+        ...
+
+At the end of a run, ``tracer.report`` logs the count, total, median and 95th percentile
+duration of each phase. It can also export the spans as a Chrome trace (to open in
+chrome://tracing or https://ui.perfetto.dev) and as a Prometheus textfile (for the
+textfile collector of the node exporter).
+"""
+import json
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, NamedTuple, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+# Spans kept for the Chrome trace. The durations of the phases are always all kept.
+MAX_TRACE_EVENTS = 100_000
+
+
+class Span(NamedTuple):
+    name: str
+    start: float  # perf_counter() at the start, in seconds
+    duration: float  # in seconds
+    thread_id: int
+
+
+class PhaseStats(NamedTuple):
+    name: str
+    count: int
+    total: float  # in seconds
+    p50: float
+    p95: float
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values.
+
+    Args:
+        sorted_values (List[float]): the values, sorted. Must not be empty.
+        fraction (float): between 0 and 1, eg: 0.95 for the 95th percentile
+    """
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Tracer:
+    """Record the duration of named spans. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the spans recorded, before a new run."""
+        with self._lock:
+            self.origin = perf_counter()
+            self.durations: Dict[str, List[float]] = defaultdict(list)
+            self.spans: List[Span] = []
+
+    def record(self, name: str, start: float, duration: float) -> None:
+        with self._lock:
+            self.durations[name].append(duration)
+            if len(self.spans) < MAX_TRACE_EVENTS:
+                self.spans.append(Span(name, start, duration, threading.get_ident()))
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the code run in the ``with`` block, as a span of the given phase."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, perf_counter() - start)
+
+    def stats(self) -> List[PhaseStats]:
+        """Statistics of each phase, the longest in total first."""
+        with self._lock:
+            durations = {
+                name: sorted(values) for name, values in self.durations.items()
+            }
+        result = [
+            PhaseStats(
+                name=name,
+                count=len(values),
+                total=sum(values),
+                p50=percentile(values, 0.5),
+                p95=percentile(values, 0.95),
+            )
+            for name, values in durations.items()
+        ]
+        result.sort(key=lambda phase: phase.total, reverse=True)
+        return result
+
+    def summary(self) -> str:
+        """The statistics of each phase, as a table."""
+        lines = [
+            f"{'Phase':<20} {'Count':>7} {'Total (s)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}"
+        ]
+        for phase in self.stats():
+            lines.append(
+                f"{phase.name:<20} {phase.count:>7} {phase.total:>10.2f} "
+                f"{phase.p50 * 1000:>10.1f} {phase.p95 * 1000:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the spans in the Chrome trace event format."""
+        with self._lock:
+            spans = list(self.spans)
+        events = [
+            {
+                "name": span.name,
+                "cat": "fff",
+                "ph": "X",  # Complete event: with a start and a duration
+                "ts": round((span.start - self.origin) * 1e6),  # In microseconds
+                "dur": round(span.duration * 1e6),
+                "pid": os.getpid(),
+                "tid": span.thread_id,
+            }
+            for span in spans
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}),
+            encoding="utf-8",
+        )
+
+    def write_prometheus_textfile(self, path: Path) -> None:
+        """Write the phase statistics as a Prometheus summary, in the text format.
+
+        The file is replaced atomically, so that the node exporter never reads half of it.
+        """
+        lines = [
+            "# HELP fff_phase_duration_seconds Time spent in each phase of the last search.",
+            "# TYPE fff_phase_duration_seconds summary",
+        ]
+        for phase in self.stats():
+            labels = f'phase="{phase.name}"'
+            lines += [
+                f'fff_phase_duration_seconds{{{labels},quantile="0.5"}} {phase.p50:.6f}',
+                f'fff_phase_duration_seconds{{{labels},quantile="0.95"}} {phase.p95:.6f}',
+                f"fff_phase_duration_seconds_sum{{{labels}}} {phase.total:.6f}",
+                f"fff_phase_duration_seconds_count{{{labels}}} {phase.count}",
+            ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(path.name + ".tmp")
+        temporary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        temporary_path.replace(path)
+
+    def report(
+        self, trace_path: Path | None = None, metrics_path: Path | None = None
+    ) -> None:
+        """Log the statistics of each phase, and export the spans if asked to.
+
+        Args:
+            trace_path (Path | None): write the spans to this Chrome trace JSON file
+            metrics_path (Path | None): write the phase statistics to this Prometheus
+                textfile
+        """
+        # Imported on first use: the date parsing of the schemas is traced
+        from fff.utils.logging import logger
+
+        if not self.durations:
+            return
+        logger.info("Time spent in each phase:\n" + self.summary())
+        if trace_path is not None:
+            self.write_chrome_trace(trace_path)
+            logger.info(f"Chrome trace written to {trace_path}")
+        if metrics_path is not None:
+            self.write_prometheus_textfile(metrics_path)
+            logger.info(f"Prometheus metrics written to {metrics_path}")
+
+
+# Shared by all the bots of the process
+tracer = Tracer()
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator: time each call of the function, as a span of the given phase."""
+
+    def decorator(function: F) -> F:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                tracer.record(name, start, perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
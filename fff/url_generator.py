@@ -0,0 +1,174 @@
+"""Generate the search URLs of the website, from the settings."""
+from datetime import date
+from typing import Dict, List, Union
+
+from fff.config import Settings, get_settings
+from fff.planner import PlannedSearch, plan_searches, valid_pairs
+from fff.schemas.airport import AirPort, AirportTrip
+from fff.schemas.baggage import BaggageList
+from fff.schemas.flexible_calendar import DateWindow, FlexibleCalendar
+from fff.schemas.flight_duration import FlightDurationFilter
+from fff.schemas.flight_search import FlightSearchParameters
+from fff.schemas.layover import LayoverFilter
+from fff.schemas.passenger import PassengerList
+from fff.schemas.stop import MaxStopFilter
+from fff.utils.datetime import split_date_window
+from fff.utils.logging import logger
+
+
+class UrlGenerator:
+    def __init__(self, settings: Settings | None = None):
+        """
+        Args:
+            settings (Settings | None): the search settings. Default to the environment ones.
+        """
+        self.settings = settings if settings is not None else get_settings()
+        self.flexible_calendar = FlexibleCalendar(
+            min_nights=self.settings.MIN_NIGHTS, max_nights=self.settings.MAX_NIGHTS
+        )
+        self.passenger_list = PassengerList(
+            adults=self.settings.PASSENGER_ADULTS,
+            children=self.settings.PASSENGER_CHILDREN,
+            infant_on_lap=self.settings.PASSENGER_INFANTS_ON_LAP,
+            seniors=self.settings.PASSENGER_SENIORS,
+            students=self.settings.PASSENGER_STUDENTS,
+            toddlers_in_seat=self.settings.PASSENGER_TODDLERS_IN_OWN_SEAT,
+            youths=self.settings.PASSENGER_YOUTHS,
+        )
+        self.baggage_list = BaggageList(
+            checked_bags=self.settings.CHECKED_BAG_PER_PASSENGER,
+            carry_on_bags=self.settings.CARRY_ON_BAG_PER_PASSENGER,
+        )
+        self.max_stop_filter = MaxStopFilter(number_of_stops=self.settings.MAX_STOPS)
+        self.flight_duration_filter = FlightDurationFilter(
+            max_time=self.settings.MAX_FLIGHT_DURATION
+        )
+        self.layover_filter = LayoverFilter(
+            min_time=self.settings.MIN_LAYOVER_DURATION,
+            max_time=self.settings.MAX_LAYOVER_DURATION,
+        )
+        self.search_parameters = FlightSearchParameters(
+            passenger_list=self.passenger_list,
+            baggage_list=self.baggage_list,
+            max_stop_filter=self.max_stop_filter,
+            layover_filter=self.layover_filter,
+            flight_duration_filter=self.flight_duration_filter,
+        )
+        # # Avoid looking for dates in the past
+        if self.settings.SEARCH_DATE_BEGIN > date.today():
+            search_date_begin = self.settings.SEARCH_DATE_BEGIN
+        else:
+            search_date_begin = date.today()
+            logger.warning(
+                f"Cannot search a flight from a date in the past ({self.settings.SEARCH_DATE_BEGIN}). The research will start from today ({search_date_begin})."
+            )
+
+        if self.settings.SEARCH_DATE_END <= search_date_begin:
+            raise ValueError(
+                f"End of search date ({self.settings.SEARCH_DATE_END}) should be later than the begin of search date ({search_date_begin}). Please check your settings or env file."
+            )
+
+        self.date_tuples = split_date_window(
+            search_date_begin, self.settings.SEARCH_DATE_END
+        )
+        self.planned_searches = plan_searches(
+            search_date_begin,
+            self.settings.SEARCH_DATE_END,
+            min_nights=self.settings.MIN_NIGHTS,
+            max_nights=self.settings.MAX_NIGHTS,
+        )
+
+        # Search every origin - destination combination
+        self.from_airports = [
+            AirPort(
+                code=code.strip(),
+                allow_nearby_airports=self.settings.FROM_ALLOW_NEARBY_AIRPORTS,
+            )
+            for code in self.settings.FROM_AIRPORT.split(",")
+        ]
+        self.destination_airports = [
+            AirPort(
+                code=code.strip(),
+                allow_nearby_airports=self.settings.DESTINATION_ALLOW_NEARBY_AIRPORTS,
+            )
+            for code in self.settings.DESTINATION_AIRPORT.split(",")
+        ]
+        self.round_trips = [
+            AirportTrip(from_airport=from_airport, destination_airport=destination)
+            for from_airport in self.from_airports
+            for destination in self.destination_airports
+            if from_airport.code != destination.code
+        ]
+        if not self.round_trips:
+            raise ValueError(
+                f"No route to search from {self.settings.FROM_AIRPORT} to {self.settings.DESTINATION_AIRPORT}. Please check your settings or env file."
+            )
+        # Route searched by each generated URL
+        self.url_round_trips: Dict[str, AirportTrip] = {}
+        # Period and night window searched by each generated URL
+        self.url_searches: Dict[str, PlannedSearch] = {}
+
+    @property
+    def date_begin(self) -> date:
+        return self.date_tuples[0][0]
+
+    @property
+    def date_end(self) -> date:
+        return self.date_tuples[-1][1]
+
+    def generate_url(
+        self,
+        start_date: date,
+        end_date: date,
+        date_window: Union[DateWindow, None] = None,
+        round_trip: Union[AirportTrip, None] = None,
+    ) -> str:
+        """
+        Generate the search URL for a given date.
+
+        Args:
+            round_trip (AirportTrip | None): the route to search. Default to the first one.
+
+        Returns:
+            str: The URL
+        """
+        if round_trip is None:
+            round_trip = self.round_trips[0]
+        url = f"{self.settings.WEBSITE_URL}/flights/{round_trip}/{start_date.isoformat()}/{end_date.isoformat()}"
+        if date_window:
+            url = (
+                url
+                + f"-flexible-calendar-{date_window.min_nights}to{date_window.max_nights}"
+            )
+        url = url + str(self.search_parameters)
+        return url
+
+    def generate_urls(self, flexible_calendar: bool = True) -> List[str]:
+        """Generate the list of URL to scrap
+
+        Returns:
+            List[str]: The list of URLs
+        """
+
+        urls: List[str] = []
+        for round_trip in self.round_trips:
+            for planned_search in self.planned_searches:
+                url = self.generate_url(*planned_search, round_trip=round_trip)
+                logger.debug(f"Adding URL: {url}")
+                urls.append(url)
+                self.url_round_trips[url] = round_trip
+                self.url_searches[url] = planned_search
+        nb_pairs = len(
+            valid_pairs(
+                self.date_begin,
+                self.date_end,
+                min_nights=self.settings.MIN_NIGHTS,
+                max_nights=self.settings.MAX_NIGHTS,
+            )
+        )
+        logger.info(
+            f"Search plan: {len(urls)} URL(s) covering {nb_pairs} (departure date, nights) pairs "
+            f"for {len(self.round_trips)} route(s), instead of "
+            f"{len(self.flexible_calendar.date_windows) * len(self.date_tuples) * len(self.round_trips)} URL(s) with fixed date windows."
+        )
+        return urls
@@ -1,11 +1,21 @@
+import re
 from datetime import date, datetime, timedelta
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
-import dateparser
-from dateutil.relativedelta import relativedelta
 from pydantic import NonNegativeFloat
 
-from fff.config import settings
+from fff.tracing import traced
+
+# Short dates displayed by the website, with an optional weekday: "Sat 1/14", "sam. 14/1",
+# "Sa., 14.1."
+SHORT_DATE_REGEX = re.compile(
+    r"^\s*(?:[^\W\d_]+\.?,?\s+)?(\d{1,2})\s*[/.-]\s*(\d{1,2})\.?\s*$"
+)
+# Languages whose short dates put the month first. The other ones put the day first.
+MONTH_FIRST_LANGUAGES = {"en"}
+# An explicit year in a date string
+YEAR_REGEX = re.compile(r"\b(\d{4})\b")
 
 
 def hours_to_minutes(time_in_hours: NonNegativeFloat) -> int:
@@ -59,12 +69,99 @@ def split_date_window(start_date: date, end_date: date) -> List[tuple[date, date
         return result
 
 
-def parse_date(date_str: str) -> datetime:
-    date_time = dateparser.parse(date_str, languages=[settings.WEBSITE_LANGUAGE])
+@lru_cache(maxsize=1024)
+def _parse_date_parts(date_str: str, language: str) -> Tuple[int | None, int, int]:
+    """Parse the year (if any), month and day of a date string. Memoized.
+
+    The short dates of the website are parsed with a regular expression. dateparser, much
+    slower (and slow to import), only parses the other ones.
+
+    Raises:
+        ValueError: if no date can be parsed
+    """
+    match = SHORT_DATE_REGEX.match(date_str)
+    if match:
+        first, second = int(match.group(1)), int(match.group(2))
+        month, day = (
+            (first, second) if language in MONTH_FIRST_LANGUAGES else (second, first)
+        )
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return None, month, day
+    import dateparser
+
+    date_time = dateparser.parse(date_str, languages=[language])
     if not date_time:
         raise ValueError(f"Could not parse any date in this string: {date_str}")
-    if date_time <= datetime.now():
-        # We are PROBABLY at the previous year. TODO Check when we look for trip more than one year ahead.
-        # We should instead parse the year written on the calendar on the result page.
-        date_time += relativedelta(years=1)
-    return date_time
+    explicit_year = YEAR_REGEX.search(date_str)
+    return (
+        date_time.year if explicit_year else None,
+        date_time.month,
+        date_time.day,
+    )
+
+
+def infer_year(
+    month: int, day: int, date_window: Tuple[date, date] | None = None
+) -> date:
+    """The date of a day without year, closest to the search window.
+
+    Args:
+        month (int): the month
+        day (int): the day of the month
+        date_window (Tuple[date, date] | None): the first and last dates of the search.
+            Without it, the date is the next occurrence of the day, from today.
+
+    Raises:
+        ValueError: if the day does not exist (eg: February 30th)
+    """
+    today = date.today()
+    start, end = date_window if date_window is not None else (today, today)
+    candidates: List[date] = []
+    # Up to 4 years later, for February 29th to fall on a leap year
+    for year in range(start.year - 1, end.year + 5):
+        try:
+            candidates.append(date(year, month, day))
+        except ValueError:
+            # February 29th of a non leap year
+            pass
+    if date_window is None:
+        candidates = [candidate for candidate in candidates if candidate >= today]
+    if not candidates:
+        raise ValueError(f"There is no such day: {month}/{day}")
+
+    def distance_to_window(candidate: date) -> int:
+        if candidate < start:
+            return (start - candidate).days
+        if candidate > end:
+            return (candidate - end).days
+        return 0
+
+    return min(candidates, key=distance_to_window)
+
+
+@traced("parse_date")
+def parse_date(
+    date_str: str,
+    language: str = "en",
+    date_window: Tuple[date, date] | None = None,
+) -> datetime:
+    """Parse a date displayed by the website, whose year is usually not written.
+
+    Args:
+        date_str (str): the date, eg: "Sat 1/14"
+        language (str): the website language (WEBSITE_LANGUAGE setting)
+        date_window (Tuple[date, date] | None): the first and last dates of the search:
+            the year is chosen to be within it, or the closest to it. Without it, the
+            date is the next occurrence of the day.
+
+    Raises:
+        ValueError: if no date can be parsed
+
+    Returns:
+        datetime: the date, at midnight
+    """
+    year, month, day = _parse_date_parts(date_str, language)
+    if year is not None:
+        return datetime(year, month, day)
+    day_date = infer_year(month, day, date_window)
+    return datetime(day_date.year, day_date.month, day_date.day)
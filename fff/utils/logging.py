@@ -3,10 +3,14 @@ import sys
 
 from loguru import logger as loguru_logger
 
-from fff.config import settings
 
-loguru_logger.remove()
-loguru_logger.add(sys.stderr, level=settings.LOG_LEVEL, colorize=False)
+def configure_logging(level: str = "INFO") -> None:
+    """Log to the standard error output, from the given level (the LOG_LEVEL setting)."""
+    loguru_logger.remove()
+    loguru_logger.add(sys.stderr, level=level, colorize=False)
+
+
+configure_logging()
 
 
 class InterceptHandler(logging.Handler):  # type: ignore
@@ -11,3 +11,27 @@ class progressbar_is_full(object):
     def __call__(self, driver):
         progressbar = driver.find_element(*self.locator)
         return "(100%)" in progressbar.get_attribute("style")
+
+
+class elements_are_stable(object):
+    """
+    An expectation for checking that the elements matching the locator did not change over consecutive polls.
+
+    Used to know when the return flights of a clicked departure date are all displayed,
+    whether they are added to the list or replace it.
+    """
+
+    def __init__(self, locator, nb_polls: int):
+        self.locator = locator
+        self.nb_polls = nb_polls
+        self.element_ids = None
+        self.nb_stable_polls = 0
+
+    def __call__(self, driver):
+        element_ids = [element.id for element in driver.find_elements(*self.locator)]
+        if element_ids == self.element_ids:
+            self.nb_stable_polls += 1
+        else:
+            self.element_ids = element_ids
+            self.nb_stable_polls = 0
+        return self.nb_stable_polls >= self.nb_polls
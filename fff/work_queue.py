@@ -0,0 +1,340 @@
+"""
+Queue of the search URLs, shared by the workers of a distributed search.
+
+The coordinator publishes the URLs of a search, the workers claim them one at a time and
+report their flight trips, and the coordinator merges them. A claim is a lease: if the
+worker does not report the URL before the lease expires (eg: it crashed), another worker
+claims it.
+
+``WorkQueue`` is the interface of a queue backend. ``SqliteWorkQueue`` shares a SQLite file:
+its locks make the claims atomic between the processes of a host, or between hosts
+sharing a file system with working locks. A broker (eg: Redis) can implement the same
+interface and be registered in ``WORK_QUEUE_BACKENDS``.
+"""
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from time import time
+from typing import Callable, Dict, List, NamedTuple
+
+from fff.schemas.url_result import UrlResult
+
+# A URL claimed this many times without a result is failed. A worker already makes
+# URL_MAX_ATTEMPTS attempts for each claim.
+MAX_CLAIMS = 2
+
+
+class WorkItem(NamedTuple):
+    """A URL claimed by a worker."""
+
+    url: str
+    route: str  # eg: "PAR-YUL"
+    worker_id: str
+    claims: int  # How many times the URL was claimed, this one included
+
+
+class FinishedUrl(NamedTuple):
+    """Outcome of a URL, reported by a worker."""
+
+    sequence: int  # Order in which the URLs finished, from 1
+    url: str
+    claims: int  # How many times the URL was claimed
+    result: UrlResult | None  # None if the URL failed
+    error: str | None
+    scraping_time: float
+
+
+class WorkQueue(ABC):
+    """Interface of the work queue backends. They must be safe to share between processes."""
+
+    @abstractmethod
+    def publish(self, search_settings: str, urls: Dict[str, str]) -> None:
+        """Replace the queue content with the URLs of a new search.
+
+        Args:
+            search_settings (str): the search settings, as JSON, for the workers
+            urls (Dict[str, str]): the route of each URL to scrap
+        """
+
+    @abstractmethod
+    def search_settings(self) -> str | None:
+        """The settings of the published search, as JSON, or None if there is none."""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease: float) -> WorkItem | None:
+        """Claim the next pending URL, or a URL whose lease expired.
+
+        Args:
+            worker_id (str): identifies the worker
+            lease (float): how long the URL is reserved to the worker, in seconds
+
+        Returns:
+            WorkItem | None: the URL to scrap, or None if there is nothing to claim now
+        """
+
+    @abstractmethod
+    def renew(self, item: WorkItem, lease: float) -> None:
+        """Extend the lease of a URL still being scraped."""
+
+    @abstractmethod
+    def complete(self, item: WorkItem, result: UrlResult, scraping_time: float) -> None:
+        """Report the flight trips of a URL. The first report wins."""
+
+    @abstractmethod
+    def fail(self, item: WorkItem, error: str) -> None:
+        """Report a failed claim: the URL goes back to the queue, up to MAX_CLAIMS times."""
+
+    @abstractmethod
+    def expire(self) -> None:
+        """Fail the URLs whose lease expired MAX_CLAIMS times: their workers keep crashing.
+
+        The claims also do it. The coordinator does it too, in case every worker is gone.
+        """
+
+    @abstractmethod
+    def finished(self, after: int = 0) -> List[FinishedUrl]:
+        """The URLs finished (done or failed) after the given sequence number, in order."""
+
+    @abstractmethod
+    def progress(self) -> Dict[str, int]:
+        """Number of URLs by status: pending, claimed, done and failed."""
+
+    def is_drained(self) -> bool:
+        """Whether every URL is done or failed."""
+        progress = self.progress()
+        return not progress["pending"] and not progress["claimed"]
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteWorkQueue(WorkQueue):
+    """Work queue in a SQLite file. Thread-safe."""
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time):
+        """
+        Args:
+            path (Path): the SQLite database file. It is created if it doesn't exist.
+            clock (Callable[[], float]): the current timestamp, in seconds
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.clock = clock
+        # Autocommit mode: the transactions are explicit
+        self.connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(urls)")]
+        if columns and "result" not in columns:
+            # Queue of an older version: it only holds the URLs of its latest search.
+            self.connection.execute("DROP TABLE urls")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS search (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                settings TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                route TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id TEXT,
+                lease_expires_at REAL,
+                claims INTEGER NOT NULL DEFAULT 0,
+                sequence INTEGER,
+                result TEXT,
+                error TEXT,
+                scraping_time REAL
+            );
+            CREATE INDEX IF NOT EXISTS urls_status ON urls (status, lease_expires_at);
+            CREATE INDEX IF NOT EXISTS urls_sequence ON urls (sequence);
+            """
+        )
+
+    def _transaction(self, statements: Callable[[sqlite3.Cursor], object]):
+        """Run statements in a write transaction, which locks the file for the others."""
+        with self._lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(cursor)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+
+    def publish(self, search_settings: str, urls: Dict[str, str]) -> None:
+        def statements(cursor: sqlite3.Cursor) -> None:
+            cursor.execute("DELETE FROM urls")
+            cursor.execute("DELETE FROM search")
+            cursor.execute("INSERT INTO search VALUES (1, ?)", (search_settings,))
+            cursor.executemany(
+                "INSERT INTO urls (url, route) VALUES (?, ?)", list(urls.items())
+            )
+
+        self._transaction(statements)
+
+    def search_settings(self) -> str | None:
+        with self._lock:
+            row = self.connection.execute("SELECT settings FROM search").fetchone()
+        return row[0] if row else None
+
+    def _expire(self, cursor: sqlite3.Cursor, now: float) -> None:
+        # The workers claiming these URLs keep crashing, or hanging: give up.
+        abandoned_urls = cursor.execute(
+            """
+            SELECT url FROM urls
+            WHERE status = 'claimed' AND lease_expires_at < ? AND claims >= ?
+            """,
+            (now, MAX_CLAIMS),
+        ).fetchall()
+        for (url,) in abandoned_urls:
+            self._finish(
+                cursor,
+                url,
+                status="failed",
+                error=f"No result after {MAX_CLAIMS} claim(s): the leases expired",
+            )
+
+    def expire(self) -> None:
+        now = self.clock()
+        self._transaction(lambda cursor: self._expire(cursor, now))
+
+    def claim(self, worker_id: str, lease: float) -> WorkItem | None:
+        now = self.clock()
+
+        def statements(cursor: sqlite3.Cursor) -> WorkItem | None:
+            self._expire(cursor, now)
+            # The expired leases first: they are the oldest claims.
+            row = cursor.execute(
+                """
+                SELECT url, route, claims FROM urls
+                WHERE status = 'pending' OR (status = 'claimed' AND lease_expires_at < ?)
+                ORDER BY status = 'pending', rowid LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            url, route, claims = row
+            cursor.execute(
+                """
+                UPDATE urls SET status = 'claimed', worker_id = ?, lease_expires_at = ?,
+                    claims = claims + 1
+                WHERE url = ?
+                """,
+                (worker_id, now + lease, url),
+            )
+            return WorkItem(url, route, worker_id, claims + 1)
+
+        return self._transaction(statements)
+
+    def renew(self, item: WorkItem, lease: float) -> None:
+        self._transaction(
+            lambda cursor: cursor.execute(
+                """
+                UPDATE urls SET lease_expires_at = ?
+                WHERE url = ? AND status = 'claimed' AND worker_id = ?
+                """,
+                (self.clock() + lease, item.url, item.worker_id),
+            )
+        )
+
+    def _finish(self, cursor: sqlite3.Cursor, url: str, **columns) -> None:
+        cursor.execute(
+            f"""
+            UPDATE urls SET {', '.join(f'{column} = ?' for column in columns)},
+                sequence = (SELECT COALESCE(MAX(sequence), 0) + 1 FROM urls)
+            WHERE url = ? AND status IN ('pending', 'claimed')
+            """,  # nosec: the column names are not user input
+            (*columns.values(), url),
+        )
+
+    def complete(self, item: WorkItem, result: UrlResult, scraping_time: float) -> None:
+        self._transaction(
+            lambda cursor: self._finish(
+                cursor,
+                item.url,
+                status="done",
+                result=result.json(),
+                scraping_time=scraping_time,
+            )
+        )
+
+    def fail(self, item: WorkItem, error: str) -> None:
+        def statements(cursor: sqlite3.Cursor) -> None:
+            if item.claims >= MAX_CLAIMS:
+                self._finish(cursor, item.url, status="failed", error=error)
+            else:
+                cursor.execute(
+                    """
+                    UPDATE urls SET status = 'pending', error = ?
+                    WHERE url = ? AND status = 'claimed' AND worker_id = ?
+                    """,
+                    (error, item.url, item.worker_id),
+                )
+
+        self._transaction(statements)
+
+    def finished(self, after: int = 0) -> List[FinishedUrl]:
+        with self._lock:
+            rows = self.connection.execute(
+                """
+                SELECT sequence, url, claims, result, error, scraping_time FROM urls
+                WHERE sequence > ? ORDER BY sequence
+                """,
+                (after,),
+            ).fetchall()
+        return [
+            FinishedUrl(
+                sequence=sequence,
+                url=url,
+                claims=claims,
+                result=None if result is None else UrlResult.parse_raw(result),
+                error=error,
+                scraping_time=scraping_time or 0.0,
+            )
+            for sequence, url, claims, result, error, scraping_time in rows
+        ]
+
+    def progress(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(
+                self.connection.execute(
+                    "SELECT status, COUNT(*) FROM urls GROUP BY status"
+                ).fetchall()
+            )
+        return {
+            status: counts.get(status, 0)
+            for status in ("pending", "claimed", "done", "failed")
+        }
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+# Work queue backends, by URL scheme. A plain path is a SQLite file.
+WORK_QUEUE_BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    "sqlite": lambda location: SqliteWorkQueue(Path(location)),
+}
+
+
+def open_work_queue(location: str) -> WorkQueue:
+    """Open a work queue, eg: "cache/queue.sqlite3" or "sqlite:///shared/queue.sqlite3".
+
+    Raises:
+        ValueError: if the backend is not supported
+    """
+    scheme, separator, rest = location.partition("://")
+    if not separator:
+        scheme, rest = "sqlite", location
+    try:
+        backend = WORK_QUEUE_BACKENDS[scheme]
+    except KeyError:
+        raise ValueError(
+            f"Cannot open the work queue {location}: the backend must be one of {', '.join(WORK_QUEUE_BACKENDS)}."
+        )
+    return backend(rest)
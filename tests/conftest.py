@@ -0,0 +1,20 @@
+from datetime import date, timedelta
+
+import pytest
+
+from fff.config import settings
+from tests.fake_kayak import FakeKayak
+
+
+@pytest.fixture
+def fake_kayak(monkeypatch):
+    """Run a local stand-in for Kayak and point the settings to it."""
+    with FakeKayak() as server:
+        monkeypatch.setattr(settings, "WEBSITE_URL", server.url)
+        monkeypatch.setattr(
+            settings, "SEARCH_DATE_BEGIN", date.today() + timedelta(days=30)
+        )
+        monkeypatch.setattr(
+            settings, "SEARCH_DATE_END", date.today() + timedelta(days=120)
+        )
+        yield server
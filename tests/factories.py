@@ -0,0 +1,29 @@
+"""Helpers to build test data."""
+from datetime import datetime, timedelta
+
+from price_parser import Price
+
+from fff.schemas.airport import AirPort, AirportTrip
+from fff.schemas.flight_trip import FlightTrip
+
+
+def make_flight_trip(
+    price: str,
+    departure: datetime = datetime(2023, 1, 23),
+    nights: int = 12,
+    booking_code: str = "abc",
+) -> FlightTrip:
+    return_date = departure + timedelta(days=nights)
+    return FlightTrip(
+        search_link=f"https://www.kayak.fr/flights/PAR-YUL/{departure.date().isoformat()}/{return_date.date().isoformat()}/1adults",
+        direct_link=f"https://www.kayak.fr/book/flight?code={booking_code}",
+        first_trip=AirportTrip(
+            from_airport=AirPort(code="CDG"), destination_airport=AirPort(code="YUL")
+        ),
+        first_trip_date=departure,
+        return_trip=AirportTrip(
+            from_airport=AirPort(code="YUL"), destination_airport=AirPort(code="CDG")
+        ),
+        return_trip_date=return_date,
+        price=Price.fromstring(price),
+    )
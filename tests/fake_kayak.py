@@ -0,0 +1,153 @@
+"""Local stand-in for the Kayak website, serving recorded pages."""
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+
+RECORDINGS_DIR = Path(__file__).parent / "fixtures" / "kayak"
+
+RETURN_RESULT_ITEM_REGEX = re.compile(
+    rb'\s*<div class="returnResultItem">.*?<a class="booking-link ".*?</div>', re.DOTALL
+)
+FULL_PROGRESS_BAR = b'style="transform: translateX(100%);"'
+# Run in the browser: fill the progress bar once the search "finished"
+PROGRESS_BAR_SCRIPT = """
+<script>
+setTimeout(function () {
+  document.querySelector(".progress .bar").style.transform = "translateX(100%)";
+}, DELAY_MS);
+</script>
+"""
+# Run in the browser: clicking on a calendar price displays its return results
+CLICK_PRICE_SCRIPT = """
+<script>
+document.querySelectorAll(".price").forEach(function (price) {
+  price.addEventListener("click", function () {
+    setTimeout(function () {
+      var results = document.querySelector(".return-results");
+      results.insertAdjacentHTML("beforeend", results.dataset.items);
+    }, DELAY_MS);
+  });
+});
+</script>
+"""
+
+
+class FakeKayak:
+    """
+    HTTP server answering the URLs generated by ``UrlGenerator`` with recorded pages.
+
+    - ``/`` serves the home page (with the cookies disclaimer)
+    - ``/flights/...`` serves the recorded result page, whatever the search parameters
+
+    The website can be made slower or bigger, to benchmark the bot in a web browser.
+    """
+
+    def __init__(
+        self,
+        recordings_dir: Path = RECORDINGS_DIR,
+        latency: float = 0,
+        progress_duration: float = 0,
+        nb_results: int | None = None,
+    ):
+        """
+        Args:
+            recordings_dir (Path): the recorded pages
+            latency (float): delay before answering each request, in seconds. Also the
+                delay to display the return results of a clicked calendar price.
+            progress_duration (float): how long the progress bar of the result page
+                takes to fill, in seconds
+            nb_results (int | None): how many return results each result page and each
+                click display. Default to the recorded ones.
+        """
+        self.latency = latency
+        self.home_page = (recordings_dir / "home.html").read_bytes()
+        self.results_page = self._results_page(
+            (recordings_dir / "results.html").read_bytes(),
+            progress_duration,
+            nb_results,
+        )
+        self.requested_paths: List[str] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _results_page(
+        self, page: bytes, progress_duration: float, nb_results: int | None
+    ) -> bytes:
+        items = RETURN_RESULT_ITEM_REGEX.findall(page)
+        if nb_results is not None:
+            resized_items = [items[i % len(items)] for i in range(nb_results)]
+            start = page.index(items[0])
+            end = page.index(items[-1]) + len(items[-1])
+            page = page[:start] + b"".join(resized_items) + page[end:]
+            items = resized_items
+        scripts = CLICK_PRICE_SCRIPT.replace(
+            "DELAY_MS", str(round(self.latency * 1000))
+        )
+        if progress_duration:
+            page = page.replace(
+                FULL_PROGRESS_BAR, b'style="transform: translateX(0%);"'
+            )
+            scripts += PROGRESS_BAR_SCRIPT.replace(
+                "DELAY_MS", str(round(progress_duration * 1000))
+            )
+        items_attribute = (
+            b"".join(items)
+            .decode()
+            .replace("&", "&amp;")
+            .replace('"', "&quot;")
+            .encode()
+        )
+        page = page.replace(
+            b'<div class="return-results">',
+            b'<div class="return-results" data-items="' + items_attribute + b'">',
+        )
+        return page.replace(b"</body>", scripts.encode() + b"</body>")
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake_kayak = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake_kayak.requested_paths.append(self.path)
+                if fake_kayak.latency:
+                    time.sleep(fake_kayak.latency)
+                if self.path == "/":
+                    body = fake_kayak.home_page
+                elif self.path.startswith("/flights/"):
+                    body = fake_kayak.results_page
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Keep the test output clean
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeKayak":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeKayak":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
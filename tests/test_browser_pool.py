@@ -0,0 +1,158 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from fff import browser_pool
+from fff.browser_pool import BrowserPoolClient, BrowserPoolServer
+from fff.config import Settings
+
+
+class FakeDriver:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.command_executor = SimpleNamespace(_url="http://127.0.0.1:4444")
+        self.capabilities = {"moz:processID": os.getpid()}
+        self.window_handles = ["main"]
+        self.switch_to = SimpleNamespace(window=lambda handle: None)
+        self.responds = True
+
+    def close(self):
+        if not self.responds:
+            raise RuntimeError("No response")
+        self.window_handles.pop()
+
+
+class FakeBot:
+    def __init__(self, session_id: str):
+        self.driver = FakeDriver(session_id)
+        self.started = False
+        self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    bots = []
+
+    def bot_factory():
+        bot = FakeBot(f"session-{len(bots)}")
+        bots.append(bot)
+        return bot
+
+    settings = Settings(
+        BROWSER_POOL_ADDRESS="127.0.0.1:0",
+        MAX_PARALLEL_BROWSERS=1,
+        BROWSER_POOL_MAX_PAGES=10,
+    )
+    server = BrowserPoolServer(settings, bot_factory=bot_factory)
+    server.start()
+    yield server, bots
+    server.stop()
+
+
+def test_lend_warmed_browser(pool):
+    server, bots = pool
+
+    client = BrowserPoolClient(server.address)
+    lease = client.acquire()
+    assert lease.session_id == "session-0"
+    assert lease.executor_url == "http://127.0.0.1:4444"
+    assert bots[0].started
+    # The borrower opened a tab: it is closed when given back.
+    bots[0].driver.window_handles.append("tab")
+    client.release(pages=3)
+
+    client = BrowserPoolClient(server.address)
+    assert client.acquire().session_id == "session-0"
+    client.release(pages=3)
+    assert bots[0].driver.window_handles == ["main"]
+    assert len(bots) == 1
+
+
+def test_wait_for_a_free_browser(pool):
+    server, bots = pool
+    first_client = BrowserPoolClient(server.address)
+    first_client.acquire()
+    leases = []
+
+    def borrow():
+        client = BrowserPoolClient(server.address)
+        leases.append(client.acquire())
+        client.release(pages=0)
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    thread.join(timeout=0.2)
+    assert not leases
+    first_client.release(pages=0)
+    thread.join(timeout=5)
+    assert [lease.session_id for lease in leases] == ["session-0"]
+
+
+def test_replace_used_browser(pool):
+    server, bots = pool
+
+    for pages in [6, 4]:
+        client = BrowserPoolClient(server.address)
+        client.acquire()
+        client.release(pages=pages)
+
+    client = BrowserPoolClient(server.address)
+    assert client.acquire().session_id == "session-1"
+    assert bots[0].closed
+    # The borrower lost the connection: the browser is taken back anyway.
+    client.file.close()
+    client.connection.close()
+
+    client = BrowserPoolClient(server.address)
+    assert client.acquire().session_id == "session-1"
+    client.release(pages=0, broken=True)
+
+    client = BrowserPoolClient(server.address)
+    assert client.acquire().session_id == "session-2"
+    client.release(pages=0)
+    assert server.nb_replaced == 2
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/status"), reason="The memory is measured on Linux"
+)
+def test_replace_big_browser(pool):
+    server, bots = pool
+    server.settings.BROWSER_POOL_MAX_MEMORY = 0.1
+
+    client = BrowserPoolClient(server.address)
+    client.acquire()
+    client.release(pages=1)
+
+    client = BrowserPoolClient(server.address)
+    assert client.acquire().session_id == "session-1"
+    client.release(pages=0)
+
+
+def test_no_browser_left(pool, monkeypatch):
+    server, bots = pool
+    monkeypatch.setattr(browser_pool, "RELAUNCH_BACKOFF", 0)
+    monkeypatch.setattr(browser_pool, "IDLE_POLL_INTERVAL", 0.05)
+
+    def bot_factory():
+        raise RuntimeError("geckodriver not found")
+
+    server.bot_factory = bot_factory
+    client = BrowserPoolClient(server.address)
+    client.acquire()
+    client.release(pages=0, broken=True)
+
+    # The browser could not be replaced: the bots launch their own.
+    client = BrowserPoolClient(server.address)
+    with pytest.raises(ConnectionError, match="no web browser left"):
+        client.acquire()
+    client.release(pages=0)
+    assert server.size == 0
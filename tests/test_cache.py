@@ -0,0 +1,102 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from fff.cache import ResultCache
+from tests.factories import make_flight_trip
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ResultCache(
+        tmp_path / "cache.sqlite3", ttl=timedelta(hours=1), max_size=10**6
+    )
+    flight_trips = [make_flight_trip("€233"), make_flight_trip("€1,272.50", nights=10)]
+    assert cache.get("url", nb_results=2) is None
+    cache.set("url", flight_trips, nb_results=2, scraping_time=42)
+    assert cache.get("url", nb_results=2) == flight_trips
+    # Less results than cached
+    assert cache.get("url", nb_results=1) == flight_trips[0:1]
+    # More results than cached: the URL must be scraped again
+    assert cache.get("url", nb_results=3) is None
+    assert (cache.hits, cache.misses, cache.saved_time) == (2, 2, 84)
+
+
+def test_cache_stores_each_trip_once(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = ResultCache(path, ttl=timedelta(hours=1), max_size=10**6)
+    flight_trips = [make_flight_trip("€233"), make_flight_trip("€272", nights=10)]
+    cache.set("url1", flight_trips + flight_trips[:1], nb_results=3, scraping_time=1)
+    assert cache.get("url1", nb_results=3) == flight_trips
+    # On an overlapping date window, at other fares and in another order
+    other_flight_trips = [
+        make_flight_trip("€250", nights=10, booking_code="def"),
+        make_flight_trip("€260", booking_code="ghi"),
+    ]
+    cache.set("url2", other_flight_trips, nb_results=3, scraping_time=1)
+    # Each URL keeps the fares and booking links it found
+    assert cache.get("url1", nb_results=3) == flight_trips
+    assert cache.get("url2", nb_results=3) == other_flight_trips
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM trips").fetchone()[0] == 2
+    connection.close()
+
+
+def test_cache_is_persistent(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = ResultCache(path, ttl=timedelta(hours=1), max_size=10**6)
+    cache.set("url", [make_flight_trip("€233")], nb_results=1, scraping_time=42)
+    cache.close()
+    cache = ResultCache(path, ttl=timedelta(hours=1), max_size=10**6)
+    assert cache.get("url", nb_results=1) == [make_flight_trip("€233")]
+
+
+def test_cache_ttl(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3", ttl=timedelta(0), max_size=10**6)
+    cache.set("url", [make_flight_trip("€233")], nb_results=1, scraping_time=42)
+    assert cache.get("url", nb_results=1) is None
+
+
+def test_cache_size_eviction(tmp_path):
+    """Check that the oldest entries are evicted when the cache is too big."""
+    entry_size = len(make_flight_trip("€233").json())
+    cache = ResultCache(
+        tmp_path / "cache.sqlite3", ttl=timedelta(hours=1), max_size=2 * entry_size
+    )
+    for day, url in enumerate(["url1", "url2", "url3"], start=1):
+        flight_trip = make_flight_trip("€233", departure=datetime(2023, 1, day))
+        cache.set(url, [flight_trip], nb_results=1, scraping_time=42)
+    assert cache.get("url1", nb_results=1) is None
+    assert cache.get("url2", nb_results=1) is not None
+    assert cache.get("url3", nb_results=1) is not None
+
+
+def test_cache_of_an_older_version(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE results (url TEXT PRIMARY KEY, created_at REAL NOT NULL, nb_results INTEGER NOT NULL, "
+        "scraping_time REAL NOT NULL, flight_trips TEXT NOT NULL)"
+    )
+    connection.execute("INSERT INTO results VALUES ('url', 1e12, 1, 42, '[]')")
+    connection.commit()
+    connection.close()
+
+    cache = ResultCache(path, ttl=timedelta(hours=1), max_size=10**6)
+    assert cache.get("url", nb_results=1) is None
+    cache.set("url", [make_flight_trip("€233")], nb_results=1, scraping_time=42)
+    assert cache.get("url", nb_results=1) == [make_flight_trip("€233")]
+
+
+def test_cache_without_fares(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE result_trips (url TEXT NOT NULL, position INTEGER NOT NULL, "
+        "trip_id TEXT NOT NULL, PRIMARY KEY (url, position))"
+    )
+    connection.commit()
+    connection.close()
+
+    cache = ResultCache(path, ttl=timedelta(hours=1), max_size=10**6)
+    cache.set("url", [make_flight_trip("€233")], nb_results=1, scraping_time=42)
+    assert cache.get("url", nb_results=1) == [make_flight_trip("€233")]
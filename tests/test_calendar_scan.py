@@ -0,0 +1,91 @@
+from datetime import date
+
+from price_parser import Price
+
+from fff.calendar_scan import (
+    calendar_cells,
+    cells_by_url,
+    cheapest_cells,
+    format_calendar_table,
+)
+from fff.parser import CalendarPrice, parse_calendar_prices
+from fff.planner import PlannedSearch
+from fff.schemas.flexible_calendar import DateWindow
+from tests.fake_kayak import RECORDINGS_DIR
+
+
+def make_cells(url: str, start_date: date, end_date: date, min_nights: int = 14):
+    page_source = (RECORDINGS_DIR / "results.html").read_text()
+    planned_search = PlannedSearch(
+        start_date,
+        end_date,
+        DateWindow(min_nights=min_nights, max_nights=min_nights + 2),
+    )
+    return calendar_cells(
+        url, "PAR-YUL", planned_search, parse_calendar_prices(page_source)
+    )
+
+
+def test_calendar_cells():
+    cells = make_cells("url1", date(2023, 3, 1), date(2023, 3, 10))
+    # The cells after the end of the period are ignored
+    assert [(c.departure_date.day, c.price.amount) for c in cells] == [
+        (3, 412),
+        (4, 233),
+        (5, 298),
+        (6, 233),
+        (7, 350),
+        (9, 272),
+        (10, 505),
+    ]
+    assert str(cells[1]) == "2023-03-04 | 14-16 nights | PAR-YUL | €233"
+
+
+def test_calendar_cells_dated_by_their_day():
+    # The calendar starts on the 1st, before the searched period
+    cells = make_cells("url1", date(2023, 3, 5), date(2023, 3, 10))
+    assert [(c.departure_date.day, c.price.amount) for c in cells] == [
+        (5, 298),
+        (6, 233),
+        (7, 350),
+        (9, 272),
+        (10, 505),
+    ]
+    assert [c.index for c in cells] == [4, 5, 6, 8, 9]
+
+    # The calendar overlaps two months
+    planned_search = PlannedSearch(
+        date(2023, 1, 31), date(2023, 2, 2), DateWindow(min_nights=7, max_nights=9)
+    )
+    calendar_prices = [
+        CalendarPrice(index=index, price=Price.fromstring("€300"), day=day)
+        for index, day in enumerate([29, 30, 31, 1, 2])
+    ]
+    cells = calendar_cells("url1", "PAR-YUL", planned_search, calendar_prices)
+    assert [c.departure_date for c in cells] == [
+        date(2023, 1, 31),
+        date(2023, 2, 1),
+        date(2023, 2, 2),
+    ]
+
+
+def test_cheapest_cells():
+    cells = make_cells("url1", date(2023, 3, 1), date(2023, 3, 14)) + make_cells(
+        "url2", date(2023, 3, 1), date(2023, 3, 14), min_nights=17
+    )
+    cheapest = cheapest_cells(cells, 3)
+    assert [(c.url, c.departure_date.day) for c in cheapest] == [
+        ("url1", 4),
+        ("url1", 6),
+        ("url2", 4),
+    ]
+    assert {url: len(c) for url, c in cells_by_url(cheapest).items()} == {
+        "url1": 2,
+        "url2": 1,
+    }
+    table = format_calendar_table(cheapest).splitlines()
+    assert table == [
+        "2023-03-04 | 14-16 nights | PAR-YUL | €233",
+        "2023-03-04 | 17-19 nights | PAR-YUL | €233",
+        "2023-03-06 | 14-16 nights | PAR-YUL | €233",
+    ]
@@ -0,0 +1,37 @@
+from fff.checkpoint import CheckpointJournal
+from tests.factories import make_flight_trip
+
+
+def test_resume_from_journal(tmp_path):
+    journal = CheckpointJournal(tmp_path / "checkpoint.jsonl")
+    journal.reset()
+    journal.record_success("url1", [make_flight_trip("€233")], scraping_time=42)
+    journal.record_failure("url2", RuntimeError("Timeout"))
+    journal.record_success("url3", [], scraping_time=42)
+    journal.record_failure("url3", RuntimeError("Timeout"))
+    journal.record_failure("url4", RuntimeError("Timeout"))
+    journal.record_success("url4", [make_flight_trip("€272")], scraping_time=42)
+
+    # Read by the next run
+    completed = CheckpointJournal(tmp_path / "checkpoint.jsonl").completed()
+    # The last outcome of a URL wins
+    assert completed == {
+        "url1": [make_flight_trip("€233")],
+        "url4": [make_flight_trip("€272")],
+    }
+
+
+def test_truncated_journal(tmp_path):
+    """Check that a line partially written before a crash is ignored."""
+    journal = CheckpointJournal(tmp_path / "checkpoint.jsonl")
+    journal.record_success("url1", [make_flight_trip("€233")], scraping_time=42)
+    with journal.path.open("a") as f:
+        f.write('{"url": "url2", "status": "do')
+    assert list(journal.completed()) == ["url1"]
+
+
+def test_reset_journal(tmp_path):
+    journal = CheckpointJournal(tmp_path / "checkpoint.jsonl")
+    journal.record_success("url1", [make_flight_trip("€233")], scraping_time=42)
+    journal.reset()
+    assert journal.completed() == {}
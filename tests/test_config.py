@@ -0,0 +1,10 @@
+import pytest
+from pydantic import ValidationError
+
+from fff.config import Settings
+
+
+def test_max_nights_above_min_nights():
+    assert Settings(MIN_NIGHTS=7, MAX_NIGHTS=7).MAX_NIGHTS == 7
+    with pytest.raises(ValidationError, match="MAX_NIGHTS"):
+        Settings(MIN_NIGHTS=10, MAX_NIGHTS=2)
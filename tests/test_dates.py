@@ -1,6 +1,9 @@
-from datetime import date
+from datetime import date, datetime, timedelta
+
+import pytest
 
 from fff.bot import split_date_window
+from fff.utils.datetime import infer_year, parse_date
 
 
 def test_split_date():
@@ -13,3 +16,36 @@ def test_split_date():
         (date(2022, 2, 5), date(2022, 3, 11)),
         (date(2022, 3, 12), date(2022, 3, 31)),
     ]
+
+
+def test_parse_short_dates():
+    window = (date(2023, 1, 1), date(2023, 4, 1))
+    assert parse_date("Sat 1/14", "en", window) == datetime(2023, 1, 14)
+    assert parse_date("sam. 14/1", "fr", window) == datetime(2023, 1, 14)
+    assert parse_date("Sa., 14.1.", "de", window) == datetime(2023, 1, 14)
+
+
+def test_parse_date_with_dateparser():
+    window = (date(2023, 1, 1), date(2023, 4, 1))
+    assert parse_date("14 janvier", "fr", window) == datetime(2023, 1, 14)
+    assert parse_date("14 janvier 2025", "fr", window) == datetime(2025, 1, 14)
+    with pytest.raises(ValueError):
+        parse_date("not a date", "en", window)
+
+
+def test_infer_year_from_search_window():
+    # The return date of a search in December can be in January of the next year.
+    assert infer_year(1, 14, (date(2022, 12, 1), date(2023, 1, 31))) == date(
+        2023, 1, 14
+    )
+    assert infer_year(12, 30, (date(2023, 1, 2), date(2023, 3, 1))) == date(
+        2022, 12, 30
+    )
+    assert infer_year(2, 29, (date(2023, 1, 1), date(2023, 4, 1))) == date(2024, 2, 29)
+
+
+def test_infer_year_without_search_window():
+    tomorrow = date.today() + timedelta(days=1)
+    assert infer_year(tomorrow.month, tomorrow.day) == tomorrow
+    yesterday = date.today() - timedelta(days=1)
+    assert infer_year(yesterday.month, yesterday.day) > date.today()
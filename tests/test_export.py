@@ -0,0 +1,76 @@
+import csv
+import json
+
+import pytest
+
+from fff.export import EXPORT_FIELDS, open_exporter, trip_row
+from tests.factories import make_flight_trip
+
+
+def rows():
+    return [
+        trip_row("https://www.kayak.fr/flights/PAR-YUL", "PAR-YUL", trip)
+        for trip in [make_flight_trip("€233"), make_flight_trip("€1,200.50", nights=8)]
+    ]
+
+
+def test_trip_row():
+    row = rows()[1]
+    assert list(row) == EXPORT_FIELDS
+    assert row["first_trip"] == "CDG-YUL"
+    assert row["departure_date"] == "2023-01-23T00:00:00"
+    assert row["return_date"] == "2023-01-31T00:00:00"
+    assert row["price"] == 1200.5
+    assert row["currency"] == "€"
+    assert row["source_url"] == "https://www.kayak.fr/flights/PAR-YUL"
+
+
+def test_export_jsonl(tmp_path):
+    exporter = open_exporter(tmp_path / "results.jsonl")
+    exporter.write(rows()[0:1])
+    # Streamed: readable before the end of the search
+    assert len((tmp_path / "results.jsonl").read_text().splitlines()) == 1
+    exporter.write(rows()[1:])
+    exporter.close()
+    lines = (tmp_path / "results.jsonl").read_text().splitlines()
+    assert [json.loads(line)["price"] for line in lines] == [233, 1200.5]
+    assert exporter.nb_rows == 2
+
+    # The next run appends its rows
+    exporter = open_exporter(tmp_path / "results.jsonl")
+    exporter.write(rows()[0:1])
+    exporter.close()
+    assert len((tmp_path / "results.jsonl").read_text().splitlines()) == 3
+
+
+def test_export_csv(tmp_path):
+    for run_rows in [rows(), rows()[1:]]:
+        exporter = open_exporter(tmp_path / "results.csv")
+        exporter.write(run_rows)
+        exporter.close()
+    with (tmp_path / "results.csv").open() as file:
+        exported = list(csv.DictReader(file))
+    assert [row["price"] for row in exported] == ["233.0", "1200.5", "1200.5"]
+    assert exported[0]["route"] == "PAR-YUL"
+
+
+def test_export_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    exporter = open_exporter(tmp_path / "results.parquet")
+    exporter.write(rows())
+    exporter.write([])
+    exporter.close()
+    table = pq.read_table(tmp_path / "results.parquet")
+    assert table.column("price").to_pylist() == [233, 1200.5]
+
+    # A Parquet file cannot be appended to: the next run writes its own.
+    exporter = open_exporter(tmp_path / "results.parquet")
+    exporter.write(rows()[0:1])
+    exporter.close()
+    assert exporter.path == tmp_path / "results-2.parquet"
+    assert pq.read_table(tmp_path).num_rows == 3
+
+
+def test_unsupported_export(tmp_path):
+    with pytest.raises(ValueError, match="file extension"):
+        open_exporter(tmp_path / "results.xlsx")
@@ -0,0 +1,31 @@
+from time import perf_counter
+from urllib.request import urlopen
+
+from fff.parser import parse_flight_trips
+from tests.fake_kayak import FakeKayak
+
+
+def test_results_page_size():
+    with FakeKayak(nb_results=12) as fake_kayak:
+        with urlopen(
+            f"{fake_kayak.url}/flights/PAR-YUL/2023-01-01"
+        ) as response:  # nosec
+            page_source = response.read().decode()
+
+    assert len(parse_flight_trips(page_source, fake_kayak.url)) == 12
+    # Clicking on a calendar price displays the return results again
+    assert 'data-items="' in page_source
+
+
+def test_latency_and_progress_bar():
+    with FakeKayak(latency=0.2, progress_duration=3) as fake_kayak:
+        start = perf_counter()
+        with urlopen(
+            f"{fake_kayak.url}/flights/PAR-YUL/2023-01-01"
+        ) as response:  # nosec
+            page_source = response.read().decode()
+
+    assert perf_counter() - start >= 0.2
+    # The progress bar is empty, until the script fills it after 3s.
+    assert "translateX(0%)" in page_source
+    assert "}, 3000);" in page_source
@@ -0,0 +1,89 @@
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+from fff.history import PriceHistory, fare_drop_alert
+from tests.factories import make_flight_trip
+
+HOUR = 3600
+
+
+def test_record_and_read_back(tmp_path):
+    history = PriceHistory(tmp_path / "history.sqlite3")
+    assert history.latest("url1") is None
+    history.record("url1", "PAR-YUL", [make_flight_trip("€500")], observed_at=0)
+    trips = [make_flight_trip("€450"), make_flight_trip("€480", nights=10)]
+    history.record("url1", "PAR-YUL", trips, observed_at=HOUR)
+    history.record("url2", "LYS-YUL", [make_flight_trip("€300")], observed_at=HOUR)
+
+    assert [t.price.amount for t in history.latest("url1")] == [450, 480]
+    assert history.minimum_price("PAR-YUL") == 450
+    assert history.minimum_price("BRU-YUL") is None
+    stats = history.url_stats("url1")
+    assert stats.last_price == 450
+    assert stats.volatility == 50 / 450
+    assert stats.stable_runs == 0
+
+
+def test_trips_are_identified_across_urls(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    # A history recorded before the trips were identified
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE prices (url TEXT NOT NULL, route TEXT NOT NULL, observed_at REAL NOT NULL, "
+        "departure_date TEXT, return_date TEXT, price REAL, currency TEXT, flight_trip TEXT NOT NULL)"
+    )
+    connection.execute(
+        "INSERT INTO prices VALUES ('url1', 'PAR-YUL', 0, NULL, NULL, 500, '€', ?)",
+        (make_flight_trip("€500", nights=10).json(),),
+    )
+    connection.commit()
+    connection.close()
+    history = PriceHistory(path)
+    trip = make_flight_trip("€450")
+    assert history.first_seen(trip) is None
+    history.record("url1", "PAR-YUL", [trip, trip], observed_at=HOUR)
+    history.record("url2", "PAR-YUL", [trip], observed_at=2 * HOUR)
+
+    # The same trip, found by another search at another fare
+    assert history.first_seen(make_flight_trip("€420", booking_code="url2")) == HOUR
+    assert history.first_seen(make_flight_trip("€480", nights=10)) == 0
+    assert history.latest("url1") == [trip]
+
+
+def test_plan_checks_stable_urls_less_often(tmp_path):
+    history = PriceHistory(tmp_path / "history.sqlite3")
+    for cycle in range(3):
+        history.record(
+            "stable", "PAR-YUL", [make_flight_trip("€900")], observed_at=cycle * HOUR
+        )
+        history.record(
+            "cheap", "PAR-YUL", [make_flight_trip("€400")], observed_at=cycle * HOUR
+        )
+        history.record(
+            "volatile",
+            "PAR-YUL",
+            [make_flight_trip(f"€{700 + 100 * cycle}")],
+            observed_at=cycle * HOUR,
+        )
+
+    urls = ["new", "stable", "volatile", "cheap"]
+    due, not_due = history.plan(
+        urls, interval=HOUR, price_to_beat=Decimal(500), now=3 * HOUR
+    )
+    # The URLs close to the top N first, then the most volatile ones
+    assert due == ["new", "cheap", "volatile"]
+    assert [t.price.amount for t in not_due["stable"]] == [900]
+    # A URL stable for 2 scrapes is checked every 4 intervals
+    due, _ = history.plan(urls, interval=HOUR, price_to_beat=Decimal(500), now=5 * HOUR)
+    assert "stable" in due
+
+
+def test_fare_drop_alert():
+    trips = [make_flight_trip("€450", departure=datetime(2023, 3, 1))]
+    alert = fare_drop_alert("PAR-YUL", trips, Decimal(500), threshold=5)
+    assert alert is not None
+    assert alert.startswith("ALERT: fare drop on PAR-YUL: €450 (10% below")
+    assert "departure 2023-03-01, return 2023-03-13" in alert
+    assert fare_drop_alert("PAR-YUL", trips, Decimal(460), threshold=5) is None
+    assert fare_drop_alert("PAR-YUL", trips, None, threshold=5) is None
@@ -0,0 +1,63 @@
+"""Import-time benchmark: the command line help and the schemas must load quickly."""
+import os
+import subprocess  # nosec
+import sys
+from time import perf_counter
+
+from fff.config import PROJECT_DIR
+
+# Generous budgets, in seconds, for slow CI machines: a few times the usual import times
+SCHEMAS_IMPORT_BUDGET = 1.0
+HELP_BUDGET = 2.0
+# Loaded on first use only
+HEAVY_MODULES = ["selenium", "dateparser", "lxml", "fff.config", "dotenv", "loguru"]
+
+
+def run_python(*args: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(  # nosec
+        [sys.executable, *args],
+        cwd=PROJECT_DIR,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def cumulative_import_time(importtime_log: str, module: str) -> float:
+    """Cumulative import time of a module, in seconds, from a ``-X importtime`` log."""
+    for line in importtime_log.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+    raise AssertionError(f"{module} was not imported")
+
+
+def test_schemas_import_quickly_without_settings():
+    # Invalid settings: reading them would fail.
+    process = run_python(
+        "-X",
+        "importtime",
+        "-c",
+        "import sys, fff.schemas.flight_search, fff.schemas.flight_trip;"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])",
+        MIN_NIGHTS="10",
+        MAX_NIGHTS="2",
+    )
+
+    assert process.stdout.strip() == "[]"
+    import_time = cumulative_import_time(
+        process.stderr, "fff.schemas.flight_search"
+    ) + cumulative_import_time(process.stderr, "fff.schemas.flight_trip")
+    print(f"fff.schemas imported in {import_time * 1000:.0f} ms")
+    assert import_time < SCHEMAS_IMPORT_BUDGET
+
+
+def test_help_is_quick():
+    start = perf_counter()
+    process = run_python("-m", "fff", "--help", MIN_NIGHTS="10", MAX_NIGHTS="2")
+    help_time = perf_counter() - start
+
+    assert "Flexible Flight Finder" in process.stdout
+    print(f"python -m fff --help ran in {help_time * 1000:.0f} ms")
+    assert help_time < HELP_BUDGET
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import pytest
+
+from fff.main import parse_args
+
+
+def test_parse_args():
+    args = parse_args(["--watch", "--export", "a.csv", "--export", "b.jsonl"])
+    assert args.watch
+    assert args.export == [Path("a.csv"), Path("b.jsonl")]
+    assert parse_args(["--calendar-only", "--resolve"]).resolve
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--resolve"],
+        ["--watch", "--calendar-only"],
+        ["--watch", "--resume"],
+        ["--calendar-only", "--export", "a.csv"],
+    ],
+)
+def test_invalid_arguments(args, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(args)
+    assert "error:" in capsys.readouterr().err
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from price_parser import Price
+
+from fff.merger import Pruner, SearchResults, TopFlightTrips
+from fff.parser import CalendarPrice
+from fff.schemas.flight_trip import unique_flight_trips
+from tests.factories import make_flight_trip
+
+
+def test_keep_cheapest_flight_trips():
+    top = TopFlightTrips(size=3)
+    prices = ["€500", "€233", "€410", "€272", "€1,200", "€233.50"]
+    for day, price in enumerate(prices, start=1):
+        top.add(make_flight_trip(price, departure=datetime(2023, 1, day)))
+    assert [trip.price.amount_text for trip in top.best()] == ["233", "233.50", "272"]
+    assert top.worst_price == 272
+    assert len(top) == 3
+
+
+def test_worst_price_when_not_full():
+    top = TopFlightTrips(size=3)
+    top.add(make_flight_trip("€233"))
+    assert not top.is_full
+    assert top.worst_price is None
+
+
+def test_first_found_wins_ties():
+    top = TopFlightTrips(size=2)
+    for day in range(1, 5):
+        top.add(make_flight_trip("€233", departure=datetime(2023, 1, day)))
+    assert [trip.first_trip_date.day for trip in top.best()] == [1, 2]
+
+
+def test_duplicated_flight_trips():
+    """Check that the same trip found on two URLs is kept once, at its cheapest fare."""
+    top = TopFlightTrips(size=3)
+    assert top.add(make_flight_trip("€233", booking_code="url1"))
+    assert not top.add(make_flight_trip("€233", booking_code="url2"))
+    assert (
+        top.extend([make_flight_trip("€272", nights=10), make_flight_trip("€250")]) == 1
+    )
+    assert top.add(make_flight_trip("€260", nights=10, booking_code="url3"))
+    assert [trip.price.amount_text for trip in top.best()] == ["233", "260"]
+    assert top.best()[1].direct_link.endswith("url3")
+    assert top.nb_duplicates == 3
+
+
+def test_canonical_trip_key():
+    trip = make_flight_trip("€233.50", booking_code="NfECIkWl4c.24602.f6ca60d664a2")
+    assert trip.key == "CDG-YUL|2023-01-23T00:00|YUL-CDG|2023-02-04T00:00"
+    # The same trip, found by another search, at another fare
+    same_trip = make_flight_trip("€220", booking_code="NfFCnT6DVz.22000.e3d3eeb3d2ff")
+    assert same_trip.trip_id == trip.trip_id
+    other_trip = make_flight_trip("€234", nights=10)
+    assert other_trip.key != trip.key
+    assert unique_flight_trips([trip, other_trip, same_trip]) == [same_trip, other_trip]
+
+
+def make_calendar_prices(*prices: str):
+    return [
+        CalendarPrice(index=index, price=Price.fromstring(price))
+        for index, price in enumerate(prices)
+    ]
+
+
+def test_no_pruning_while_top_is_not_full():
+    top = TopFlightTrips(size=2)
+    top.add(make_flight_trip("€233"))
+    pruner = Pruner(lambda url: top)
+    departure_dates = make_calendar_prices("€200", "€900")
+    assert pruner.prune("url", departure_dates, seconds_per_click=2) == departure_dates
+    assert pruner.pruned_clicks == 0
+
+
+def test_prune_departure_dates():
+    """Check that the dates which cannot beat the Nth best trip are skipped."""
+    top = TopFlightTrips(size=2)
+    top.extend(
+        [
+            make_flight_trip("€233", departure=datetime(2023, 1, 1)),
+            make_flight_trip("€272", departure=datetime(2023, 1, 2)),
+        ]
+    )
+    pruner = Pruner(lambda url: top)
+    kept_dates = pruner.prune(
+        "url1", make_calendar_prices("€250", "€272", "€300"), seconds_per_click=2
+    )
+    assert [d.price.amount for d in kept_dates] == [250]
+    assert (
+        pruner.prune("url2", make_calendar_prices("€280", "€300"), seconds_per_click=2)
+        == []
+    )
+    assert (pruner.pruned_clicks, pruner.pruned_urls, pruner.pruned_time) == (4, 1, 8)
+
+
+def test_search_results_per_route():
+    routes = {"url1": "PAR-YUL", "url2": "LYS-YUL", "url3": "PAR-YUL"}
+    results = SearchResults(size=2, route_of=routes.get)
+    assert results.extend(
+        "url1", [make_flight_trip("€500"), make_flight_trip("€400", nights=11)]
+    )
+    assert results.extend("url2", [make_flight_trip("€300", nights=9)])
+    # Cheaper than the other trips of the route, but not of all the routes together
+    assert not results.extend("url3", [make_flight_trip("€450", nights=10)])
+    assert [t.price.amount for t in results.routes["PAR-YUL"].best()] == [400, 450]
+    assert [t.price.amount for t in results.routes["LYS-YUL"].best()] == [300]
+    assert [t.price.amount for t in results.overall.best()] == [300, 400]
+
+
+def test_search_results_drop_duplicates():
+    routes = {"url1": "PAR-YUL", "url2": "PAR-YUL"}
+    results = SearchResults(size=2, route_of=routes.get)
+    results.extend(
+        "url1", [make_flight_trip("€400"), make_flight_trip("€500", nights=10)]
+    )
+    # On an overlapping date window: the €400 trip again
+    assert not results.extend(
+        "url2",
+        [
+            make_flight_trip("€400", booking_code="url2"),
+            make_flight_trip("€600", nights=11),
+        ],
+    )
+    assert results.nb_duplicates == 1
+    assert [t.price.amount for t in results.overall.best()] == [400, 500]
+    # Then at a lower fare: it replaces the one kept
+    assert results.extend("url2", [make_flight_trip("€450", nights=10)])
+    assert [t.price.amount for t in results.overall.best()] == [400, 450]
+    assert results.nb_duplicates == 2
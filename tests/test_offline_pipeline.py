@@ -0,0 +1,100 @@
+import shutil
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+import pytest
+
+from fff.bot import Bot
+from fff.config import Settings, settings
+from fff.parser import parse_calendar_prices, parse_flight_trips
+from fff.url_generator import UrlGenerator
+from tests.fake_kayak import RECORDINGS_DIR
+
+
+def test_parse_calendar_prices():
+    page_source = (RECORDINGS_DIR / "results.html").read_text()
+    calendar_prices = parse_calendar_prices(page_source)
+    # Empty calendar cells are skipped, but the index still refers to the cell position.
+    assert [c.index for c in calendar_prices] == [2, 3, 4, 5, 6, 8, 9, 10, 12, 13]
+    assert [c.day for c in calendar_prices] == [3, 4, 5, 6, 7, 9, 10, 11, 13, 14]
+    cheapest = sorted(calendar_prices, key=lambda c: c.price)[0:3]
+    assert [(c.index, c.price.amount) for c in cheapest] == [
+        (3, 233),
+        (5, 233),
+        (8, 272),
+    ]
+
+
+def test_offline_parsing(fake_kayak):
+    """
+    Generate the search URLs, fetch them from the fake website and parse the pages.
+
+    Only the parsing is covered: the pages are not loaded in a web browser.
+    """
+    url_generator = UrlGenerator()
+    urls = url_generator.generate_urls()
+    assert urls
+
+    flight_trips = []
+    for url in urls:
+        with urlopen(url) as response:  # nosec
+            page_source = response.read().decode()
+        flight_trips.extend(
+            parse_flight_trips(page_source, settings.WEBSITE_URL, source_url=url)
+        )
+
+    assert fake_kayak.requested_paths == [
+        urlsplit(url).path + "?" + urlsplit(url).query for url in urls
+    ]
+    assert len(flight_trips) == 5 * len(urls)
+    cheapest = min(flight_trips, key=lambda x: x.price)
+    assert cheapest.price.amount == 233
+    assert str(cheapest.first_trip) == "CDG-YUL"
+    assert cheapest.direct_link.startswith(f"{fake_kayak.url}/book/flight?code=")
+
+
+@pytest.mark.skipif(
+    shutil.which("geckodriver") is None, reason="Needs Firefox and geckodriver"
+)
+def test_bot_against_fake_kayak(fake_kayak):
+    """Load a search page in a web browser, click on the departure dates and parse."""
+    bot = Bot(
+        settings=Settings(
+            WEBSITE_URL=fake_kayak.url,
+            # Every recorded flight trip is within the searched dates
+            SEARCH_DATE_BEGIN=date.today() + timedelta(days=30),
+            SEARCH_DATE_END=date.today() + timedelta(days=360),
+            HEADLESS_MODE=True,
+            REQUESTS_PER_MINUTE=6000,
+            PRICE_MATRIX_PATH=None,
+        )
+    )
+    try:
+        bot.start()
+        url = bot.url_generator.generate_urls()[0]
+        result = bot.get_best_flights(url, nb_results=3)
+    finally:
+        bot.quit()
+
+    assert fake_kayak.requested_paths[0] == "/"
+    assert [trip.price.amount for trip in result.flight_trips] == [233, 233, 272]
+    # Each click displays the return flights again
+    assert len({trip.key for trip in result.all_flight_trips}) == 5
+    assert not result.pruned
+
+
+def test_multi_route_urls(fake_kayak, monkeypatch):
+    monkeypatch.setattr(settings, "FROM_AIRPORT", "PAR, LYS")
+    monkeypatch.setattr(settings, "DESTINATION_AIRPORT", "YUL,LYS")
+    url_generator = UrlGenerator()
+    # A route from an airport to itself is skipped
+    assert [str(r) for r in url_generator.round_trips] == [
+        "PAR-YUL",
+        "PAR-LYS",
+        "LYS-YUL",
+    ]
+    urls = url_generator.generate_urls()
+    assert len(urls) == 3 * len(url_generator.planned_searches)
+    for url in urls:
+        assert f"/flights/{url_generator.url_round_trips[url]}/" in url
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from fff.config import Settings
+from fff.orchestrator import AsyncOrchestrator
+from fff.schemas.url_result import UrlResult
+from fff.url_generator import UrlGenerator
+from tests.factories import make_flight_trip
+
+
+class FakeBot:
+    def __init__(self, prices, fail_on=(), hang_on=()):
+        self.started = False
+        self.closed = False
+        self.restarts = 0
+        self.prices = prices
+        self.fail_on = fail_on
+        self.hang_on = hang_on
+
+    def start(self):
+        self.started = True
+
+    def quit(self):
+        self.closed = True
+
+    def restart(self):
+        self.restarts += 1
+
+    def get_best_flights(self, url, nb_results, pruner=None, next_urls=()):
+        if url in self.fail_on:
+            raise RuntimeError("Timeout")
+        if url in self.hang_on:
+            time.sleep(0.5)
+        index = list(self.prices).index(url)
+        return UrlResult(
+            flight_trips=[
+                make_flight_trip(
+                    f"€{self.prices[url]}",
+                    departure=datetime(2023, 1, 1) + timedelta(days=index),
+                )
+            ]
+        )
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return Settings(
+        FROM_AIRPORT="PAR,LYS",
+        DESTINATION_AIRPORT="YUL,YQB",
+        CACHE_ENABLED=False,
+        CHECKPOINT_PATH=tmp_path / "checkpoint.jsonl",
+        MAX_PARALLEL_BROWSERS=2,
+        NUMBER_OF_RESULTS=2,
+        URL_RETRY_BACKOFF=0,
+        SEARCH_DATE_BEGIN=date.today() + timedelta(days=30),
+        SEARCH_DATE_END=date.today() + timedelta(days=120),
+    )
+
+
+def run_orchestrator(settings, bot_factory):
+    url_generator = UrlGenerator(settings=settings)
+    urls = url_generator.generate_urls()
+    prices = {url: 500 - i for i, url in enumerate(urls)}
+    bots = []
+
+    def factory():
+        bot = bot_factory(prices)
+        bots.append(bot)
+        return bot
+
+    orchestrator = AsyncOrchestrator(
+        settings, bot_factory=factory, url_generator=url_generator
+    )
+    session = asyncio.run(orchestrator.run())
+    return urls, session, bots
+
+
+def test_orchestrator_merges_every_url(settings):
+    urls, session, bots = run_orchestrator(settings, FakeBot)
+
+    assert len(urls) == 12
+    assert [trip.price.amount for trip in session.results] == [
+        500 - len(urls) + 1,
+        500 - len(urls) + 2,
+    ]
+    assert session.journal.completed().keys() == set(urls)
+    assert len(bots) == 2
+    assert all(bot.closed for bot in bots)
+
+
+def test_orchestrator_retries_and_reports_failures(settings):
+    settings.URL_TIMEOUT = 0.1
+    failed = {}
+
+    def bot_factory(prices):
+        urls = list(prices)
+        failed["error"], failed["timeout"] = urls[0], urls[1]
+        return FakeBot(prices, fail_on=[urls[0]], hang_on=[urls[1]])
+
+    urls, session, bots = run_orchestrator(settings, bot_factory)
+
+    assert sorted(session.failed_urls) == sorted(failed.values())
+    assert session.journal.completed().keys() == set(urls) - set(failed.values())
+    # A new browser is launched after each timeout
+    assert len(bots) >= 2 + settings.URL_MAX_ATTEMPTS - 1
+    assert all(bot.closed for bot in bots)
+    assert sum(bot.restarts for bot in bots) == settings.URL_MAX_ATTEMPTS - 1
+
+
+def test_orchestrator_stops_once_converged(settings):
+    settings.MAX_PARALLEL_BROWSERS = 1
+    settings.CONVERGENCE_PATIENCE = 2
+
+    def bot_factory(prices):
+        # The prices increase: only the first URLs improve the top 2.
+        return FakeBot({url: 100 + i for i, url in enumerate(prices)})
+
+    urls, session, bots = run_orchestrator(settings, bot_factory)
+
+    assert len(session.journal.completed()) == 4
+    assert [trip.price.amount for trip in session.results] == [100, 101]
+
+
+def test_orchestrator_raises_when_browser_cannot_launch(settings):
+    def bot_factory(prices):
+        raise RuntimeError("geckodriver not found")
+
+    with pytest.raises(RuntimeError, match="geckodriver"):
+        run_orchestrator(settings, bot_factory)
@@ -0,0 +1,48 @@
+import pytest
+from pydantic import ValidationError
+
+from fff.parser import ReturnResultRow, parse_flight_trip
+
+
+def make_row(**kwargs) -> dict:
+    row = {
+        "price": "€233",
+        "dates": ["Sat 1/14", "Sat 1/28"],
+        "booking_link": "/book/flight?code=abc&amp;h=def",
+        "first_trip_origin": " CDG Paris Charles de Gaulle",
+        "first_trip_destination": "yul",
+        "return_trip_origin": "YUL Montreal",
+        "return_trip_destination": "ORY",
+    }
+    row.update(kwargs)
+    return row
+
+
+def test_parse_flight_trip():
+    row = ReturnResultRow.parse_obj(make_row())
+    flight_trip = parse_flight_trip(row, "https://www.kayak.fr")
+    assert flight_trip.price.amount == 233
+    assert flight_trip.price.currency == "€"
+    assert (flight_trip.first_trip_date.month, flight_trip.first_trip_date.day) == (
+        1,
+        14,
+    )
+    assert (flight_trip.return_trip_date.month, flight_trip.return_trip_date.day) == (
+        1,
+        28,
+    )
+    assert flight_trip.direct_link == "https://www.kayak.fr/book/flight?code=abc&h=def"
+    assert str(flight_trip.first_trip) == "CDG-YUL"
+    assert str(flight_trip.return_trip) == "YUL-ORY"
+
+
+def test_row_with_missing_field():
+    """Check that a return result item without airport cannot be parsed."""
+    with pytest.raises(ValidationError):
+        ReturnResultRow.parse_obj(make_row(return_trip_origin=None))
+
+
+def test_row_with_missing_date():
+    row = ReturnResultRow.parse_obj(make_row(dates=["Sat 1/14"]))
+    with pytest.raises(IndexError):
+        parse_flight_trip(row, "https://www.kayak.fr")
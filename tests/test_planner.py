@@ -0,0 +1,51 @@
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from fff.planner import covered_pairs, plan_searches, valid_pairs
+from fff.schemas.flexible_calendar import DateWindow, FlexibleCalendar
+from fff.utils.datetime import split_date_window
+
+
+@pytest.mark.parametrize(
+    "begin, end, min_nights, max_nights",
+    [
+        (date(2023, 1, 1), date(2023, 4, 1), 14, 35),
+        (date(2023, 1, 1), date(2023, 4, 1), 14, 21),
+        (date(2023, 3, 1), date(2023, 5, 1), 30, 50),
+        (date(2023, 1, 1), date(2023, 1, 20), 3, 3),
+        (date(2023, 1, 1), date(2023, 12, 31), 0, 60),
+        (date(2023, 1, 1), date(2023, 2, 5), 10, 18),
+    ],
+)
+def test_plan_covers_every_pair_once(begin, end, min_nights, max_nights):
+    plan = plan_searches(begin, end, min_nights, max_nights)
+    coverage = Counter(
+        pair for planned_search in plan for pair in covered_pairs(planned_search, end)
+    )
+    assert set(coverage) == valid_pairs(begin, end, min_nights, max_nights)
+    assert set(coverage.values()) == {1}
+    # Every URL is useful
+    assert all(covered_pairs(planned_search, end) for planned_search in plan)
+    # Never more URLs than with fixed date windows
+    fixed_windows = FlexibleCalendar(
+        min_nights=min_nights, max_nights=max_nights
+    ).date_windows
+    assert len(plan) <= max(len(fixed_windows), 1) * len(split_date_window(begin, end))
+
+
+def test_plan_respects_website_limits():
+    plan = plan_searches(date(2023, 1, 1), date(2023, 12, 31), 0, 60)
+    for start_date, end_date, date_window in plan:
+        assert (end_date - start_date).days <= 34
+        assert date_window.max_nights - date_window.min_nights <= 7
+
+
+def test_plan_skips_returns_after_search_end():
+    """Check that the departure dates stop when the shortest stay would return too late."""
+    plan = plan_searches(date(2023, 1, 1), date(2023, 4, 1), 14, 35)
+    # 9 URLs with fixed date windows
+    assert len(plan) == 7
+    assert plan[-1].end_date == date(2023, 3, 1)
+    assert plan[-1].date_window == DateWindow(min_nights=30, max_nights=35)
@@ -0,0 +1,94 @@
+import pytest
+
+from fff.exceptions import ScrapingError
+from fff.pool import BotPool
+
+
+class FakeBot:
+    def __init__(self, fail_on: str | None = None, crash_on: str | None = None):
+        self.started = False
+        self.closed = False
+        self.scraped: list[str] = []
+        self.next_urls: dict[str, list[str]] = {}
+        self.fail_on = fail_on
+        self.crash_on = crash_on
+
+    def start(self):
+        self.started = True
+
+    def quit(self):
+        self.closed = True
+
+    def scrap_url(self, url: str, nb_results: int, pruner=None, next_urls=()):
+        self.next_urls[url] = list(next_urls)
+        if url == self.fail_on:
+            raise ScrapingError(url, attempts=3, error=RuntimeError("Timeout"))
+        if url == self.crash_on:
+            raise RuntimeError(f"Cannot scrap {url}")
+        self.scraped.append(url)
+        return [f"{url}#{i}" for i in range(nb_results)]
+
+
+def test_pool_scraps_every_url_once():
+    """Check that the workers share the URLs and the merger gets all the results."""
+    bots: list[FakeBot] = []
+
+    def bot_factory():
+        bot = FakeBot()
+        bots.append(bot)
+        return bot
+
+    first_bot = FakeBot()
+    urls = [f"url{i}" for i in range(10)]
+    results = []
+    pool = BotPool(bot_factory=bot_factory, size=3, first_bot=first_bot)
+    pool.run(
+        urls,
+        nb_results=2,
+        on_result=lambda url, flight_trips, scraping_time: results.extend(flight_trips),
+    )
+
+    assert sorted(results) == sorted(f"url{i}#{j}" for i in range(10) for j in range(2))
+    scraped = first_bot.scraped + [url for bot in bots for url in bot.scraped]
+    assert sorted(scraped) == sorted(urls)
+    assert len(bots) == 2
+    # Browsers launched by the pool are closed, but not the one we gave it.
+    assert all(bot.closed for bot in bots)
+    assert not first_bot.closed
+
+
+def test_pool_reports_failed_urls():
+    """Check that a URL which cannot be scraped does not stop the other ones."""
+    results = []
+    failed_urls = []
+    pool = BotPool(bot_factory=lambda: FakeBot(fail_on="url1"), size=2)
+    pool.run(
+        ["url0", "url1", "url2"],
+        nb_results=1,
+        on_result=lambda url, flight_trips, scraping_time: results.extend(flight_trips),
+        on_failure=lambda url, error: failed_urls.append(url),
+    )
+    assert sorted(results) == ["url0#0", "url2#0"]
+    assert failed_urls == ["url1"]
+
+
+def test_pool_raises_worker_error():
+    pool = BotPool(bot_factory=lambda: FakeBot(crash_on="url1"), size=2)
+    with pytest.raises(RuntimeError):
+        pool.run(["url0", "url1", "url2"], nb_results=1)
+
+
+def test_pool_reserves_urls_to_prefetch():
+    """Check that each worker gives its bot the next URLs it will scrap."""
+    bot = FakeBot()
+    urls = [f"url{i}" for i in range(4)]
+    pool = BotPool(bot_factory=FakeBot, size=1, first_bot=bot, prefetch=2)
+    pool.run(urls, nb_results=1)
+
+    assert bot.scraped == urls
+    assert bot.next_urls == {
+        "url0": ["url1", "url2"],
+        "url1": ["url2", "url3"],
+        "url2": ["url3"],
+        "url3": [],
+    }
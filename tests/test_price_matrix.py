@@ -0,0 +1,159 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from price_parser import Price
+
+from fff.config import Settings
+from fff.price_matrix import PriceMatrix, PricePoint, save_price_matrix
+from fff.schemas.calendar_cell import CalendarCell
+from fff.schemas.flexible_calendar import DateWindow
+from fff.url_generator import UrlGenerator
+from tests.factories import make_flight_trip
+
+
+def make_cell(departure_date: date, price: str, route="PAR-YUL", nights=(10, 12)):
+    return CalendarCell(
+        url="url",
+        route=route,
+        departure_date=departure_date,
+        date_window=DateWindow(min_nights=nights[0], max_nights=nights[1]),
+        index=0,
+        price=Price.fromstring(price),
+    )
+
+
+@pytest.fixture
+def matrix():
+    # Two weeks, from a Wednesday to a Tuesday
+    return PriceMatrix(
+        routes=["PAR-YUL", "LYS-YUL"],
+        date_begin=date(2023, 2, 1),
+        date_end=date(2023, 2, 14),
+        min_nights=10,
+        max_nights=13,
+    )
+
+
+def test_calendar_price_covers_its_night_window(matrix):
+    matrix.add_cells(
+        [
+            make_cell(date(2023, 2, 1), "€500"),
+            make_cell(date(2023, 2, 1), "€450", nights=(12, 18)),
+            # Out of the searched dates
+            make_cell(date(2023, 3, 1), "€100"),
+        ]
+    )
+
+    prices = matrix.route_prices("PAR-YUL")
+    assert prices[0].tolist()[:3] == [500, 500, 450]
+    assert prices[0, 3] == 450
+    assert matrix.nb_prices == 4
+
+
+def test_flight_trip_price_is_exact(matrix):
+    matrix.add_cells([make_cell(date(2023, 2, 1), "€300")])
+    matrix.add_flight_trips(
+        "PAR-YUL",
+        [
+            make_flight_trip("€350", departure=datetime(2023, 2, 1), nights=11),
+            make_flight_trip("€340", departure=datetime(2023, 2, 1), nights=11),
+            # Too many nights
+            make_flight_trip("€200", departure=datetime(2023, 2, 1), nights=14),
+        ],
+    )
+    # A calendar price does not override an exact one.
+    matrix.add_cells([make_cell(date(2023, 2, 1), "€280")])
+
+    assert matrix.route_prices("PAR-YUL")[0].tolist()[:3] == [280, 340, 280]
+
+
+def test_vectorized_queries(matrix):
+    matrix.add_flight_trips(
+        "PAR-YUL",
+        [
+            make_flight_trip("€400", departure=datetime(2023, 2, 1), nights=10),
+            make_flight_trip("€300", departure=datetime(2023, 2, 6), nights=13),
+            make_flight_trip("€350", departure=datetime(2023, 2, 12), nights=13),
+        ],
+    )
+    matrix.add_flight_trips(
+        "LYS-YUL",
+        [make_flight_trip("€250", departure=datetime(2023, 2, 14), nights=10)],
+    )
+
+    # Weeks from Monday
+    assert matrix.cheapest_by_week() == {
+        date(2023, 1, 30): 400,
+        date(2023, 2, 6): 300,
+        date(2023, 2, 13): 250,
+    }
+    assert matrix.cheapest_by_week("PAR-YUL")[date(2023, 2, 6)] == 300
+    assert matrix.cheapest_by_nights() == {10: 250, 13: 300}
+    assert matrix.percentiles((0, 50, 100)) == {0: 250, 50: 325, 100: 400}
+    assert matrix.cheapest(2) == [
+        PricePoint("LYS-YUL", date(2023, 2, 14), 10, 250),
+        PricePoint("PAR-YUL", date(2023, 2, 6), 13, 300),
+    ]
+    assert matrix.cheapest(1, route="PAR-YUL")[0].price == 300
+
+
+def test_heatmap(matrix):
+    assert matrix.heatmap() == "No price known."
+    matrix.add_flight_trips(
+        "PAR-YUL",
+        [
+            make_flight_trip("€100", departure=datetime(2023, 2, 1), nights=10),
+            make_flight_trip("€190", departure=datetime(2023, 2, 1), nights=11),
+            make_flight_trip("€145", departure=datetime(2023, 2, 2), nights=13),
+        ],
+    )
+
+    lines = matrix.heatmap().splitlines()
+    assert lines[0].split() == ["10", "11", "12", "13", "nights"]
+    assert lines[1] == "2023-02-01 Wed   .  @      "
+    assert lines[2] == "2023-02-02 Thu            +"
+    assert len(lines) == 1 + 14 + 2
+    assert "p50 145" in matrix.report()
+
+
+def test_save_and_update(matrix, tmp_path):
+    path = tmp_path / "prices.npz"
+    matrix.add_cells([make_cell(date(2023, 2, 1), "€500")])
+    save_price_matrix(matrix, path, max_age=timedelta(hours=1))
+
+    loaded = PriceMatrix.load(path)
+    assert loaded.same_search(matrix)
+    assert loaded.date_end == date(2023, 2, 14)
+    assert np.array_equal(loaded.prices, matrix.prices, equal_nan=True)
+
+    # The next search only loaded another page: the previous prices are kept.
+    matrix.reset()
+    matrix.add_cells([make_cell(date(2023, 2, 2), "€600")])
+    save_price_matrix(matrix, path, max_age=timedelta(hours=1))
+    assert PriceMatrix.load(path).nb_prices == 6
+
+    # Unless they are too old
+    old = time.time() - 7200
+    os.utime(path, (old, old))
+    matrix.reset()
+    save_price_matrix(matrix, path, max_age=timedelta(hours=1))
+    assert PriceMatrix.load(path).nb_prices == 0
+
+
+def test_matrix_of_a_search():
+    url_generator = UrlGenerator(
+        settings=Settings(
+            SEARCH_DATE_BEGIN=date(2023, 1, 1),
+            SEARCH_DATE_END=date.today() + timedelta(days=60),
+            MIN_NIGHTS=14,
+            MAX_NIGHTS=21,
+        )
+    )
+    matrix = PriceMatrix.for_search(url_generator)
+    # From today, not from the past begin date, until the last departure of 14 nights
+    assert matrix.date_begin == date.today()
+    assert matrix.date_end == date.today() + timedelta(days=60 - 15)
+    assert (matrix.min_nights, matrix.max_nights) == (14, 21)
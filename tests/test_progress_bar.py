@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+from fff.utils.progress_bar import elements_are_stable
+
+
+class FakeDriver:
+    """Return the next list of element ids on each poll, then the last one."""
+
+    def __init__(self, *polls):
+        self.polls = list(polls)
+
+    def find_elements(self, by, value):
+        element_ids = self.polls.pop(0) if len(self.polls) > 1 else self.polls[0]
+        return [SimpleNamespace(id=element_id) for element_id in element_ids]
+
+
+def test_replaced_elements_are_stable():
+    # The clicked date replaces the list with as many return flights
+    driver = FakeDriver(["a", "b"], ["c", "d"])
+    expectation = elements_are_stable(("xpath", "//li"), nb_polls=2)
+    assert [expectation(driver) for _ in range(4)] == [False, False, False, True]
+
+
+def test_growing_elements_are_not_stable():
+    driver = FakeDriver(["a"], ["a", "b"], ["a", "b", "c"], ["a", "b", "c", "d"])
+    expectation = elements_are_stable(("xpath", "//li"), nb_polls=1)
+    assert not any(expectation(driver) for _ in range(4))
+    assert expectation(driver)
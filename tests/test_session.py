@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+
+import pytest
+from price_parser import Price
+
+from fff.config import Settings
+from fff.history import PriceHistory
+from fff.parser import CalendarPrice
+from fff.schemas.url_result import UrlResult
+from fff.session import SearchSession
+from fff.url_generator import UrlGenerator
+from tests.factories import make_flight_trip
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return Settings(
+        FROM_AIRPORT="PAR",
+        DESTINATION_AIRPORT="YUL",
+        NUMBER_OF_RESULTS=2,
+        CACHE_PATH=tmp_path / "results.sqlite3",
+        CHECKPOINT_PATH=tmp_path / "checkpoint.jsonl",
+        SEARCH_DATE_BEGIN=date.today() + timedelta(days=30),
+        SEARCH_DATE_END=date.today() + timedelta(days=120),
+    )
+
+
+def open_session(settings, **kwargs):
+    url_generator = UrlGenerator(settings=settings)
+    return SearchSession(
+        settings, url_generator, url_generator.generate_urls(), **kwargs
+    )
+
+
+def test_pruned_url_is_scraped_again(settings, tmp_path):
+    history = PriceHistory(tmp_path / "history.sqlite3")
+    session = open_session(settings, history=history)
+    complete_url, pruned_url, *_ = session.urls_to_scrap
+    session.on_result(
+        complete_url,
+        UrlResult(flight_trips=[make_flight_trip("€300"), make_flight_trip("€310")]),
+        scraping_time=10,
+    )
+    # The departure dates of this URL were not clicked on, but the cheapest one.
+    changed = session.on_result(
+        pruned_url,
+        UrlResult(flight_trips=[make_flight_trip("€305", nights=10)], pruned=True),
+        scraping_time=5,
+    )
+    session.close()
+
+    assert changed
+    assert [trip.price.amount for trip in session.results] == [300, 305]
+    assert history.latest(complete_url) is not None
+    assert history.latest(pruned_url) is None
+
+    # Neither the checkpoint journal nor the cache give the pruned URL as done.
+    session = open_session(settings, resume=True)
+    assert complete_url not in session.urls_to_scrap
+    assert pruned_url in session.urls_to_scrap
+    session.close()
+    session = open_session(settings)
+    assert complete_url not in session.urls_to_scrap
+    assert pruned_url in session.urls_to_scrap
+    session.close()
+    history.close()
+
+
+def test_history_records_every_flight_trip(settings, tmp_path):
+    settings.CACHE_ENABLED = False
+    history = PriceHistory(tmp_path / "history.sqlite3")
+    session = open_session(settings, history=history)
+    url = session.urls_to_scrap[0]
+    flight_trips = [
+        make_flight_trip(f"€{300 + nights}", nights=nights) for nights in range(8, 14)
+    ]
+    session.on_result(
+        url,
+        UrlResult(flight_trips=flight_trips[:2], all_flight_trips=flight_trips),
+        scraping_time=10,
+    )
+    session.close()
+
+    assert [trip.price.amount for trip in session.results] == [308, 309]
+    assert len(history.latest(url)) == 6
+    assert UrlResult(flight_trips=flight_trips[:2]).all_flight_trips == flight_trips[:2]
+    history.close()
+
+
+def test_only_the_scraped_flight_trips_are_exported(settings, tmp_path):
+    export_path = tmp_path / "results.jsonl"
+    session = open_session(settings, export_paths=[export_path])
+    cached_url, url, *_ = session.urls_to_scrap
+    session.on_result(
+        cached_url, UrlResult(flight_trips=[make_flight_trip("€300")]), scraping_time=1
+    )
+    session.close()
+    assert len(export_path.read_text().splitlines()) == 1
+
+    # The cached flight trips are merged, but not exported again.
+    session = open_session(settings, export_paths=[export_path])
+    assert cached_url not in session.urls_to_scrap
+    flight_trips = [make_flight_trip("€280"), make_flight_trip("€400", nights=10)]
+    session.on_result(
+        url,
+        UrlResult(flight_trips=flight_trips[:1], all_flight_trips=flight_trips),
+        scraping_time=1,
+    )
+    session.close()
+
+    assert session.exporters[0].nb_rows == 2
+    assert len(export_path.read_text().splitlines()) == 3
+
+
+def test_history_does_not_prune_departure_dates(settings, tmp_path, monkeypatch):
+    settings.PRUNE_DEPARTURE_DATES = True
+    history = PriceHistory(tmp_path / "history.sqlite3")
+    stable_flight_trips = [
+        make_flight_trip("€200"),
+        make_flight_trip("€210", nights=10),
+    ]
+    monkeypatch.setattr(
+        history,
+        "plan",
+        lambda urls, **kwargs: (urls[1:], {urls[0]: stable_flight_trips}),
+    )
+    session = open_session(settings, history=history)
+    url, other_url, *_ = session.urls_to_scrap
+    departure_dates = [CalendarPrice(index=0, price=Price.fromstring("€250"))]
+
+    # The stable flight trips are merged, but they may be stale
+    assert [trip.price.amount for trip in session.results] == [200, 210]
+    assert session.pruner.prune(url, departure_dates, seconds_per_click=1)
+
+    # The flight trips scraped by this run prune the next URLs
+    flight_trips = [
+        make_flight_trip("€220", nights=8),
+        make_flight_trip("€230", nights=9),
+    ]
+    session.on_result(url, UrlResult(flight_trips=flight_trips), scraping_time=1)
+    assert not session.pruner.prune(other_url, departure_dates, seconds_per_click=1)
+    session.close()
+    history.close()
@@ -0,0 +1,73 @@
+from fff.throttle import PageOutcome, RequestScheduler, is_captcha_page
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_is_captcha_page():
+    assert is_captcha_page("https://www.kayak.com/help/bots.html", "KAYAK")
+    assert is_captcha_page("https://www.kayak.com/", "Please solve this CAPTCHA")
+    assert not is_captcha_page(
+        "https://www.kayak.com/flights/PAR-YUL/2023-01-01/2023-01-15", "PAR to YUL"
+    )
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    scheduler = RequestScheduler(
+        requests_per_minute=60, max_concurrency=2, slow_page_load=30, clock=clock
+    )
+    # The bucket starts full, with a token per browser
+    assert scheduler.try_acquire_token()
+    assert scheduler.try_acquire_token()
+    assert not scheduler.try_acquire_token()
+    clock.now += 1
+    assert scheduler.try_acquire_token()
+    assert not scheduler.try_acquire_token()
+
+
+def test_aimd_concurrency():
+    clock = FakeClock()
+    scheduler = RequestScheduler(
+        requests_per_minute=600, max_concurrency=8, slow_page_load=30, clock=clock
+    )
+    scheduler.acquire()
+    scheduler.release(PageOutcome.TIMEOUT, load_time=60)
+    assert scheduler.concurrency_limit == 4
+    scheduler.acquire()
+    scheduler.release(PageOutcome.OK, load_time=45)
+    assert scheduler.concurrency_limit == 2
+    # Errors not related to the pace change nothing
+    scheduler.acquire()
+    scheduler.release(PageOutcome.ERROR, load_time=1)
+    assert scheduler.concurrency_limit == 2
+    # Additive increase: +1 after a bit more than "limit" fast pages
+    for _ in range(3):
+        clock.now += 1
+        scheduler.acquire()
+        scheduler.release(PageOutcome.OK, load_time=5)
+    assert int(scheduler.concurrency_limit) == 3
+    assert scheduler.nb_timeouts == 1 and scheduler.nb_slow == 1
+
+
+def test_captcha_slows_down():
+    clock = FakeClock()
+    scheduler = RequestScheduler(
+        requests_per_minute=60, max_concurrency=4, slow_page_load=30, clock=clock
+    )
+    scheduler.acquire()
+    scheduler.release(PageOutcome.CAPTCHA, load_time=2)
+    assert scheduler.concurrency_limit == 2
+    assert scheduler.rate == 0.5
+    # The remaining tokens are dropped: wait before the next request
+    assert not scheduler.try_acquire_token()
+    clock.now += 2
+    scheduler.acquire()
+    scheduler.release(PageOutcome.OK, load_time=2)
+    # The rate grows back while the pages load fine
+    assert 0.5 < scheduler.rate < 1
@@ -0,0 +1,66 @@
+import json
+
+from fff.tracing import Tracer, percentile, traced, tracer
+from fff.utils.datetime import parse_date
+
+
+def make_tracer():
+    spans = Tracer()
+    for duration in range(1, 21):
+        spans.record("page_load", start=spans.origin + duration, duration=duration)
+    spans.record("parse_date", start=spans.origin, duration=0.001)
+    return spans
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 21)]
+    assert percentile(values, 0.5) == 10
+    assert percentile(values, 0.95) == 19
+    assert percentile([3.0], 0.95) == 3
+
+
+def test_stats_by_phase():
+    page_load, parse = make_tracer().stats()
+
+    assert page_load.name == "page_load"
+    assert (page_load.count, page_load.total) == (20, 210)
+    assert (page_load.p50, page_load.p95) == (10, 19)
+    assert parse.name == "parse_date"
+    assert parse.count == 1
+
+
+def test_span_and_decorator():
+    tracer.reset()
+
+    @traced("work")
+    def work():
+        with tracer.span("inner"):
+            pass
+
+    work()
+    work()
+    parse_date("Mon 2/13")
+
+    counts = {phase.name: phase.count for phase in tracer.stats()}
+    assert counts == {"work": 2, "inner": 2, "parse_date": 1}
+
+
+def test_exports(tmp_path):
+    spans = make_tracer()
+    trace_path = tmp_path / "trace.json"
+    metrics_path = tmp_path / "metrics" / "fff.prom"
+
+    spans.report(trace_path=trace_path, metrics_path=metrics_path)
+
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert len(events) == 21
+    assert events[0]["ph"] == "X"
+    assert events[0]["dur"] == 1_000_000
+    metrics = metrics_path.read_text().splitlines()
+    assert "# TYPE fff_phase_duration_seconds summary" in metrics
+    assert (
+        'fff_phase_duration_seconds{phase="page_load",quantile="0.95"} 19.000000'
+        in metrics
+    )
+    assert 'fff_phase_duration_seconds_count{phase="page_load"} 20' in metrics
+    assert not (tmp_path / "metrics" / "fff.prom.tmp").exists()
@@ -0,0 +1,230 @@
+import multiprocessing
+import sqlite3
+import time
+import zlib
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from fff import distributed
+from fff.config import Settings
+from fff.distributed import coordinate, run_worker, worker_settings
+from fff.schemas.url_result import UrlResult
+from fff.work_queue import SqliteWorkQueue, WorkQueue, open_work_queue
+from tests.factories import make_flight_trip
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = SqliteWorkQueue(tmp_path / "queue.sqlite3", clock=clock)
+    queue.publish('{"NUMBER_OF_RESULTS": 2}', {"url1": "PAR-YUL", "url2": "LYS-YUL"})
+    yield queue
+    queue.close()
+
+
+def test_claim_each_url_once(queue):
+    first = queue.claim("worker-1", lease=60)
+    second = queue.claim("worker-2", lease=60)
+
+    assert (first.url, first.route, first.claims) == ("url1", "PAR-YUL", 1)
+    assert (second.url, second.worker_id) == ("url2", "worker-2")
+    assert queue.claim("worker-3", lease=60) is None
+    assert queue.progress() == {"pending": 0, "claimed": 2, "done": 0, "failed": 0}
+    assert queue.search_settings() == '{"NUMBER_OF_RESULTS": 2}'
+
+
+def test_expired_lease_is_claimed_again(queue, clock):
+    item = queue.claim("worker-1", lease=60)
+    queue.claim("worker-1", lease=60)
+    clock.now += 30
+    queue.renew(item, lease=60)
+    clock.now += 45
+    # The lease of the second URL expired, not the renewed one.
+    taken_over = queue.claim("worker-2", lease=60)
+    assert (taken_over.url, taken_over.claims) == ("url2", 2)
+    assert queue.claim("worker-2", lease=60) is None
+
+    # Then the first report wins.
+    queue.complete(
+        taken_over, UrlResult(flight_trips=[make_flight_trip("€300")]), scraping_time=12
+    )
+    stale_item = taken_over._replace(worker_id="worker-1", claims=1)
+    queue.complete(
+        stale_item,
+        UrlResult(flight_trips=[make_flight_trip("€900")], pruned=True),
+        scraping_time=80,
+    )
+    [finished] = queue.finished()
+    assert finished.url == "url2"
+    assert finished.result.flight_trips[0].price.amount == 300
+    assert not finished.result.pruned
+    assert finished.scraping_time == 12
+
+
+def test_abandoned_url_fails(queue, clock):
+    for _ in range(2):
+        queue.claim("crashing-worker", lease=60)
+        queue.claim("crashing-worker", lease=60)
+        clock.now += 61
+    # No worker is left to claim the URLs: the coordinator sweeps them.
+    queue.expire()
+
+    assert [finished.url for finished in queue.finished()] == ["url1", "url2"]
+    assert "leases expired" in queue.finished()[0].error
+    assert queue.is_drained()
+    assert queue.claim("worker", lease=60) is None
+
+
+def test_failed_url_is_retried_once(queue):
+    item = queue.claim("worker-1", lease=60)
+    queue.fail(item, "TimeoutError: no result")
+    assert queue.finished() == []
+
+    retried_item = queue.claim("worker-2", lease=60)
+    assert (retried_item.url, retried_item.claims) == ("url1", 2)
+    queue.complete(
+        queue.claim("worker-2", lease=60),
+        UrlResult(flight_trips=[], pruned=True),
+        scraping_time=1,
+    )
+    queue.fail(retried_item, "TimeoutError: no result")
+
+    done, failed = queue.finished()
+    assert (done.url, done.result) == ("url2", UrlResult(flight_trips=[], pruned=True))
+    assert (failed.sequence, failed.url, failed.result) == (2, "url1", None)
+    assert failed.error == "TimeoutError: no result"
+    assert queue.finished(after=1) == [failed]
+    assert queue.is_drained()
+
+
+def test_work_queue_interface():
+    with pytest.raises(TypeError, match="abstract"):
+        WorkQueue()
+
+
+def test_open_work_queue(tmp_path):
+    queue = open_work_queue(f"sqlite://{tmp_path / 'queue.sqlite3'}")
+    assert isinstance(queue, SqliteWorkQueue)
+    queue.close()
+    with pytest.raises(ValueError, match="sqlite"):
+        open_work_queue("redis://localhost:6379")
+
+
+def test_worker_keeps_its_machine_settings():
+    search_settings = Settings(
+        FROM_AIRPORT="LYS", HEADLESS_MODE=True, WORK_QUEUE_LEASE=60
+    ).json(exclude=distributed.WORKER_SETTINGS)
+
+    settings = worker_settings(
+        search_settings,
+        Settings(FROM_AIRPORT="BRU", HEADLESS_MODE=False, WORK_QUEUE_LEASE=30),
+    )
+    assert settings.FROM_AIRPORT == "LYS"
+    assert not settings.HEADLESS_MODE
+    assert settings.WORK_QUEUE_LEASE == 30
+
+
+def price_of(url: str) -> int:
+    return 100 + zlib.crc32(url.encode()) % 900
+
+
+class FakeBot:
+    def __init__(self, settings):
+        self.started = False
+
+    def start(self):
+        self.started = True
+
+    def quit(self):
+        pass
+
+    def scrap_url(self, url, nb_results, pruner=None, next_urls=()):
+        time.sleep(0.2)
+        return UrlResult(
+            flight_trips=[
+                make_flight_trip(
+                    f"€{price_of(url)}",
+                    departure=datetime(2023, 2, 1) + timedelta(days=price_of(url)),
+                )
+            ]
+        )
+
+
+def scrap_queue(path: str) -> None:
+    """A worker process."""
+    distributed.POLL_INTERVAL = 0.05
+    queue = open_work_queue(path)
+    run_worker(queue, Settings(), bot_factory=FakeBot)
+    queue.close()
+
+
+def test_workers_share_the_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "POLL_INTERVAL", 0.05)
+    path = str(tmp_path / "queue.sqlite3")
+    settings = Settings(
+        FROM_AIRPORT="PAR,LYS",
+        DESTINATION_AIRPORT="YUL,YQB",
+        NUMBER_OF_RESULTS=3,
+        CACHE_ENABLED=False,
+        CHECKPOINT_PATH=tmp_path / "checkpoint.jsonl",
+        SEARCH_DATE_BEGIN=date.today() + timedelta(days=30),
+        SEARCH_DATE_END=date.today() + timedelta(days=120),
+        WORK_QUEUE=path,
+    )
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=scrap_queue, args=(path,), daemon=True) for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+
+    queue = open_work_queue(path)
+    session = coordinate(queue, settings)
+    queue.close()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    urls = session.url_generator.generate_urls()
+    assert len(urls) == 12
+    assert [trip.price.amount for trip in session.results] == sorted(
+        price_of(url) for url in urls
+    )[:3]
+    assert session.failed_urls == []
+    connection = sqlite3.connect(path)
+    nb_workers = connection.execute("SELECT COUNT(DISTINCT worker_id) FROM urls")
+    assert nb_workers.fetchone()[0] > 1
+    connection.close()
+
+
+def test_coordinator_gives_up_without_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "POLL_INTERVAL", 0.05)
+    settings = Settings(
+        FROM_AIRPORT="PAR",
+        DESTINATION_AIRPORT="YUL",
+        CACHE_ENABLED=False,
+        CHECKPOINT_PATH=tmp_path / "checkpoint.jsonl",
+        SEARCH_DATE_BEGIN=date.today() + timedelta(days=30),
+        SEARCH_DATE_END=date.today() + timedelta(days=60),
+    )
+    queue = open_work_queue(str(tmp_path / "queue.sqlite3"))
+    session = coordinate(queue, settings, idle_timeout=0.2)
+    queue.close()
+
+    urls = session.url_generator.generate_urls()
+    assert urls
+    assert session.failed_urls == urls
+    assert session.journal.completed() == {}